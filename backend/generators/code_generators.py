@@ -102,6 +102,15 @@ class PythonCodeGenerator(CodeGenerator):
         elif isinstance(node, IdentifierNode):
             return node.name
 
+        elif isinstance(node, ArrayLiteralNode):
+            elements = ", ".join(self._generate_node(element) for element in node.elements)
+            return f"[{elements}]"
+
+        elif isinstance(node, IndexNode):
+            target = self._generate_node(node.target)
+            index = self._generate_node(node.index)
+            return f"{target}[{index}]"
+
         elif isinstance(node, BinaryOpNode):
             left = self._generate_node(node.left)
             right = self._generate_node(node.right)
@@ -119,6 +128,11 @@ class PythonCodeGenerator(CodeGenerator):
 
         elif isinstance(node, FunctionCallNode):
             args = ", ".join(self._generate_node(arg) for arg in node.arguments)
+            # Array built-ins return arrays, not Python iterators
+            if node.name == "sort":
+                return f"sorted({args})"
+            if node.name in ("map", "range"):
+                return f"list({node.name}({args}))"
             return f"{node.name}({args})"
 
         elif isinstance(node, ExpressionStatementNode):
@@ -198,6 +212,17 @@ class PythonCodeGenerator(CodeGenerator):
                 self._emit(f"{node.name} = None")
             return ""
 
+        elif isinstance(node, RuleNode):
+            # Statement forms from grammar rules run their parts in order
+            for child in node.children:
+                if isinstance(child, RuleNode):
+                    self._generate_node(child)
+                elif isinstance(child, ASTNode):
+                    code = self._generate_node(child)
+                    if code:
+                        self._emit(code)
+            return ""
+
         else:
             raise RuntimeError(f"Unknown node type: {type(node).__name__}")
 
@@ -266,6 +291,11 @@ class JavaCodeGenerator(CodeGenerator):
         elif isinstance(node, IdentifierNode):
             # Look up in symbol table
             return self.variable_types.get(node.name, "Object")
+        elif isinstance(node, ArrayLiteralNode):
+            return self._infer_element_type(node) + "[]"
+        elif isinstance(node, IndexNode):
+            target_type = self._infer_type(node.target)
+            return target_type[:-2] if target_type.endswith("[]") else "Object"
         elif isinstance(node, FunctionCallNode):
             # Built-in functions
             if node.name == "print":
@@ -274,6 +304,17 @@ class JavaCodeGenerator(CodeGenerator):
 
         return "Object"  # Default
 
+    def _infer_element_type(self, node) -> str:
+        """Infer the Java element type of an array literal"""
+        element_types = {self._infer_type(element) for element in node.elements}
+        if element_types == {"int"}:
+            return "int"
+        if element_types and element_types <= {"int", "double"}:
+            return "double"
+        if len(element_types) == 1:
+            return element_types.pop()
+        return "Object"
+
     def _generate_node(self, node) -> str:
         """Generate Java code for an AST node"""
         if isinstance(node, ProgramNode):
@@ -295,6 +336,15 @@ class JavaCodeGenerator(CodeGenerator):
         elif isinstance(node, IdentifierNode):
             return node.name
 
+        elif isinstance(node, ArrayLiteralNode):
+            elements = ", ".join(self._generate_node(element) for element in node.elements)
+            return f"new {self._infer_element_type(node)}[]{{{elements}}}"
+
+        elif isinstance(node, IndexNode):
+            target = self._generate_node(node.target)
+            index = self._generate_node(node.index)
+            return f"{target}[{index}]"
+
         elif isinstance(node, BinaryOpNode):
             left = self._generate_node(node.left)
             right = self._generate_node(node.right)
@@ -335,7 +385,11 @@ class JavaCodeGenerator(CodeGenerator):
         elif isinstance(node, FunctionCallNode):
             # Handle built-in functions
             if node.name == "print":
-                args = ", ".join(self._generate_node(arg) for arg in node.arguments)
+                args = ", ".join(
+                    f"java.util.Arrays.toString({self._generate_node(arg)})"
+                    if self._infer_type(arg).endswith("[]") else self._generate_node(arg)
+                    for arg in node.arguments
+                )
                 return f"System.out.println({args})"
             else:
                 args = ", ".join(self._generate_node(arg) for arg in node.arguments)
@@ -426,6 +480,11 @@ class JavaCodeGenerator(CodeGenerator):
                 self._emit(f"{type_str} {node.name} = {default_val};")
             return ""
 
+        elif isinstance(node, RuleNode):
+            # Not supported in main method for MVP
+            self._emit(f"// {node.rule} statement not supported in main method")
+            return ""
+
         else:
             raise RuntimeError(f"Unknown node type: {type(node).__name__}")
 
@@ -1,6 +1,8 @@
+import hashlib
 from pathlib import Path
 from typing import List
 from models.language_spec import LanguageSpecification
+from generators.parser_generator import ParserGenerator
 
 
 class CompilerGenerator:
@@ -17,7 +19,7 @@ class CompilerGenerator:
         # Generate code generator module
         codegen_file = output_dir / "codegen.py"
         with open(codegen_file, 'w') as f:
-            f.write(self._generate_codegen_module(target))
+            f.write(self._generate_codegen_module(target, self._compiler_version()))
         generated_files.append(str(codegen_file))
 
         # Generate compiler main
@@ -33,8 +35,13 @@ class CompilerGenerator:
             f.write(self._generate_main())
         generated_files.append(str(main_file))
 
-        # For Java, generate compilation instructions
+        # For Java, generate type inference and compilation instructions
         if target == "java":
+            inference_file = output_dir / "type_inference.py"
+            with open(inference_file, 'w') as f:
+                f.write(self._generate_type_inference())
+            generated_files.append(str(inference_file))
+
             readme_file = output_dir / "COMPILE.md"
             with open(readme_file, 'w') as f:
                 f.write(self._generate_java_compile_instructions())
@@ -42,16 +49,25 @@ class CompilerGenerator:
 
         return generated_files
 
-    def _generate_codegen_module(self, target: str) -> str:
+    def _compiler_version(self) -> str:
+        """Stamp that changes whenever the generated parser, code generator or compiler change"""
+        target = self.spec.target_language or "python"
+        generated = (ParserGenerator(self.spec)._ast_version() + self._generate_codegen_module(target, "")
+                     + self._generate_compiler())
+        if target == "java":
+            generated += self._generate_type_inference()
+        return hashlib.sha256(generated.encode()).hexdigest()[:16]
+
+    def _generate_codegen_module(self, target: str, version: str) -> str:
         """Generate the codegen.py module with the appropriate generator"""
         if target == "java":
-            return self._generate_java_codegen()
+            return self._generate_java_codegen(version)
         elif target == "javascript":
-            return self._generate_javascript_codegen()
+            return self._generate_javascript_codegen(version)
         else:  # python
-            return self._generate_python_codegen()
+            return self._generate_python_codegen(version)
 
-    def _generate_python_codegen(self) -> str:
+    def _generate_python_codegen(self, version: str) -> str:
         """Generate Python code generator"""
         return '''"""
 Code Generator for {name}
@@ -59,38 +75,55 @@ Transpiles to Python
 Auto-generated by Illiterate Wizard
 """
 
-from typing import Any
+import io
+from typing import Any, Iterable, TextIO
 from ast_nodes import *
 
+# Identifies the compiler outputs were written by; stamped into their header
+COMPILER_VERSION = "{version}"
+
+# Indentation strings by depth, built once instead of for every emitted line
+INDENTS = tuple("    " * depth for depth in range(32))
+
 
 class CodeGenerator:
     def __init__(self):
         self.indent_level = 0
-        self.output = []
+        self._write = None
 
     def generate(self, ast: ProgramNode) -> str:
         """Generate Python code from AST"""
-        self.output = []
+        sink = io.StringIO()
+        self.generate_to(ast, sink)
+        # Without the newline ending the last line
+        return sink.getvalue()[:-1]
+
+    def generate_to(self, ast: ProgramNode, sink: TextIO):
+        """Generate Python code from AST, writing each line to sink as soon as it is generated"""
+        self.generate_statements(ast.statements, sink)
+
+    def generate_statements(self, statements: Iterable[ASTNode], sink: TextIO):
+        """Generate Python code for top-level statements as they arrive, writing it to sink"""
+        self._write = sink.write
         self.indent_level = 0
 
         # Add header
         self._emit("#!/usr/bin/env python3")
-        self._emit("# Generated by {name} compiler")
+        self._emit("# Generated by {name} compiler {version}")
         self._emit("")
 
         # Generate code for each statement
-        for statement in ast.statements:
+        for statement in statements:
             self._generate_node(statement)
 
-        return "\\n".join(self.output)
-
     def _emit(self, code: str):
-        """Emit a line of code with proper indentation"""
-        if code.strip():
-            indent = "    " * self.indent_level
-            self.output.append(f"{{indent}}{{code}}")
+        """Write a line of code with proper indentation"""
+        if code and not code.isspace():
+            level = self.indent_level
+            indent = INDENTS[level] if level < len(INDENTS) else "    " * level
+            self._write(f"{{indent}}{{code}}\\n")
         else:
-            self.output.append("")
+            self._write("\\n")
 
     def _generate_node(self, node: ASTNode) -> str:
         """Generate code for an AST node"""
@@ -109,6 +142,15 @@ class CodeGenerator:
         elif isinstance(node, IdentifierNode):
             return node.name
 
+        elif isinstance(node, ArrayLiteralNode):
+            elements = ", ".join(self._generate_node(element) for element in node.elements)
+            return f"[{{elements}}]"
+
+        elif isinstance(node, IndexNode):
+            target = self._generate_node(node.target)
+            index = self._generate_node(node.index)
+            return f"{{target}}[{{index}}]"
+
         elif isinstance(node, BinaryOpNode):
             left = self._generate_node(node.left)
             right = self._generate_node(node.right)
@@ -126,6 +168,11 @@ class CodeGenerator:
 
         elif isinstance(node, FunctionCallNode):
             args = ", ".join(self._generate_node(arg) for arg in node.arguments)
+            # Array built-ins return arrays, not Python iterators
+            if node.name == "sort":
+                return f"sorted({{args}})"
+            if node.name in ("map", "range"):
+                return f"list({{node.name}}({{args}}))"
             return f"{{node.name}}({{args}})"
 
         elif isinstance(node, ExpressionStatementNode):
@@ -201,16 +248,27 @@ class CodeGenerator:
                 self._emit(f"{{node.name}} = None")
             return ""
 
+        elif isinstance(node, RuleNode):
+            # Statement forms from grammar rules run their parts in order
+            for child in node.children:
+                if isinstance(child, RuleNode):
+                    self._generate_node(child)
+                elif isinstance(child, ASTNode):
+                    code = self._generate_node(child)
+                    if code:
+                        self._emit(code)
+            return ""
+
         else:
             raise RuntimeError(f"Unknown node type: {{type(node).__name__}}")
-'''.format(name=self.spec.name)
+'''.format(name=self.spec.name, version=version)
 
-    def _generate_javascript_codegen(self) -> str:
+    def _generate_javascript_codegen(self, version: str) -> str:
         """Generate JavaScript code generator"""
         # For MVP, JavaScript uses similar structure to Python
-        return self._generate_python_codegen().replace("Python", "JavaScript").replace("python", "javascript").replace("#!/usr/bin/env python3", "#!/usr/bin/env node")
+        return self._generate_python_codegen(version).replace("Python", "JavaScript").replace("python", "javascript").replace("#!/usr/bin/env python3", "#!/usr/bin/env node")
 
-    def _generate_java_codegen(self) -> str:
+    def _generate_java_codegen(self, version: str) -> str:
         """Generate Java code generator with type inference"""
         class_name = self.spec.name.replace(" ", "").replace("-", "")
 
@@ -220,25 +278,68 @@ Transpiles to Java
 Auto-generated by Illiterate Wizard
 """
 
-from typing import Any, Dict
+import io
+from typing import Any, Dict, Iterable, List, Optional, TextIO
 from ast_nodes import *
+from type_inference import TypeInference
+
+# Identifies the compiler outputs were written by; stamped into their header
+COMPILER_VERSION = "{version}"
+
+# Indentation strings by depth, built once instead of for every emitted line
+INDENTS = tuple("    " * depth for depth in range(32))
+
+# Java requires variables to be initialized and methods to return a value
+DEFAULT_VALUES = {{"int": "0", "double": "0.0", "boolean": "false", "String": '""'}}
 
 
 class CodeGenerator:
     def __init__(self):
         self.indent_level = 0
-        self.output = []
+        self._write = None
         self.class_name = "{class_name}"
-        self.variable_types = {{}}  # Track variable types for type inference
+        self.variable_types = {{}}  # Types of the variables declared so far
+        self.types = TypeInference()
+        self.function: Optional[str] = None  # Function whose method is being generated
+        self.fields: Dict[str, str] = {{}}  # Top-level variables functions use, as static fields
+        self.functions: List[FunctionDefNode] = []  # Functions to generate once every statement is seen
+        self.methods: List[str] = []  # Code of each function's method, written after main
 
     def generate(self, ast: ProgramNode) -> str:
         """Generate Java code from AST"""
-        self.output = []
+        sink = io.StringIO()
+        self.generate_to(ast, sink)
+        # Without the newline ending the last line
+        return sink.getvalue()[:-1]
+
+    def generate_to(self, ast: ProgramNode, sink: TextIO):
+        """Generate Java code from AST, writing each line to sink as soon as it is generated"""
+        # Types are inferred over the whole program before any code is written
+        types = TypeInference()
+        types.add(ast.statements)
+        self.generate_statements(ast.statements, sink, types)
+
+    def generate_statements(self, statements: Iterable[ASTNode], sink: TextIO,
+                            types: Optional[TypeInference] = None):
+        """Generate Java code for top-level statements, writing it to sink
+
+        Declarations need the types inferred over the whole program, so the statements
+        cannot be generated as they are parsed.
+        """
+        if types is None:
+            raise ValueError("Java code needs types inferred over the whole program, "
+                             "so it cannot be generated statement by statement")
+        self._write = sink.write
         self.indent_level = 0
         self.variable_types = {{}}
+        self.types = types
+        self.function = None
+        self.fields = {{}}
+        self.functions = []
+        self.methods = []
 
         # Java class header
-        self._emit(f"// Generated by {name} compiler")
+        self._emit(f"// Generated by {name} compiler {version}")
         self._emit("")
         self._emit(f"public class {{self.class_name}} {{{{")
         self.indent_level += 1
@@ -248,63 +349,102 @@ class CodeGenerator:
         self.indent_level += 1
 
         # Generate code for each statement
-        for statement in ast.statements:
+        for statement in statements:
+            if types is None:
+                self.types.add([statement])
             self._generate_node(statement)
 
         # Close main method
         self.indent_level -= 1
         self._emit("}}")
 
+        # Methods are generated once the types of every call are known; they may add fields
+        for node in self.functions:
+            self._generate_method(node)
+
+        # Static fields for the top-level variables functions use, then the functions
+        if self.fields:
+            self._emit("")
+        for field_name, type_str in self.fields.items():
+            self._emit(f"private static {{type_str}} {{field_name}};")
+        for method in self.methods:
+            self._emit("")
+            self._write(method)
+
         # Close class
         self.indent_level -= 1
         self._emit("}}")
 
-        return "\\n".join(self.output)
-
     def _emit(self, code: str):
-        """Emit a line of code with proper indentation"""
-        if code.strip():
-            indent = "    " * self.indent_level
-            self.output.append(f"{{indent}}{{code}}")
+        """Write a line of code with proper indentation"""
+        if code and not code.isspace():
+            level = self.indent_level
+            indent = INDENTS[level] if level < len(INDENTS) else "    " * level
+            self._write(f"{{indent}}{{code}}\\n")
         else:
-            self.output.append("")
+            self._write("\\n")
 
     def _infer_type(self, node) -> str:
         """Infer Java type from AST node"""
-        if isinstance(node, LiteralNode):
-            if isinstance(node.value, bool):
-                return "boolean"
-            elif isinstance(node.value, int):
-                return "int"
-            elif isinstance(node.value, float):
-                return "double"
-            elif isinstance(node.value, str):
-                return "String"
-        elif isinstance(node, BinaryOpNode):
-            # Comparison operators return boolean
-            if node.operator in ["==", "!=", "<", ">", "<=", ">=", "&&", "||"]:
-                return "boolean"
-
-            left_type = self._infer_type(node.left)
-            right_type = self._infer_type(node.right)
-
-            # If either operand is double, result is double
-            if left_type == "double" or right_type == "double":
-                return "double"
+        return self.types.expression_type(node, self.function)
+
+    def _infer_element_type(self, node: ArrayLiteralNode) -> str:
+        """Infer the Java element type of an array literal"""
+        return self.types.element_type(node, self.function)
+
+    def _declare(self, name: str) -> str:
+        """Record a variable's first assignment; returns the type to declare it with, if any"""
+        type_str = self.types.variable_type(name, self.function)
+        self.variable_types[name] = type_str
+        if name in self.types.shared and self.types.is_global(name, self.function):
+            # Functions use it too, so it is a static field rather than a local of main
+            self.fields[name] = type_str
+            return ""
+        return f"{{type_str}} "
+
+    def _generate_method(self, node: FunctionDefNode):
+        """Generate a function as a private static method with its inferred signature"""
+        saved = self._write, self.indent_level, self.variable_types, self.function
+        sink = io.StringIO()
+        self._write = sink.write
+        self.indent_level = 1
+        self.function = node.name
+        parameter_types = self.types.parameter_types(node.name)
+        self.variable_types = dict(zip(node.parameters, parameter_types))
+        return_type = self.types.return_type(node.name)
+
+        parameters = ", ".join(f"{{type_str}} {{name}}" for name, type_str in zip(node.parameters, parameter_types))
+        self._emit(f"private static {{return_type}} {{node.name}}({{parameters}}) {{{{")
+        self.indent_level += 1
+        self._generate_node(node.body)
+        if return_type != "void" and self._falls_through(node.body):
+            # Falling off the end returns nothing, which Java needs spelled out
+            self._emit(f"return {{DEFAULT_VALUES.get(return_type, 'null')}};")
+        self.indent_level -= 1
+        self._emit("}}")
 
-            # If either is String and operator is +, result is String
-            if (left_type == "String" or right_type == "String") and node.operator == "+":
-                return "String"
+        self._write, self.indent_level, self.variable_types, self.function = saved
+        self.methods.append(sink.getvalue())
 
-            return left_type
-        elif isinstance(node, UnaryOpNode):
-            if node.operator == "!":
-                return "boolean"
-            return self._infer_type(node.operand)
-        elif isinstance(node, IdentifierNode):
-            return self.variable_types.get(node.name, "Object")
+    def _falls_through(self, node: ASTNode) -> bool:
+        """Whether Java considers that control can reach the end of a statement"""
+        if isinstance(node, ReturnNode):
+            return False
+        elif isinstance(node, BlockNode):
+            return all(self._falls_through(statement) for statement in node.statements)
+        elif isinstance(node, IfNode):
+            return (node.else_branch is None or self._falls_through(node.then_branch)
+                    or self._falls_through(node.else_branch))
+        elif isinstance(node, WhileNode):
+            return not (isinstance(node.condition, LiteralNode) and node.condition.value is True)
+        return True
 
-        return "Object"
+    def _generate_value(self, node: ASTNode, type_str: str) -> str:
+        """Generate a value stored in a variable of type_str, building array literals of that type"""
+        if isinstance(node, ArrayLiteralNode) and type_str.endswith("[]"):
+            elements = ", ".join(self._generate_node(element) for element in node.elements)
+            return f"new {{type_str}}{{{{{{elements}}}}}}"
+        return self._generate_node(node)
 
     def _generate_node(self, node: ASTNode) -> str:
         """Generate code for an AST node"""
@@ -324,6 +464,15 @@ class CodeGenerator:
         elif isinstance(node, IdentifierNode):
             return node.name
 
+        elif isinstance(node, ArrayLiteralNode):
+            elements = ", ".join(self._generate_node(element) for element in node.elements)
+            return f"new {{self._infer_element_type(node)}}[]{{{{{{elements}}}}}}"
+
+        elif isinstance(node, IndexNode):
+            target = self._generate_node(node.target)
+            index = self._generate_node(node.index)
+            return f"{{target}}[{{index}}]"
+
         elif isinstance(node, BinaryOpNode):
             left = self._generate_node(node.left)
             right = self._generate_node(node.right)
@@ -335,25 +484,29 @@ class CodeGenerator:
 
         elif isinstance(node, AssignmentNode):
             target = self._generate_node(node.target)
-            value = self._generate_node(node.value)
 
             if isinstance(node.target, IdentifierNode):
+                type_str = self.types.variable_type(node.target.name, self.function)
+                value = self._generate_value(node.value, type_str)
                 if node.target.name not in self.variable_types:
-                    # First assignment - declare with type
-                    type_str = self._infer_type(node.value)
-                    self.variable_types[node.target.name] = type_str
-                    self._emit(f"{{type_str}} {{target}} = {{value}};")
+                    # First assignment - declare with the type every assignment fits
+                    self._emit(f"{{self._declare(node.target.name)}}{{target}} = {{value}};")
                 else:
                     # Already declared
                     self._emit(f"{{target}} = {{value}};")
             else:
+                value = self._generate_node(node.value)
                 self._emit(f"{{target}} = {{value}};")
             return ""
 
         elif isinstance(node, FunctionCallNode):
             # Handle built-in functions
             if node.name == "print":
-                args = ", ".join(self._generate_node(arg) for arg in node.arguments)
+                args = ", ".join(
+                    f"java.util.Arrays.toString({{self._generate_node(arg)}})"
+                    if self._infer_type(arg).endswith("[]") else self._generate_node(arg)
+                    for arg in node.arguments
+                )
                 return f"System.out.println({{args}})"
             else:
                 args = ", ".join(self._generate_node(arg) for arg in node.arguments)
@@ -401,10 +554,10 @@ class CodeGenerator:
             init = ""
             if node.initializer:
                 if isinstance(node.initializer, VariableDeclarationNode):
-                    type_str = self._infer_type(node.initializer.initializer) if node.initializer.initializer else "int"
-                    self.variable_types[node.initializer.name] = type_str
-                    value = self._generate_node(node.initializer.initializer) if node.initializer.initializer else "0"
-                    init = f"{{type_str}} {{node.initializer.name}} = {{value}}"
+                    declared = self._declare(node.initializer.name)
+                    type_str = self.variable_types[node.initializer.name]
+                    value = self._generate_value(node.initializer.initializer, type_str) if node.initializer.initializer else "0"
+                    init = f"{{declared}}{{node.initializer.name}} = {{value}}"
                 else:
                     init = self._generate_node(node.initializer).rstrip(";")
 
@@ -419,31 +572,258 @@ class CodeGenerator:
             return ""
 
         elif isinstance(node, FunctionDefNode):
-            # Functions not supported in main method for MVP
-            self._emit(f"// Function {{node.name}} not supported in main method (MVP limitation)")
+            # Java methods live outside main, so they are generated and written after it
+            self.functions.append(node)
             return ""
 
         elif isinstance(node, ReturnNode):
-            # Return not supported in main for MVP
-            self._emit("// return statement not supported in main method (MVP limitation)")
+            if self.function is None:
+                # Return not supported in main for MVP
+                self._emit("// return statement not supported in main method (MVP limitation)")
+                return ""
+            return_type = self.types.return_type(self.function)
+            if node.value is not None:
+                self._emit(f"return {{self._generate_value(node.value, return_type)}};")
+            elif return_type != "void":
+                self._emit(f"return {{DEFAULT_VALUES.get(return_type, 'null')}};")
+            else:
+                self._emit("return;")
             return ""
 
         elif isinstance(node, VariableDeclarationNode):
-            type_str = self._infer_type(node.initializer) if node.initializer else "Object"
-            self.variable_types[node.name] = type_str
+            declared = self._declare(node.name)
+            type_str = self.variable_types[node.name]
 
             if node.initializer:
-                value = self._generate_node(node.initializer)
-                self._emit(f"{{type_str}} {{node.name}} = {{value}};")
+                value = self._generate_value(node.initializer, type_str)
+                self._emit(f"{{declared}}{{node.name}} = {{value}};")
             else:
                 # Java requires initialization
-                default_val = {{"int": "0", "double": "0.0", "boolean": "false", "String": '""'}}.get(type_str, "null")
-                self._emit(f"{{type_str}} {{node.name}} = {{default_val}};")
+                self._emit(f"{{declared}}{{node.name}} = {{DEFAULT_VALUES.get(type_str, 'null')}};")
+            return ""
+
+        elif isinstance(node, RuleNode):
+            # Grammar rule statements not supported in main method for MVP
+            self._emit(f"// {{node.rule}} statement not supported in main method (MVP limitation)")
             return ""
 
         else:
             raise RuntimeError(f"Unknown node type: {{type(node).__name__}}")
-'''.format(name=self.spec.name, class_name=class_name)
+'''.format(name=self.spec.name, class_name=class_name, version=version)
+
+    def _generate_type_inference(self) -> str:
+        """Generate the whole-program type inference used by the Java code generator"""
+        return '''"""
+Type inference for the Java backend
+Auto-generated by Illiterate Wizard
+
+Whole-program, flow-insensitive inference of the Java type of every variable,
+function parameter and function result. Each assignment, call argument and
+returned value widens the type of what it flows into to the least upper bound
+of both, and the program is walked again until nothing widens any more:
+
+    int < double < Object
+    boolean, String, T[] < Object
+
+Array literals stored in a variable or returned are built with the element type
+of where they go, so only they also widen int[] to double[].
+
+As in the interpreter, a name is local to a function that takes it as a parameter
+or declares it, and otherwise refers to the top-level variable, even when assigned;
+the top-level variables functions use are recorded in shared. Anything no value
+flows into is an Object.
+"""
+
+from dataclasses import fields
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from ast_nodes import *
+
+BOOLEAN_OPERATORS = {"==", "!=", "<", ">", "<=", ">=", "&&", "||"}
+NUMERIC_TYPES = ("int", "double")
+
+
+def join(first: Optional[str], second: Optional[str], rebuilt: bool = False) -> Optional[str]:
+    """Least upper bound of two types; None stands for nothing known yet
+
+    rebuilt says second is the type of an array literal that is built with the
+    resulting element type, so arrays may widen element-wise.
+    """
+    if first is None or first == second:
+        return second
+    if second is None:
+        return first
+    if first in NUMERIC_TYPES and second in NUMERIC_TYPES:
+        return "double"
+    if rebuilt and first.endswith("[]") and second.endswith("[]"):
+        element = join(first[:-2], second[:-2])
+        if element != "Object":
+            return element + "[]"
+    return "Object"
+
+
+def children(node: ASTNode) -> Iterator[ASTNode]:
+    """The AST nodes directly below a node"""
+    for f in fields(node):
+        if f.compare:
+            value = getattr(node, f.name)
+            if isinstance(value, ASTNode):
+                yield value
+            elif isinstance(value, list):
+                for item in value:
+                    if isinstance(item, ASTNode):
+                        yield item
+
+
+class TypeInference:
+    """Types of a program's variables, parameters and function results"""
+
+    def __init__(self):
+        # (function, or None at the top level; name) -> type
+        self.variables: Dict[Tuple[Optional[str], str], Optional[str]] = {}
+        # function -> parameter names and every name local to it
+        self.functions: Dict[str, Tuple[List[str], Set[str]]] = {}
+        # function -> type of the values it returns; functions returning nothing are absent
+        self.returns: Dict[str, Optional[str]] = {}
+        # Top-level variables used inside functions
+        self.shared: Set[str] = set()
+        self._changed = False
+
+    def add(self, statements: Iterable[ASTNode]):
+        """Infer types over more top-level statements, widening what earlier ones inferred"""
+        statements = list(statements)
+        for statement in statements:
+            self._declare(statement)
+        self._changed = True
+        while self._changed:
+            self._changed = False
+            for statement in statements:
+                self._visit(statement, None)
+
+    def variable_type(self, name: str, function: Optional[str] = None) -> str:
+        """Java type of a variable, as seen from the body of function (None for the top level)"""
+        return self.variables.get(self._key(name, function)) or "Object"
+
+    def parameter_types(self, function: str) -> List[str]:
+        """Java types of a function's parameters"""
+        return [self.variable_type(name, function) for name in self.functions[function][0]]
+
+    def return_type(self, function: str) -> str:
+        """Java result type of a function; void when it never returns a value"""
+        if function not in self.returns:
+            return "void"
+        return self.returns[function] or "Object"
+
+    def expression_type(self, node: ASTNode, function: Optional[str] = None) -> str:
+        """Java type of an expression in the body of function (None for the top level)"""
+        return self._type(node, function) or "Object"
+
+    def element_type(self, node: ArrayLiteralNode, function: Optional[str] = None) -> str:
+        """Java element type of an array literal"""
+        return self._element_type(node, function) or "Object"
+
+    def _key(self, name: str, function: Optional[str]) -> Tuple[Optional[str], str]:
+        if function is not None and name in self.functions[function][1]:
+            return function, name
+        return None, name
+
+    def _declare(self, node: ASTNode):
+        """Record the parameters and local names of the functions defined in node"""
+        if isinstance(node, FunctionDefNode):
+            names = set(node.parameters)
+            self._assigned(node.body, names)
+            self.functions[node.name] = (list(node.parameters), names)
+        for child in children(node):
+            self._declare(child)
+
+    def _assigned(self, node: ASTNode, names: Set[str]):
+        """Collect the names declared in node, outside nested functions"""
+        if isinstance(node, FunctionDefNode):
+            return
+        if isinstance(node, VariableDeclarationNode):
+            names.add(node.name)
+        for child in children(node):
+            self._assigned(child, names)
+
+    def is_global(self, name: str, function: Optional[str] = None) -> bool:
+        """Whether a name refers to a top-level variable from the body of function"""
+        return self._key(name, function)[0] is None
+
+    def _widen(self, table: Dict, key, value: ASTNode, function: Optional[str], rebuilt: bool = True):
+        """Join the type of a value into a table entry, noting whether anything changed"""
+        value_type = self._type(value, function)
+        widened = join(table.get(key), value_type, rebuilt and isinstance(value, ArrayLiteralNode))
+        if key not in table or widened != table[key]:
+            table[key] = widened
+            self._changed = True
+
+    def _visit(self, node: ASTNode, function: Optional[str]):
+        """Widen the types of everything the values in node flow into"""
+        if isinstance(node, FunctionDefNode):
+            self._visit(node.body, node.name)
+            return
+        if isinstance(node, AssignmentNode) and isinstance(node.target, IdentifierNode):
+            self._widen(self.variables, self._key(node.target.name, function), node.value, function)
+        elif isinstance(node, VariableDeclarationNode) and node.initializer is not None:
+            self._widen(self.variables, self._key(node.name, function), node.initializer, function)
+        elif isinstance(node, ReturnNode) and node.value is not None and function is not None:
+            self._widen(self.returns, function, node.value, function)
+        elif isinstance(node, FunctionCallNode) and node.name in self.functions:
+            # Arguments are passed as they are built
+            for name, argument in zip(self.functions[node.name][0], node.arguments):
+                self._widen(self.variables, (node.name, name), argument, function, rebuilt=False)
+        elif isinstance(node, IdentifierNode) and function is not None and node.name not in self.functions[function][1]:
+            self.shared.add(node.name)
+        for child in children(node):
+            self._visit(child, function)
+
+    def _type(self, node: ASTNode, function: Optional[str]) -> Optional[str]:
+        """Type of an expression from what is known so far"""
+        if isinstance(node, LiteralNode):
+            if isinstance(node.value, bool):
+                return "boolean"
+            elif isinstance(node.value, int):
+                return "int"
+            elif isinstance(node.value, float):
+                return "double"
+            elif isinstance(node.value, str):
+                return "String"
+            return "Object"
+        elif isinstance(node, IdentifierNode):
+            return self.variables.get(self._key(node.name, function))
+        elif isinstance(node, BinaryOpNode):
+            if node.operator in BOOLEAN_OPERATORS:
+                return "boolean"
+            left = self._type(node.left, function)
+            right = self._type(node.right, function)
+            if node.operator == "+" and "String" in (left, right):
+                return "String"
+            return join(left, right)
+        elif isinstance(node, UnaryOpNode):
+            if node.operator == "!":
+                return "boolean"
+            return self._type(node.operand, function)
+        elif isinstance(node, AssignmentNode):
+            return self._type(node.value, function)
+        elif isinstance(node, ArrayLiteralNode):
+            if not node.elements:
+                return "Object[]"
+            element = self._element_type(node, function)
+            return element and element + "[]"
+        elif isinstance(node, IndexNode):
+            target = self._type(node.target, function)
+            if target is None:
+                return None
+            return target[:-2] if target.endswith("[]") else "Object"
+        elif isinstance(node, FunctionCallNode) and node.name in self.functions:
+            return self.returns.get(node.name)
+        return "Object"
+
+    def _element_type(self, node: ArrayLiteralNode, function: Optional[str]) -> Optional[str]:
+        element = None
+        for item in node.elements:
+            element = join(element, self._type(item, function))
+        return element
+'''
 
     def _generate_compiler(self) -> str:
         """Generate compiler driver"""
@@ -452,7 +832,8 @@ Compiler for {name}
 Auto-generated by Illiterate Wizard
 """
 
-from lexer import Lexer
+from typing import TextIO
+from lexer import ByteLexer, Lexer
 from parser import Parser
 from codegen import CodeGenerator
 
@@ -463,18 +844,33 @@ class Compiler:
 
     def compile(self, source: str) -> str:
         """Compile source code to {target}"""
-        # Lex
+        # Lex into columns rather than one object per token
         lexer = Lexer(source)
-        tokens = lexer.tokenize()
+        tokens = lexer.tokenize_buffer()
 
         # Parse
         parser = Parser(tokens)
         ast = parser.parse()
 
         # Generate code
-        output = self.codegen.generate(ast)
+        return self.compile_ast(ast)
 
-        return output
+    def compile_ast(self, ast) -> str:
+        """Compile an already parsed program to {target}"""
+        return self.codegen.generate(ast)
+
+    def compile_to(self, ast, sink: TextIO):
+        """Compile an already parsed program to {target}, streaming the output into sink"""
+        self.codegen.generate_to(ast, sink)
+
+    def compile_stream(self, source, sink: TextIO):
+        """Compile source text, or UTF-8 source in a byte buffer, one top-level statement at a time
+
+        Each statement is generated into sink as soon as it is parsed and dropped before
+        the next one is parsed, so only the tokens and one statement's AST are in memory.
+        """
+        tokens = Lexer(source).tokenize_buffer() if isinstance(source, str) else ByteLexer(source).tokenize()
+        self.codegen.generate_statements(Parser(tokens).iter_statements(), sink)
 '''.format(name=self.spec.name, target=self.spec.target_language or "python")
 
     def _generate_main(self) -> str:
@@ -498,39 +894,117 @@ class Compiler:
         print(f"  java {{output_path.replace('.java', '')}}")
 '''
 
+        stream_check = ""
+        if target == "java":
+            stream_check = '''    if args.stream:
+        arg_parser.error("--stream is not available for Java output, whose types are inferred over the whole program")
+'''
+
+        if target == "java":
+            # Every program declares the same public class, which names its file
+            output_naming = f'''    if batch:
+        return str(Path(source_path).with_suffix("") / "{class_name}.java")
+    return "{class_name}.java"'''
+        else:
+            output_naming = f'''    return str(Path(source_path).with_suffix("{target_ext}"))'''
+
         return '''#!/usr/bin/env python3
 """
 {name} Language Compiler
 Auto-generated by Illiterate Wizard
 
-Usage: {cmd} <source_file> [-o output_file]
+Usage: {cmd} <source> [<source> ...] [-o output_file] [-j JOBS] [--force] [--no-cache] [--stream]
+       {cmd} <source> [<source> ...] --watch [--interval SECONDS] [--force]
+
+A source is a file, a directory (searched recursively for *{file_ext} files) or a
+glob pattern. A single file is always compiled. Otherwise the files are compiled
+by a pool of JOBS processes (one per CPU by default), skipping those whose output
+is at least as new as the source and was written by this compiler version unless
+--force is given, and the throughput is reported.
+
+--watch builds the sources, then polls them every --interval seconds and
+recompiles the ones whose content changed, in one process that keeps the
+compiler and the AST of every compiled file in memory.
+
+Parsed programs are cached in __astcache__ next to the source. With --stream,
+each top-level statement is instead compiled and written as soon as it is parsed,
+so the program's AST and output are never held whole; the source is still lexed
+up front, into compact token arrays. Java output, whose types are inferred over
+the whole program, cannot be streamed.
 """
 
+import argparse
+import glob
+import hashlib
+import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+from ast_cache import load_program, mapped_source, parse_source
+from ast_nodes import ProgramNode
+from codegen import COMPILER_VERSION
 from compiler import Compiler
 
+SOURCE_SUFFIX = "{file_ext}"
+
+
+def output_path_for(source_path: str, batch: bool = False) -> str:
+    """Where the output for a source file is written by default"""
+{output_naming}
 
-def compile_file(source_path: str, output_path: str = None):
-    """Compile a {name} source file to {target}"""
-    try:
-        # Read source
-        with open(source_path, 'r') as f:
-            source = f.read()
 
-        # Compile
-        compiler = Compiler()
-        output = compiler.compile(source)
+def build(source_path: str, output_path: str, use_cache: bool = True, stream: bool = False) -> int:
+    """Compile one file and write its output; returns the size of the source in bytes"""
+    if stream:
+        # Parse, compile and write one statement at a time, bypassing the AST cache
+        with mapped_source(source_path) as data:
+            write_output(Compiler(), data, output_path)
+    else:
+        # Lex and parse, or load the cached AST, then compile straight into the output file
+        write_output(Compiler(), load_program(source_path, use_cache=use_cache), output_path)
+    return os.path.getsize(source_path)
 
-        # Determine output path
-        if not output_path:
-            source_file = Path(source_path)
-            output_path = str(source_file.with_suffix("{target_ext}"))
-{extra_naming}
 
-        # Write output
-        with open(output_path, 'w') as f:
-            f.write(output)
+def write_output(compiler: Compiler, program: Union[ProgramNode, str, bytes], output_path: str):
+    """Stream a parsed program, or source to compile statement by statement, to output_path,
+    replacing the file only once it is complete"""
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    # A half written output must never look up to date
+    tmp_path = f"{{output_path}}.{{os.getpid()}}.tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            if isinstance(program, ProgramNode):
+                compiler.compile_to(program, f)
+            else:
+                compiler.compile_stream(program, f)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def is_up_to_date(source_path: str, output_path: str) -> bool:
+    """Whether the output is at least as new as the source and stamped with this compiler version"""
+    try:
+        if os.stat(output_path).st_mtime_ns < os.stat(source_path).st_mtime_ns:
+            return False
+        with open(output_path, errors="replace") as f:
+            header = f.read(512)
+    except OSError:
+        return False
+    return COMPILER_VERSION in header
+
+
+def compile_file(source_path: str, output_path: str = None, use_cache: bool = True, stream: bool = False):
+    """Compile a {name} source file to {target}"""
+    try:
+        output_path = output_path or output_path_for(source_path)
+        build(source_path, output_path, use_cache, stream)
 
         print(f"Compiled {{source_path}} -> {{output_path}}")
 {extra_instructions}
@@ -546,19 +1020,195 @@ def compile_file(source_path: str, output_path: str = None):
         sys.exit(1)
 
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: {cmd} <source_file> [-o output_file]")
-        sys.exit(1)
+def find_sources(patterns: List[str]) -> List[str]:
+    """Expand files, directories and glob patterns into source files, in order and without repeats"""
+    sources = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            sources.extend(sorted(str(path) for path in Path(pattern).rglob("*" + SOURCE_SUFFIX)))
+        elif any(char in pattern for char in "*?["):
+            sources.extend(sorted(glob.glob(pattern, recursive=True)))
+        else:
+            sources.append(pattern)
+    return list(dict.fromkeys(sources))
 
-    source_file = sys.argv[1]
-    output_file = None
 
-    # Parse arguments
-    if len(sys.argv) >= 4 and sys.argv[2] == '-o':
-        output_file = sys.argv[3]
+def _compile_job(job: Tuple[str, str, bool, bool]) -> Tuple[str, str, int, Optional[str]]:
+    """Compile one file in a worker, returning the error instead of raising it"""
+    source_path, output_path, use_cache, stream = job
+    try:
+        return source_path, output_path, build(source_path, output_path, use_cache, stream), None
+    except FileNotFoundError:
+        return source_path, output_path, 0, "Error: File not found"
+    except SyntaxError as e:
+        return source_path, output_path, 0, f"Syntax Error: {{e}}"
+    except Exception as e:
+        return source_path, output_path, 0, f"Error: {{e}}"
+
+
+def compile_many(patterns: List[str], jobs: int = None, force: bool = False, use_cache: bool = True,
+                 stream: bool = False) -> bool:
+    """Compile many files in parallel; returns whether they all compiled"""
+    start = time.perf_counter()
+    pending = []
+    skipped = 0
+    for source_path in find_sources(patterns):
+        output_path = output_path_for(source_path, batch=True)
+        if not force and is_up_to_date(source_path, output_path):
+            skipped += 1
+        else:
+            pending.append((source_path, output_path, use_cache, stream))
+
+    jobs = min(jobs or os.cpu_count() or 1, len(pending))
+    executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    if executor:
+        # Hand out several files at a time, so small files do not wait on the pool
+        results = executor.map(_compile_job, pending, chunksize=max(1, len(pending) // (jobs * 8)))
+    else:
+        results = map(_compile_job, pending)
 
-    compile_file(source_file, output_file)
+    compiled = failed = source_bytes = 0
+    try:
+        for source_path, output_path, size, error in results:
+            if error:
+                failed += 1
+                print(f"{{source_path}}: {{error}}")
+            else:
+                compiled += 1
+                source_bytes += size
+                print(f"Compiled {{source_path}} -> {{output_path}}")
+    finally:
+        if executor:
+            executor.shutdown()
+
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    print(f"{{compiled}} compiled, {{skipped}} up to date, {{failed}} failed in {{elapsed:.2f}}s "
+          f"({{compiled / elapsed:.1f}} files/s, {{source_bytes / elapsed / 1e6:.2f}} MB/s)")
+    return failed == 0
+
+
+class Watcher:
+    """Recompiles sources as they change, keeping the compiler and each file's AST in memory"""
+
+    def __init__(self, patterns: List[str], interval: float = 0.5, debounce: float = 0.2, force: bool = False):
+        self.patterns = patterns
+        self.interval = interval
+        self.debounce = debounce
+        self.force = force
+        self.compiler = Compiler()
+        # (mtime, size) of each source at the last build
+        self.stats: Dict[str, Tuple[int, int]] = {{}}
+        # sha256 and AST of each source as last compiled
+        self.programs: Dict[str, Tuple[bytes, ProgramNode]] = {{}}
+
+    def poll(self) -> Dict[str, Tuple[int, int]]:
+        """Current (mtime, size) of every source"""
+        stats = {{}}
+        for source_path in find_sources(self.patterns):
+            try:
+                stat = os.stat(source_path)
+            except OSError:
+                continue
+            stats[source_path] = (stat.st_mtime_ns, stat.st_size)
+        return stats
+
+    def step(self) -> Tuple[int, int]:
+        """Build the sources changed since the last step; returns how many compiled and failed"""
+        stats = self.poll()
+        if stats == self.stats:
+            return 0, 0
+        # Editors may save in several writes; wait until a poll sees no more of them
+        while self.debounce:
+            time.sleep(self.debounce)
+            settled = self.poll()
+            if settled == stats:
+                break
+            stats = settled
+
+        changed = [source_path for source_path, stat in stats.items() if self.stats.get(source_path) != stat]
+        for source_path in set(self.programs) - set(stats):
+            del self.programs[source_path]
+        self.stats = stats
+
+        start = time.perf_counter()
+        compiled = failed = 0
+        for source_path in changed:
+            result = self._build(source_path)
+            if result is not None:
+                compiled += result
+                failed += not result
+        if compiled or failed:
+            print(f"{{compiled}} compiled, {{failed}} failed in {{time.perf_counter() - start:.2f}}s")
+        return compiled, failed
+
+    def run(self):
+        """Build, then keep rebuilding changed sources until interrupted"""
+        try:
+            self.step()
+            print(f"Watching {{len(self.stats)}} files for changes (Ctrl+C to stop)")
+            while True:
+                time.sleep(self.interval)
+                self.step()
+        except KeyboardInterrupt:
+            print("\\nStopped watching")
+
+    def _build(self, source_path: str) -> Optional[bool]:
+        """Compile one source unless its content is unchanged; None when nothing was done"""
+        output_path = output_path_for(source_path, batch=True)
+        known = self.programs.get(source_path)
+        if known is None and not self.force and is_up_to_date(source_path, output_path):
+            return None
+        try:
+            with open(source_path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        digest = hashlib.sha256(data).digest()
+        if known is not None and known[0] == digest and os.path.exists(output_path):
+            return None
+
+        try:
+            # A file touched without being edited keeps its AST
+            ast = known[1] if known is not None and known[0] == digest else parse_source(data)
+            write_output(self.compiler, ast, output_path)
+        except SyntaxError as e:
+            print(f"{{source_path}}: Syntax Error: {{e}}")
+            return False
+        except Exception as e:
+            print(f"{{source_path}}: Error: {{e}}")
+            return False
+        self.programs[source_path] = (digest, ast)
+        print(f"Compiled {{source_path}} -> {{output_path}}")
+        return True
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="{name} compiler")
+    arg_parser.add_argument("sources", nargs="+", metavar="source", help="source files, directories or glob patterns")
+    arg_parser.add_argument("-o", dest="output_file", help="output file, when compiling a single source file")
+    arg_parser.add_argument("-j", "--jobs", type=int, help="number of compiler processes (default: one per CPU)")
+    arg_parser.add_argument("--force", action="store_true", help="also compile files whose output is up to date")
+    arg_parser.add_argument("--no-cache", action="store_true", help="always re-parse instead of using cached ASTs")
+    arg_parser.add_argument("--stream", action="store_true",
+                            help="compile and write each statement as soon as it is parsed, without the AST cache")
+    arg_parser.add_argument("--watch", action="store_true", help="keep recompiling sources as they change")
+    arg_parser.add_argument("--interval", type=float, default=0.5, help="seconds between polls in watch mode")
+    args = arg_parser.parse_args()
+
+    sources = args.sources
+{stream_check}    if args.watch:
+        if args.output_file or args.stream:
+            arg_parser.error("-o and --stream cannot be used with --watch")
+        Watcher(sources, interval=args.interval, force=args.force).run()
+        return
+    if len(sources) == 1 and not os.path.isdir(sources[0]) and find_sources(sources) == sources:
+        compile_file(sources[0], args.output_file, use_cache=not args.no_cache, stream=args.stream)
+        return
+    if args.output_file:
+        arg_parser.error("-o needs a single source file")
+    if not compile_many(sources, jobs=args.jobs, force=args.force, use_cache=not args.no_cache,
+                        stream=args.stream):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -566,12 +1216,11 @@ if __name__ == "__main__":
 '''.format(
             name=self.spec.name,
             target=target,
-            target_ext=target_ext,
+            file_ext=self.spec.file_extension,
             cmd=f"python {self.spec.name.lower()}.py",
-            extra_naming=f'''            # For Java, use class name
-            if "{target}" == "java":
-                output_path = "{class_name}.java"''' if target == "java" else "",
-            extra_instructions=extra_instructions
+            output_naming=output_naming,
+            extra_instructions=extra_instructions,
+            stream_check=stream_check
         )
 
     def _generate_java_compile_instructions(self) -> str:
@@ -627,7 +1276,10 @@ java {class_name}
 
 ## Notes
 
-- The generated Java code uses automatic type inference from literals
-- Functions are not supported in the MVP (coming in future versions)
-- All code runs in the `main` method
+- Variable, parameter and return types are inferred over the whole program, so numbers
+  and booleans use `int`, `double` and `boolean` wherever every value fits
+- Top-level code runs in the `main` method; each function becomes a `private static` method,
+  and top-level variables that functions use become `private static` fields
+- When compiling several files at once, each program is written to
+  `<source name>/{class_name}.java` beside its source, since they all declare `{class_name}`
 '''
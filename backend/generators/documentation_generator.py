@@ -73,10 +73,12 @@ No installation required! This is a standalone {impl_type} written in Python.
 {run_cmd}
 ```
 
+{self._format_runner_options(run_cmd)}
 {"### Compiling" if self.spec.language_type == "compiled" else ""}
 {"```bash" if self.spec.language_type == "compiled" else ""}
 {run_cmd + " program" + self.spec.file_extension + " -o output.py" if self.spec.language_type == "compiled" else ""}
 {"```" if self.spec.language_type == "compiled" else ""}
+{self._format_compiler_options(run_cmd)}
 
 ## Quick Start
 
@@ -144,13 +146,107 @@ This language implementation was auto-generated by Illiterate Wizard.
             lines.append(f"- `{op.symbol}` - {op.operation_type} (precedence: {op.precedence}, {op.associativity})")
         return "\n".join(lines)
 
+    def _format_compiler_options(self, run_cmd: str) -> str:
+        """Format the multi-file options of the generated compiler"""
+        if self.spec.language_type != "compiled":
+            return ""
+
+        ext = self.spec.file_extension
+        return f'''
+### Compiling Many Files
+
+Pass several files, a directory (searched recursively for `*{ext}` files) or a glob pattern to
+compile them in parallel, one process per CPU unless `-j JOBS` says otherwise. Files whose output
+is newer than the source and was written by the same compiler version are skipped; `--force`
+recompiles them. A summary line reports how many files were compiled, skipped and failed, and
+the throughput in files and megabytes per second.
+
+```bash
+{run_cmd} src/ -j 8
+{run_cmd} "src/**/*{ext}" --force
+```
+
+With `--watch`, the compiler stays running and polls the sources every `--interval` seconds
+(0.5 by default), recompiling each file whose content changed once its writes have settled.
+
+```bash
+{run_cmd} src/ --watch
+```
+
+For very large files, `--stream` compiles and writes each top-level statement as soon as it is
+parsed, so neither the whole AST nor the whole output is kept in memory. The source is still
+lexed up front into compact token arrays. Streamed builds do not use the AST cache, and Java
+output cannot be streamed because its types are inferred over the whole program.
+
+```bash
+{run_cmd} huge{ext} --stream
+```
+'''
+
+    def _format_runner_options(self, run_cmd: str) -> str:
+        """Format the command-line options of the generated runner"""
+        if self.spec.language_type != "interpreted":
+            return ""
+
+        program = f"program{self.spec.file_extension}"
+        return f'''### Execution Limits
+
+Untrusted programs can be run with a step, wall-time (seconds) or memory (bytes) budget.
+A program that exceeds its budget stops with exit status 3. Time and memory are checked every
+1024 steps, so a single large allocation can overshoot the memory budget before it is caught,
+and `--max-memory` traces every allocation, which slows the whole run down.
+
+```bash
+{run_cmd} {program} --max-steps 1000000 --max-time 5 --max-memory 50000000
+```
+
+### Profiling
+
+`--profile` records call counts and cumulative/self time per function and per source line.
+It writes a report to `{program}.profile.txt` and collapsed stacks to `{program}.folded`,
+which flame graph tools such as `flamegraph.pl` read directly.
+
+```bash
+{run_cmd} {program} --profile
+```
+
+For long-running programs, `--sample` takes a statistical sample of the running program every
+`--sample-interval` milliseconds (10 by default) instead. Its overhead is low enough to leave it on,
+and it writes `{program}.samples.txt` and `{program}.samples.folded` on exit.
+
+```bash
+{run_cmd} {program} --sample --sample-interval 5
+```
+
+### Debugging
+
+`--trace` prints each source line as it runs, `--watch NAME` prints every change to a variable and
+`--break LINE` stops at a line with a prompt (`c`ontinue, `s`tep, `p`rint NAME, `w`atch NAME,
+`b`reak LINE, `q`uit). Programs run without these options are not slowed down by the debugger.
+
+```bash
+{run_cmd} {program} --break 3 --watch total
+```
+
+### Parse Cache
+
+Parsed programs are cached in `__astcache__/` next to the source, so unchanged files are not
+lexed and parsed again. Entries are discarded when the source or the generated parser changes.
+Use `--cache-dir DIR` to keep them elsewhere or `--no-cache` to always re-parse.
+'''
+
     def _format_builtins(self) -> str:
         """Format built-in functions"""
         builtins = ["- `print(...)`  - Print values to output",
                     "- `input(prompt)` - Read input from user",
                     "- `str(value)` - Convert to string",
                     "- `int(value)` - Convert to integer",
-                    "- `float(value)` - Convert to float"]
+                    "- `float(value)` - Convert to float",
+                    "- `len(value)` - Length of a string or array",
+                    "- `sum(array)` - Sum of all elements",
+                    "- `map(function, array)` - Apply a function to every element",
+                    "- `range(start, stop, step)` - Array of integers",
+                    "- `sort(array)` - Sorted copy of an array"]
 
         if self.spec.builtin_functions:
             for func in self.spec.builtin_functions:
@@ -0,0 +1,463 @@
+"""
+Grammar model built from the EBNF patterns of GrammarRule
+
+Patterns are written in a small EBNF dialect:
+
+    'if' or "if"     a keyword, operator or punctuation symbol of the language
+    IDENTIFIER       a token type (IDENTIFIER, INTEGER, FLOAT, STRING, ...)
+    statement        another grammar rule; `expression` is the built-in expression
+                     parser unless the spec defines its own `expression` rule
+    ( a | b )        grouping and alternatives
+    a* a+ a?         repetition and optional items; [ a ] and { a } also work
+
+Rules are translated to plain BNF productions, with a generated helper rule for
+every group and repetition, and the FIRST/FOLLOW sets and LL(1) table are
+computed from those productions. Left-recursive rules are kept for the LALR(1)
+tables in generators/lalr.py but rule out the LL(1) parser.
+"""
+
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple, Union
+
+from models.language_spec import GrammarRule
+
+
+class GrammarError(ValueError):
+    """A grammar rule pattern could not be parsed"""
+
+
+@dataclass(frozen=True)
+class Terminal:
+    """A token, named by its TokenType member"""
+    name: str
+
+
+@dataclass(frozen=True)
+class NonTerminal:
+    """A reference to another grammar rule"""
+    name: str
+
+
+@dataclass(frozen=True)
+class Expression:
+    """The generated parser's built-in expression parser"""
+    name: str = "expression"
+
+
+@dataclass(frozen=True)
+class Sequence:
+    items: Tuple["Pattern", ...]
+
+
+@dataclass(frozen=True)
+class Choice:
+    options: Tuple["Pattern", ...]
+
+
+@dataclass(frozen=True)
+class Repeat:
+    item: "Pattern"
+    kind: str  # '*', '+' or '?'
+
+
+Pattern = Union[Terminal, NonTerminal, Expression, Sequence, Choice, Repeat]
+Symbol = Union[Terminal, NonTerminal, Expression]
+
+# Pseudo-terminal for the end of input
+END = Terminal("EOF")
+
+_PATTERN_TOKEN = re.compile(r"""\s*(?:('(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")|([A-Za-z_][A-Za-z0-9_]*)|([()\[\]{}|*+?]))""")
+
+_CLOSING = {'(': ')', '[': ']', '{': '}'}
+
+
+def tokenize_pattern(pattern: str) -> List[str]:
+    """Split an EBNF pattern into literals, names and punctuation"""
+    tokens = []
+    pos = 0
+    while pos < len(pattern):
+        if pattern[pos:].strip() == "":
+            break
+        match = _PATTERN_TOKEN.match(pattern, pos)
+        if not match:
+            raise GrammarError(f"Unexpected {pattern[pos:].strip()[0]!r} in pattern {pattern!r}")
+        tokens.append(match.group(match.lastindex))
+        pos = match.end()
+    return tokens
+
+
+class _PatternParser:
+    """Recursive descent parser for one EBNF pattern"""
+
+    def __init__(self, pattern: str, literals: Dict[str, str], token_names: Set[str]):
+        self.pattern = pattern
+        self.tokens = tokenize_pattern(pattern)
+        self.pos = 0
+        self.literals = literals
+        self.token_names = token_names
+
+    def parse(self) -> Pattern:
+        result = self._choice()
+        if self.pos < len(self.tokens):
+            raise GrammarError(f"Unexpected {self.tokens[self.pos]!r} in pattern {self.pattern!r}")
+        return result
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _choice(self) -> Pattern:
+        options = [self._sequence()]
+        while self._peek() == '|':
+            self.pos += 1
+            options.append(self._sequence())
+        return options[0] if len(options) == 1 else Choice(tuple(options))
+
+    def _sequence(self) -> Pattern:
+        items = []
+        while self._peek() not in (None, '|', ')', ']', '}'):
+            items.append(self._postfix())
+        return items[0] if len(items) == 1 else Sequence(tuple(items))
+
+    def _postfix(self) -> Pattern:
+        item = self._atom()
+        while self._peek() in ('*', '+', '?'):
+            item = Repeat(item, self.tokens[self.pos])
+            self.pos += 1
+        return item
+
+    def _atom(self) -> Pattern:
+        token = self._peek()
+        if token is None or token in ('*', '+', '?'):
+            raise GrammarError(f"Expected a symbol in pattern {self.pattern!r}")
+        self.pos += 1
+
+        if token in _CLOSING:
+            inner = self._choice()
+            if self._peek() != _CLOSING[token]:
+                raise GrammarError(f"Missing {_CLOSING[token]!r} in pattern {self.pattern!r}")
+            self.pos += 1
+            if token == '[':
+                return Repeat(inner, '?')
+            if token == '{':
+                return Repeat(inner, '*')
+            return inner
+
+        if token[0] in "'\"":
+            text = re.sub(r"\\(.)", r"\1", token[1:-1])
+            if text not in self.literals:
+                raise GrammarError(f"{text!r} is not a keyword, operator or symbol of the language")
+            return Terminal(self.literals[text])
+
+        if token.isupper():
+            if token not in self.token_names:
+                raise GrammarError(f"Unknown token type {token}")
+            return Terminal(token)
+
+        return NonTerminal(token)
+
+
+@dataclass
+class Production:
+    """lhs -> rhs, one alternative of a BNF rule"""
+    lhs: str
+    rhs: Tuple[Symbol, ...]
+
+    def __str__(self) -> str:
+        return f"{self.lhs} -> {' '.join(_symbol_text(s) for s in self.rhs) or 'ε'}"
+
+
+@dataclass
+class Conflict:
+    """Two productions of a rule predicted by the same token"""
+    rule: str
+    token: str
+    chosen: Production
+    rejected: Production
+
+    def __str__(self) -> str:
+        return (f"LL(1) conflict in {self.rule} on {self.token}: "
+                f"using '{self.chosen}' over '{self.rejected}'")
+
+
+def _symbol_text(symbol: Symbol) -> str:
+    return symbol.name
+
+
+class Grammar:
+    """BNF productions, FIRST/FOLLOW sets and LL(1) table for a set of grammar rules.
+
+    `literals` maps the text of quoted terminals to token names, `token_names` lists
+    every token type and `expression_first` the tokens that can start an expression.
+    Rules that fail to parse or refer to undefined rules are left out and listed in
+    `errors`, along with the rules that depend on them.
+
+    The statement forms (`roots`) are the rules no other rule refers to, plus the first
+    rule defined in each cycle of rules that only refer to each other, such as
+    `stmt -> block -> stmt`.
+    """
+
+    # Synthetic rule choosing between the user's statement forms and an expression statement
+    STATEMENT = "statement'"
+
+    def __init__(self, rules: List[GrammarRule], literals: Dict[str, str],
+                 token_names: Set[str], expression_first: Set[str]):
+        self.expression_first = frozenset(expression_first)
+        self.token_names = frozenset(token_names)
+        self.errors: List[str] = []
+        self.roots: List[str] = []
+        self.patterns: Dict[str, Pattern] = {}
+        for rule in rules:
+            if rule.name in self.patterns:
+                self.errors.append(f"{rule.name}: defined more than once")
+                continue
+            try:
+                self.patterns[rule.name] = _PatternParser(rule.pattern, literals, token_names).parse()
+            except GrammarError as e:
+                self.errors.append(f"{rule.name}: {e}")
+
+        # Drop statement forms that can match nothing; the statement loop would never advance
+        while True:
+            self._resolve_references()
+            self._build_productions()
+            self.nullable = self._compute_nullable()
+            self.left_recursive = self._left_recursive_rules()
+            unusable = {name: "can match empty input" for name in self.roots if name in self.nullable}
+            if not unusable:
+                break
+            for name, problem in unusable.items():
+                self.errors.append(f"{name}: {problem}")
+                del self.patterns[name]
+
+        if rules and not self.roots:
+            self.errors.append("no statement forms remain, so the grammar rules are not used")
+
+        self.first = self._compute_first()
+        self.follow = self._compute_follow()
+        self.table, self.conflicts = self._build_table()
+
+    def _statement_forms(self) -> List[str]:
+        """Rules not used by any other rule, then the first rule of each cycle those do not reach"""
+        referenced = {ref for name, pattern in self.patterns.items() for ref in references(pattern) if ref != name}
+        roots: List[str] = []
+        reached: Set[str] = set()
+        for name in [name for name in self.patterns if name not in referenced] + list(self.patterns):
+            if name in reached:
+                continue
+            roots.append(name)
+            stack = [name]
+            while stack:
+                current = stack.pop()
+                if current not in reached:
+                    reached.add(current)
+                    stack.extend(ref for ref in references(self.patterns[current]) if ref in self.patterns)
+        return roots
+
+    def _build_productions(self):
+        self.roots = self._statement_forms()
+
+        self.productions: List[Production] = []
+        self._helper_counts: Dict[str, int] = {}
+        for name, pattern in self.patterns.items():
+            self._add_rule(name, pattern)
+        statement = [Production(self.STATEMENT, (NonTerminal(name),)) for name in self.roots]
+        statement.append(Production(self.STATEMENT, (Expression(),)))
+        self.productions = statement + self.productions
+        self.rules: Dict[str, List[Production]] = {}
+        for production in self.productions:
+            self.rules.setdefault(production.lhs, []).append(production)
+
+    def _left_recursive_rules(self) -> List[str]:
+        """Rules that can derive themselves without consuming a token, which LL(1) cannot parse"""
+        left_recursive: List[str] = []
+        # A rule can start with the rules reachable through a nullable prefix of its productions
+        starts: Dict[str, Set[str]] = {name: set() for name in self.rules}
+        for production in self.productions:
+            for symbol in production.rhs:
+                if not isinstance(symbol, NonTerminal):
+                    break
+                starts[production.lhs].add(symbol.name)
+                if symbol.name not in self.nullable:
+                    break
+        for name in self.rules:
+            seen, stack = set(), list(starts[name])
+            while stack:
+                current = stack.pop()
+                if current == name:
+                    owner = name.split('#')[0]
+                    if owner not in left_recursive:
+                        left_recursive.append(owner)
+                    break
+                if current not in seen:
+                    seen.add(current)
+                    stack.extend(starts[current])
+        return left_recursive
+
+    def _resolve_references(self):
+        """Turn references to undefined rules into errors and drop the rules that use them"""
+        builtin = {Expression().name}
+        changed = True
+        while changed:
+            changed = False
+            for name, pattern in list(self.patterns.items()):
+                missing = sorted(ref for ref in references(pattern)
+                                 if ref not in self.patterns and ref not in builtin)
+                if missing:
+                    self.errors.append(f"{name}: refers to undefined rule {missing[0]}")
+                    del self.patterns[name]
+                    changed = True
+        for name, pattern in self.patterns.items():
+            if Expression().name not in self.patterns:
+                self.patterns[name] = _bind_expression(pattern)
+
+    def _add_rule(self, name: str, pattern: Pattern):
+        for alternative in (pattern.options if isinstance(pattern, Choice) else (pattern,)):
+            self.productions.append(Production(name, self._flatten(name, alternative)))
+
+    def _flatten(self, rule: str, pattern: Pattern) -> Tuple[Symbol, ...]:
+        """Symbols of one alternative, with groups and repetitions moved into helper rules"""
+        if isinstance(pattern, (Terminal, NonTerminal, Expression)):
+            return (pattern,)
+        if isinstance(pattern, Sequence):
+            return tuple(symbol for item in pattern.items for symbol in self._flatten(rule, item))
+        if isinstance(pattern, Choice):
+            return (self._helper(rule, pattern),)
+        # Repeat
+        if pattern.kind == '+':
+            return self._flatten(rule, pattern.item) + (self._helper(rule, Repeat(pattern.item, '*')),)
+        return (self._helper(rule, pattern),)
+
+    def _helper(self, rule: str, pattern: Pattern) -> NonTerminal:
+        """Add a helper rule for a group, optional item or repetition"""
+        self._helper_counts[rule] = self._helper_counts.get(rule, 0) + 1
+        helper = NonTerminal(f"{rule}#{self._helper_counts[rule]}")
+        if isinstance(pattern, Choice):
+            self._add_rule(helper.name, pattern)
+        elif pattern.kind == '?':
+            self._add_rule(helper.name, pattern.item)
+            self.productions.append(Production(helper.name, ()))
+        else:  # '*': helper -> item helper | ε
+            for alternative in (pattern.item.options if isinstance(pattern.item, Choice) else (pattern.item,)):
+                self.productions.append(Production(helper.name, self._flatten(helper.name, alternative) + (helper,)))
+            self.productions.append(Production(helper.name, ()))
+        return helper
+
+    def _first_of(self, symbols: Tuple[Symbol, ...]) -> Tuple[FrozenSet[str], bool]:
+        """FIRST set of a symbol string and whether it can derive ε"""
+        result: Set[str] = set()
+        for symbol in symbols:
+            if isinstance(symbol, Terminal):
+                result.add(symbol.name)
+                return frozenset(result), False
+            if isinstance(symbol, Expression):
+                result |= self.expression_first
+                return frozenset(result), False
+            result |= self.first.get(symbol.name, frozenset())
+            if symbol.name not in self.nullable:
+                return frozenset(result), False
+        return frozenset(result), True
+
+    def _compute_nullable(self) -> Set[str]:
+        nullable: Set[str] = set()
+        changed = True
+        while changed:
+            changed = False
+            for production in self.productions:
+                if production.lhs not in nullable and all(
+                        isinstance(s, NonTerminal) and s.name in nullable for s in production.rhs):
+                    nullable.add(production.lhs)
+                    changed = True
+        return nullable
+
+    def _compute_first(self) -> Dict[str, FrozenSet[str]]:
+        self.first: Dict[str, FrozenSet[str]] = {name: frozenset() for name in self.rules}
+        changed = True
+        while changed:
+            changed = False
+            for production in self.productions:
+                first, _ = self._first_of(production.rhs)
+                if not first <= self.first[production.lhs]:
+                    self.first[production.lhs] |= first
+                    changed = True
+        return self.first
+
+    def _compute_follow(self) -> Dict[str, FrozenSet[str]]:
+        # Statements are not separated, so any token can follow one
+        follow = {name: set() for name in self.rules}
+        follow[self.STATEMENT] = set(self.token_names) | {END.name}
+        changed = True
+        while changed:
+            changed = False
+            for production in self.productions:
+                for i, symbol in enumerate(production.rhs):
+                    if not isinstance(symbol, NonTerminal):
+                        continue
+                    first, nullable = self._first_of(production.rhs[i + 1:])
+                    before = len(follow[symbol.name])
+                    follow[symbol.name] |= first
+                    if nullable:
+                        follow[symbol.name] |= follow[production.lhs]
+                    changed |= len(follow[symbol.name]) != before
+        return {name: frozenset(tokens) for name, tokens in follow.items()}
+
+    def _build_table(self) -> Tuple[Dict[str, Dict[str, int]], List[Conflict]]:
+        """Predict a production for each (rule, token); on a conflict the earlier production wins"""
+        table: Dict[str, Dict[str, int]] = {name: {} for name in self.rules}
+        conflicts: List[Conflict] = []
+        for index, production in enumerate(self.productions):
+            first, nullable = self._first_of(production.rhs)
+            lookahead = set(first) | (set(self.follow[production.lhs]) if nullable else set())
+            row = table[production.lhs]
+            for token in sorted(lookahead):
+                if token in row and row[token] != index:
+                    conflicts.append(Conflict(production.lhs, token, self.productions[row[token]], production))
+                else:
+                    row[token] = index
+        return table, conflicts
+
+    @property
+    def is_ll1(self) -> bool:
+        """Whether the LL(1) table predicts every rule without a conflict"""
+        return not self.conflicts and not self.left_recursive
+
+    def canonical_hash(self) -> str:
+        """Hash of the productions and token sets, independent of pattern spelling"""
+        text = "\n".join([
+            *(str(production) for production in self.productions),
+            " ".join(sorted(self.token_names)),
+            " ".join(sorted(self.expression_first)),
+        ])
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def report(self) -> List[str]:
+        """Problems found while building the grammar, for display at generation time"""
+        return (self.errors
+                + [f"{name}: is left-recursive, which needs the LALR(1) parser" for name in self.left_recursive]
+                + [str(conflict) for conflict in self.conflicts])
+
+
+def references(pattern: Pattern) -> Set[str]:
+    """Names of the rules a pattern refers to"""
+    if isinstance(pattern, NonTerminal):
+        return {pattern.name}
+    if isinstance(pattern, Sequence):
+        return set().union(*(references(item) for item in pattern.items))
+    if isinstance(pattern, Choice):
+        return set().union(*(references(option) for option in pattern.options))
+    if isinstance(pattern, Repeat):
+        return references(pattern.item)
+    return set()
+
+
+def _bind_expression(pattern: Pattern) -> Pattern:
+    """Replace references to `expression` with the built-in expression parser"""
+    if isinstance(pattern, NonTerminal) and pattern.name == Expression().name:
+        return Expression()
+    if isinstance(pattern, Sequence):
+        return Sequence(tuple(_bind_expression(item) for item in pattern.items))
+    if isinstance(pattern, Choice):
+        return Choice(tuple(_bind_expression(option) for option in pattern.options))
+    if isinstance(pattern, Repeat):
+        return Repeat(_bind_expression(pattern.item), pattern.kind)
+    return pattern
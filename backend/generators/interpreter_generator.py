@@ -1,6 +1,37 @@
+import ast
+import builtins
+import keyword
+import textwrap
 from pathlib import Path
-from typing import List
-from models.language_spec import LanguageSpecification
+from typing import Dict, List
+from models.language_spec import BuiltinFunction, LanguageSpecification, Operator
+
+
+# Runtime fallbacks for operators the generated interpreter knows natively
+STANDARD_BINARY_OPS = {
+    '+': 'operator.add',
+    '-': 'operator.sub',
+    '*': 'operator.mul',
+    '/': 'operator.truediv',
+    '%': 'operator.mod',
+    '==': 'operator.eq',
+    '!=': 'operator.ne',
+    '<': 'operator.lt',
+    '>': 'operator.gt',
+    '<=': 'operator.le',
+    '>=': 'operator.ge',
+    '&&': '_logical_and',
+    '||': '_logical_or',
+}
+
+# Python spelling of operators whose stock "a && b" style implementation is not valid Python
+PYTHON_SPELLINGS = {'&&': 'and', '||': 'or'}
+
+# Names an operator implementation may use besides its operands and Python builtins
+OPERATOR_GLOBALS = {'operator', '_is_truthy'}
+
+# Symbols the generated parser only ever produces as unary or assignment
+NON_BINARY_SYMBOLS = {'=', '!'}
 
 
 class InterpreterGenerator:
@@ -26,11 +57,23 @@ class InterpreterGenerator:
         generated_files.append(str(env_file))
 
         # Generate runtime builtins
-        builtins_file = output_dir / "builtins.py"
+        builtins_file = output_dir / "lang_builtins.py"
         with open(builtins_file, 'w') as f:
             f.write(self._generate_builtins())
         generated_files.append(str(builtins_file))
 
+        # Generate profiler
+        profiler_file = output_dir / "profiler.py"
+        with open(profiler_file, 'w') as f:
+            f.write(self._generate_profiler())
+        generated_files.append(str(profiler_file))
+
+        # Generate tracing and debugger hooks
+        debugger_file = output_dir / "debugger.py"
+        with open(debugger_file, 'w') as f:
+            f.write(self._generate_debugger())
+        generated_files.append(str(debugger_file))
+
         # Generate main runner
         main_file = output_dir / f"{self.spec.name.lower()}.py"
         with open(main_file, 'w') as f:
@@ -46,25 +89,113 @@ Interpreter for {name}
 Auto-generated by Illiterate Wizard
 """
 
-from typing import Any
+import operator
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Optional
 from ast_nodes import *
 from environment import Environment
-from builtins import create_global_environment
+from lang_builtins import Array, create_global_environment
+
+
+def _is_truthy(value: Any) -> bool:
+    """Determine truthiness of a value"""
+    if value is None or value is False:
+        return False
+    if value == 0 or value == "":
+        return False
+    return True
+
+
+def _logical_and(left: Any, right: Any) -> bool:
+    return _is_truthy(left) and _is_truthy(right)
+
+
+def _logical_or(left: Any, right: Any) -> bool:
+    return _is_truthy(left) or _is_truthy(right)
+
+
+# Binary operator dispatch table, built from each Operator.implementation
+BINARY_OPS: Dict[str, Callable[[Any, Any], Any]] = {{
+{binary_ops}
+}}
+
+
+# Budgeted interpreters check the clock and memory once per this many steps
+BUDGET_CHECK_INTERVAL = 1024
+
+
+class ExecutionBudgetExceeded(RuntimeError):
+    """Raised when a program runs past its step, time or memory budget"""
+
+    def __init__(self, resource: str, limit: float):
+        super().__init__(f"Execution budget exceeded: {{resource}} limit of {{limit}}")
+        self.resource = resource
+        self.limit = limit
 
 
 class Interpreter:
-    def __init__(self):
+    def __init__(self, max_steps: Optional[int] = None, max_seconds: Optional[float] = None,
+                 max_memory: Optional[int] = None):
         self.global_env = create_global_environment()
         self.current_env = self.global_env
 
+        # Function call-site cache counters
+        self.call_cache_hits = 0
+        self.call_cache_misses = 0
+
+        # Execution budget; max_memory is in bytes allocated while interpreting, as counted by
+        # tracemalloc. Tracing slows every allocation in the process while the program runs, and
+        # the clock and memory are only read every BUDGET_CHECK_INTERVAL steps, so the time limit
+        # and especially a single large allocation can overshoot before the budget is enforced.
+        self.max_steps = max_steps
+        self.max_seconds = max_seconds
+        self.max_memory = max_memory
+        self.steps = 0
+        self._deadline = None
+        self._memory_baseline = 0
+        self._owns_tracemalloc = False
+        self.budgeted = max_steps is not None or max_seconds is not None or max_memory is not None
+        if self.budgeted:
+            # Only budgeted interpreters pay for the accounting
+            self.evaluate = self._evaluate_budgeted
+
     def interpret(self, ast: ProgramNode):
         """Execute the AST"""
+        if self.budgeted:
+            self._start_budget()
+        # Errors propagate to the caller, which reports them
         try:
             for statement in ast.statements:
                 self.evaluate(statement)
-        except Exception as e:
-            print(f"Runtime error: {{e}}")
-            raise
+        finally:
+            if self._owns_tracemalloc:
+                tracemalloc.stop()
+                self._owns_tracemalloc = False
+
+    def _start_budget(self):
+        """Reset the step count, deadline and memory baseline"""
+        self.steps = 0
+        if self.max_seconds is not None:
+            self._deadline = time.monotonic() + self.max_seconds
+        if self.max_memory is not None:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._owns_tracemalloc = True
+            self._memory_baseline = tracemalloc.get_traced_memory()[0]
+
+    def _evaluate_budgeted(self, node: ASTNode) -> Any:
+        """Evaluate a node after charging it against the execution budget"""
+        self.steps += 1
+        if self.max_steps is not None and self.steps > self.max_steps:
+            raise ExecutionBudgetExceeded("step", self.max_steps)
+        if not self.steps % BUDGET_CHECK_INTERVAL:
+            if self._deadline is not None and time.monotonic() > self._deadline:
+                raise ExecutionBudgetExceeded("time", self.max_seconds)
+            if (self.max_memory is not None
+                    and tracemalloc.get_traced_memory()[0] - self._memory_baseline > self.max_memory):
+                raise ExecutionBudgetExceeded("memory", self.max_memory)
+        return Interpreter.evaluate(self, node)
 
     def evaluate(self, node: ASTNode) -> Any:
         """Evaluate an AST node"""
@@ -81,25 +212,40 @@ class Interpreter:
             return self.current_env.get(node.name)
 
         elif isinstance(node, BinaryOpNode):
-            left = self.evaluate(node.left)
-            right = self.evaluate(node.right)
-            return self._eval_binary_op(node.operator, left, right)
+            op_func = node.op_func
+            if op_func is None:
+                op_func = node.op_func = self._resolve_binary_op(node.operator)
+            return op_func(self.evaluate(node.left), self.evaluate(node.right))
 
         elif isinstance(node, UnaryOpNode):
             operand = self.evaluate(node.operand)
             return self._eval_unary_op(node.operator, operand)
 
+        elif isinstance(node, ArrayLiteralNode):
+            return Array([self.evaluate(element) for element in node.elements])
+
+        elif isinstance(node, IndexNode):
+            return self.evaluate(node.target)[self.evaluate(node.index)]
+
         elif isinstance(node, AssignmentNode):
             value = self.evaluate(node.value)
             if isinstance(node.target, IdentifierNode):
                 self.current_env.set(node.target.name, value)
                 return value
+            if isinstance(node.target, IndexNode):
+                container = self.evaluate(node.target.target)
+                container[self.evaluate(node.target.index)] = value
+                return value
             raise RuntimeError(f"Invalid assignment target")
 
         elif isinstance(node, FunctionCallNode):
-            func = self.current_env.get(node.name)
-            if not callable(func):
-                raise RuntimeError(f"'{{node.name}}' is not a function")
+            cache = node.call_cache
+            if cache is not None and cache[1] is self.global_env and cache[0] == self.global_env.version:
+                self.call_cache_hits += 1
+                func = cache[2]
+            else:
+                self.call_cache_misses += 1
+                func = self._lookup_function(node)
             args = [self.evaluate(arg) for arg in node.arguments]
             return func(*args)
 
@@ -184,14 +330,45 @@ class Interpreter:
             self.current_env.define(node.name, value)
             return value
 
+        elif isinstance(node, RuleNode):
+            # Statement forms from grammar rules evaluate their parts in order
+            result = None
+            for child in node.children:
+                if isinstance(child, ASTNode):
+                    result = self.evaluate(child)
+            return result
+
         else:
             raise RuntimeError(f"Unknown node type: {{type(node).__name__}}")
 
-    def _eval_binary_op(self, op: str, left: Any, right: Any) -> Any:
-        """Evaluate binary operation"""
-        {binary_ops}
-
-        raise RuntimeError(f"Unknown operator: {{op}}")
+    def _lookup_function(self, node: FunctionCallNode) -> Callable:
+        """Resolve a call target and cache it on the call site when it is a global"""
+        func = self.current_env.get(node.name)
+        if not callable(func):
+            raise RuntimeError(f"'{{node.name}}' is not a function")
+
+        # Names never bound in a local scope always resolve to the global scope
+        scope = self.global_env
+        if node.name not in scope.local_names:
+            scope.cached_names.add(node.name)
+            node.call_cache = (scope.version, scope, func)
+        return func
+
+    def cache_stats(self) -> Dict[str, float]:
+        """Hit/miss counts for the function call-site caches"""
+        total = self.call_cache_hits + self.call_cache_misses
+        return {{
+            "hits": self.call_cache_hits,
+            "misses": self.call_cache_misses,
+            "hit_rate": self.call_cache_hits / total if total else 0.0,
+        }}
+
+    def _resolve_binary_op(self, op: str) -> Callable[[Any, Any], Any]:
+        """Look up the callable implementing a binary operator"""
+        try:
+            return BINARY_OPS[op]
+        except KeyError:
+            raise RuntimeError(f"Unknown operator: {{op}}") from None
 
     def _eval_unary_op(self, op: str, operand: Any) -> Any:
         """Evaluate unary operation"""
@@ -203,11 +380,7 @@ class Interpreter:
 
     def _is_truthy(self, value: Any) -> bool:
         """Determine truthiness of a value"""
-        if value is None or value is False:
-            return False
-        if value == 0 or value == "":
-            return False
-        return True
+        return _is_truthy(value)
 
 
 class ReturnValue(Exception):
@@ -216,44 +389,56 @@ class ReturnValue(Exception):
         self.value = value
 '''
 
-        # Generate binary operators implementation
-        binary_ops = []
-        for op in self.spec.operators:
-            if op.symbol == '+':
-                binary_ops.append("        if op == '+': return left + right")
-            elif op.symbol == '-':
-                binary_ops.append("        if op == '-': return left - right")
-            elif op.symbol == '*':
-                binary_ops.append("        if op == '*': return left * right")
-            elif op.symbol == '/':
-                binary_ops.append("        if op == '/': return left / right")
-            elif op.symbol == '%':
-                binary_ops.append("        if op == '%': return left % right")
-            elif op.symbol == '==':
-                binary_ops.append("        if op == '==': return left == right")
-            elif op.symbol == '!=':
-                binary_ops.append("        if op == '!=': return left != right")
-            elif op.symbol == '<':
-                binary_ops.append("        if op == '<': return left < right")
-            elif op.symbol == '>':
-                binary_ops.append("        if op == '>': return left > right")
-            elif op.symbol == '<=':
-                binary_ops.append("        if op == '<=': return left <= right")
-            elif op.symbol == '>=':
-                binary_ops.append("        if op == '>=': return left >= right")
-            elif op.symbol == '&&':
-                binary_ops.append("        if op == '&&': return self._is_truthy(left) and self._is_truthy(right)")
-            elif op.symbol == '||':
-                binary_ops.append("        if op == '||': return self._is_truthy(left) or self._is_truthy(right)")
-
-        if not binary_ops:
-            binary_ops = ["        pass"]
-
         return code.format(
             name=self.spec.name,
-            binary_ops="\n".join(binary_ops)
+            binary_ops="\n".join(
+                f"    {symbol!r}: {impl}," for symbol, impl in self._binary_op_table().items()
+            )
         )
 
+    def _binary_op_table(self) -> Dict[str, str]:
+        """Map each binary operator symbol to the source of its runtime callable"""
+        table = {}
+        for op in self.spec.operators:
+            if op.symbol in NON_BINARY_SYMBOLS or op.operation_type == "assignment":
+                continue
+            table[op.symbol] = self._compile_operator(op)
+        return table
+
+    def _compile_operator(self, op: Operator) -> str:
+        """Build the callable source for an operator from its implementation"""
+        fallback = STANDARD_BINARY_OPS.get(op.symbol)
+        implementation = op.implementation.strip()
+        if not implementation and fallback:
+            return fallback
+
+        try:
+            expr = ast.parse(implementation, mode="eval")
+        except SyntaxError:
+            raise ValueError(
+                f"Operator '{op.symbol}' needs a Python expression implementation, "
+                f"got {op.implementation!r}"
+            ) from None
+
+        # The stock "a + b" style implementations map straight onto the built-in callables
+        if fallback:
+            canonical = ast.parse(f"a {PYTHON_SPELLINGS.get(op.symbol, op.symbol)} b", mode="eval")
+            if ast.dump(canonical) == ast.dump(expr):
+                return fallback
+
+        loaded = {n.id for n in ast.walk(expr) if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Load)}
+        # Comprehension targets and lambda parameters are bound inside the expression
+        bound = {n.id for n in ast.walk(expr) if isinstance(n, ast.Name) and not isinstance(n.ctx, ast.Load)}
+        bound |= {n.arg for n in ast.walk(expr) if isinstance(n, ast.arg)}
+        params = ("left", "right") if {"left", "right"} & loaded and not {"a", "b"} & loaded else ("a", "b")
+        unknown = loaded - bound - set(params) - set(dir(builtins)) - OPERATOR_GLOBALS
+        if unknown:
+            raise ValueError(
+                f"Operator '{op.symbol}' implementation uses {', '.join(sorted(unknown))}; "
+                f"operands are named {' and '.join(params)}"
+            )
+        return f"lambda {', '.join(params)}: ({implementation})"
+
     def _generate_environment(self) -> str:
         """Generate environment/symbol table"""
         return '''"""
@@ -261,19 +446,36 @@ Environment for variable scoping
 Auto-generated by Illiterate Wizard
 """
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Set
 
 
 class Environment:
-    """Environment for managing variable scopes"""
+    """Environment for managing variable scopes
+
+    The global scope also holds the state of its interpreter's call-site caches, so
+    each interpreter has its own and it is freed with the interpreter.
+    """
 
     def __init__(self, parent: Optional['Environment'] = None):
         self.values: Dict[str, Any] = {}
         self.parent = parent
+        self.globals: 'Environment' = parent.globals if parent is not None else self
+        if parent is None:
+            # Call-site caches stay valid while this counter is unchanged
+            self.version = 0
+            # Names at least one call site has cached
+            self.cached_names: Set[str] = set()
+            # Names ever bound in a non-global scope; these are never cached
+            self.local_names: Set[str] = set()
 
     def define(self, name: str, value: Any):
         """Define a new variable in this scope"""
         self.values[name] = value
+        scope = self.globals
+        if self.parent is not None:
+            scope.local_names.add(name)
+        if name in scope.cached_names:
+            scope.version += 1
 
     def get(self, name: str) -> Any:
         """Get a variable value"""
@@ -287,6 +489,8 @@ class Environment:
         """Set a variable value"""
         if name in self.values:
             self.values[name] = value
+            if name in self.globals.cached_names:
+                self.globals.version += 1
             return
         if self.parent:
             self.parent.set(name, value)
@@ -309,9 +513,119 @@ Built-in functions for {name}
 Auto-generated by Illiterate Wizard
 """
 
+from array import array
+from typing import Any, Callable, Iterable, List, Optional
+
 from environment import Environment
 
+try:
+    import numpy
+except ImportError:  # NumPy is optional; the array module is always available
+    numpy = None
+
+# Element types of NumPy storage, which are handed out as Python numbers
+_NUMPY_SCALARS = (numpy.int64, numpy.float64) if numpy else ()
+
 
+def _pack(values: List[Any]):
+    """Choose unboxed storage for all-int or all-float values, a list otherwise
+
+    Mixed ints and floats stay in a list, so each element keeps its own type.
+    """
+    if values and all(type(v) is int for v in values):
+        try:
+            return (numpy.array(values, dtype=numpy.int64) if numpy else array("q", values)), "int"
+        except OverflowError:
+            return list(values), "any"
+    if values and all(type(v) is float for v in values):
+        return (numpy.array(values, dtype=numpy.float64) if numpy else array("d", values)), "float"
+    return list(values), "any"
+
+
+class Array:
+    """Runtime array value"""
+    __slots__ = ("data", "kind")
+
+    def __init__(self, values: Iterable[Any] = ()):
+        self.data, self.kind = _pack(list(values))
+
+    @classmethod
+    def wrap(cls, data, kind: str) -> "Array":
+        """Adopt already packed storage without copying it"""
+        result = cls.__new__(cls)
+        result.data = data
+        result.kind = kind
+        return result
+
+    def tolist(self) -> List[Any]:
+        return self.data.tolist() if hasattr(self.data, "tolist") else list(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __iter__(self):
+        if numpy and isinstance(self.data, numpy.ndarray):
+            # One bulk conversion instead of a NumPy scalar per element
+            return iter(self.data.tolist())
+        return iter(self.data)
+
+    def __getitem__(self, index: int) -> Any:
+        value = self.data[index]
+        return value.item() if type(value) in _NUMPY_SCALARS else value
+
+    def __setitem__(self, index: int, value: Any):
+        if self.kind == "any" or type(value) is (int if self.kind == "int" else float):
+            try:
+                self.data[index] = value
+                return
+            except OverflowError:
+                pass
+        # The value does not fit the current storage, so widen it
+        values = self.tolist()
+        values[index] = value
+        self.data, self.kind = _pack(values)
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, Array) and self.tolist() == other.tolist()
+
+    def __repr__(self) -> str:
+        return repr(self.tolist())
+
+
+def _sum(values: Array):
+    """Sum all elements in one bulk operation"""
+    data = values.data
+    if numpy and isinstance(data, numpy.ndarray):
+        # int64 sums wrap around, so use Python integers when the total might not fit
+        if values.kind == "float" or not len(data) or len(data) * max(int(data.max()), -int(data.min())) < 2 ** 63:
+            return data.sum().item()
+        return sum(data.tolist())
+    return sum(data)
+
+
+def _map(func: Callable, values: Array) -> Array:
+    """Apply func to every element"""
+    return Array(map(func, values))
+
+
+def _range(start: int, stop: Optional[int] = None, step: int = 1) -> Array:
+    """Integer array from start (inclusive) to stop (exclusive)"""
+    if stop is None:
+        start, stop = 0, start
+    if numpy:
+        return Array.wrap(numpy.arange(start, stop, step, dtype=numpy.int64), "int")
+    return Array.wrap(array("q", range(start, stop, step)), "int")
+
+
+def _sort(values: Array) -> Array:
+    """Sorted copy of an array"""
+    if numpy and isinstance(values.data, numpy.ndarray):
+        return Array.wrap(numpy.sort(values.data), values.kind)
+    if isinstance(values.data, array):
+        return Array.wrap(array(values.data.typecode, sorted(values.data)), values.kind)
+    return Array.wrap(sorted(values.data), values.kind)
+
+{builtin_impls}
 def create_global_environment() -> Environment:
     """Create global environment with built-in functions"""
     env = Environment()
@@ -324,22 +638,493 @@ def create_global_environment() -> Environment:
     env.define("float", float)
     env.define("len", len)
 
+    # Array built-ins
+    env.define("sum", _sum)
+    env.define("map", _map)
+    env.define("range", _range)
+    env.define("sort", _sort)
+
 {custom_builtins}
 
     return env
 '''
 
         # Generate custom built-in functions
+        builtin_impls = []
         custom_builtins = []
         for func in self.spec.builtin_functions:
+            builtin_impls.append(self._compile_builtin(func))
             custom_builtins.append(f"    # {func.description}")
-            custom_builtins.append(f"    # env.define('{func.name}', {func.name}_impl)")
+            custom_builtins.append(f"    env.define({func.name!r}, {func.name}_impl)")
 
         return code.format(
             name=self.spec.name,
+            builtin_impls="".join(f"\n{impl}\n" for impl in builtin_impls),
             custom_builtins="\n".join(custom_builtins) if custom_builtins else "    pass"
         )
 
+    def _compile_builtin(self, func: BuiltinFunction) -> str:
+        """Turn a BuiltinFunction implementation into a Python function definition"""
+        names = [func.name] + [param.get("name", "") for param in func.parameters]
+        for name in names:
+            if not name.isidentifier() or keyword.iskeyword(name):
+                raise ValueError(f"Built-in '{func.name}' uses invalid identifier {name!r}")
+        params = names[1:]
+
+        body = textwrap.dedent(func.implementation).strip() or "return None"
+        try:
+            tree = ast.parse(body)
+        except SyntaxError as e:
+            raise ValueError(f"Built-in '{func.name}' implementation is not valid Python: {e}") from e
+
+        # A bare expression is the return value
+        if len(tree.body) == 1 and isinstance(tree.body[0], ast.Expr):
+            body = f"return {body}"
+
+        lines = [f"def {func.name}_impl({', '.join(params)}):", f"    {repr(func.description)}"]
+        # Implementations may also read their arguments positionally
+        if any(isinstance(node, ast.Name) and node.id == "args" for node in ast.walk(tree)) and "args" not in params:
+            lines.append(f"    args = ({', '.join(params)}{',' if params else ''})")
+        lines.extend(f"    {line}" if line else "" for line in body.splitlines())
+
+        source = "\n".join(lines) + "\n"
+        try:
+            compile(source, f"<built-in {func.name}>", "exec")
+        except SyntaxError as e:
+            raise ValueError(f"Built-in '{func.name}' implementation is not valid Python: {e}") from e
+        return source
+
+    def _generate_profiler(self) -> str:
+        """Generate the deterministic and sampling profilers"""
+        return '''"""
+Profilers for the interpreter
+Auto-generated by Illiterate Wizard
+"""
+
+import sys
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from types import CodeType
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ast_nodes import ASTNode, FunctionDefNode
+from interpreter import Interpreter
+
+ROOT_FRAME = "<program>"
+
+
+@dataclass
+class FunctionStats:
+    """Timing for one user-defined function"""
+    name: str
+    line: int
+    calls: int = 0
+    cumulative: float = 0.0  # Including callees, counted once per recursion
+    self_time: float = 0.0   # Excluding callees
+
+
+@dataclass
+class LineStats:
+    """Timing for one source line"""
+    hits: int = 0
+    time: float = 0.0
+
+
+class Profiler:
+    """Records call counts and timings per function and per source line"""
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self.clock = clock
+        self.functions: Dict[str, FunctionStats] = {}
+        self.lines: Dict[int, LineStats] = defaultdict(LineStats)
+        # Self time keyed by call stack, for flame graphs
+        self.stacks: Dict[Tuple[str, ...], float] = defaultdict(float)
+
+        # Open function frames: [label, start, time spent in callees, caller's line]
+        self._frames: List[list] = [[ROOT_FRAME, clock(), 0.0, 0]]
+        self._active: Dict[str, int] = defaultdict(int)
+        self._line = 0
+        self._line_start = clock()
+
+    def attach(self, interpreter):
+        """Route the interpreter's evaluation through the profiler"""
+        evaluate = interpreter.evaluate
+
+        def profiled_evaluate(node: ASTNode) -> Any:
+            line = node.line
+            if not line or line == self._line:
+                result = evaluate(node)
+            else:
+                previous = self._switch_line(line)
+                try:
+                    result = evaluate(node)
+                finally:
+                    # Returning to a line is not a new hit
+                    self._switch_line(previous, hit=False)
+
+            if isinstance(node, FunctionDefNode):
+                func = interpreter.current_env.get(node.name)
+                interpreter.current_env.define(node.name, self.wrap(node.name, node.line, func))
+            return result
+
+        interpreter.evaluate = profiled_evaluate
+
+    def wrap(self, name: str, line: int, func: Callable) -> Callable:
+        """Wrap a user function so its calls are timed"""
+        label = f"{name}:{line}" if line else name
+        stats = self.functions.setdefault(label, FunctionStats(name, line))
+
+        def profiled(*args):
+            self._enter(label)
+            try:
+                return func(*args)
+            finally:
+                self._exit(stats)
+
+        return profiled
+
+    def finish(self):
+        """Close the program frame and the current line"""
+        self._switch_line(0)
+        label, start, child, _ = self._frames[0]
+        elapsed = self.clock() - start
+        self.stacks[(ROOT_FRAME,)] += elapsed - child
+        self._frames[0] = [ROOT_FRAME, self.clock(), 0.0, 0]
+
+    def _switch_line(self, line: int, hit: bool = True) -> int:
+        """Charge elapsed time to the current line and move to another"""
+        now = self.clock()
+        previous = self._line
+        if previous:
+            self.lines[previous].time += now - self._line_start
+        if line and hit:
+            self.lines[line].hits += 1
+        self._line = line
+        self._line_start = now
+        return previous
+
+    def _enter(self, label: str):
+        # The callee's first line is a new hit even when it is the caller's line
+        caller_line = self._switch_line(0)
+        self._frames.append([label, self.clock(), 0.0, caller_line])
+        self._active[label] += 1
+
+    def _exit(self, stats: FunctionStats):
+        label, start, child, caller_line = self._frames[-1]
+        self._switch_line(caller_line, hit=False)
+        elapsed = self.clock() - start
+        stack = tuple(frame[0] for frame in self._frames)
+        self._frames.pop()
+        self._active[label] -= 1
+
+        stats.calls += 1
+        stats.self_time += elapsed - child
+        if not self._active[label]:
+            stats.cumulative += elapsed
+        self._frames[-1][2] += elapsed
+        self.stacks[stack] += elapsed - child
+
+    def report(self) -> str:
+        """Human readable summary, slowest first"""
+        lines = ["Functions (seconds)", f"{'calls':>10} {'cumulative':>12} {'self':>12}  function"]
+        for stats in sorted(self.functions.values(), key=lambda s: s.cumulative, reverse=True):
+            location = f"{stats.name} (line {stats.line})" if stats.line else stats.name
+            lines.append(f"{stats.calls:>10} {stats.cumulative:>12.6f} {stats.self_time:>12.6f}  {location}")
+
+        lines += ["", "Lines (seconds)", f"{'line':>10} {'hits':>12} {'time':>12}"]
+        for line, stats in sorted(self.lines.items(), key=lambda item: item[1].time, reverse=True):
+            lines.append(f"{line:>10} {stats.hits:>12} {stats.time:>12.6f}")
+        return "\\n".join(lines) + "\\n"
+
+    def collapsed_stacks(self) -> str:
+        """Self time per call stack in microseconds, in the collapsed format flame graph tools read"""
+        return "".join(
+            f"{';'.join(stack)} {round(seconds * 1_000_000)}\\n"
+            for stack, seconds in sorted(self.stacks.items())
+            if seconds > 0
+        )
+
+    def write(self, prefix: str) -> Tuple[str, str]:
+        """Write the report and the collapsed stacks next to prefix"""
+        report_path = f"{prefix}.profile.txt"
+        stacks_path = f"{prefix}.folded"
+        with open(report_path, "w") as f:
+            f.write(self.report())
+        with open(stacks_path, "w") as f:
+            f.write(self.collapsed_stacks())
+        return report_path, stacks_path
+
+
+# Code objects of Interpreter.evaluate and of the closures it creates for user functions
+EVALUATE_CODE = Interpreter.evaluate.__code__
+FUNCTION_CODE = next(
+    const for const in EVALUATE_CODE.co_consts
+    if isinstance(const, CodeType) and const.co_name == "func"
+)
+
+
+class SamplingProfiler:
+    """Samples the interpreter's stack from a background thread
+
+    The interpreter is not instrumented: the sampler reads the Python frames of
+    the interpreting thread, so the only cost is the sampling itself.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.total = 0
+        self.line_samples: Dict[int, int] = defaultdict(int)
+        # Samples keyed by user function call stack, for flame graphs
+        self.stacks: Dict[Tuple[str, ...], int] = defaultdict(int)
+
+        self._thread_id: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, thread_id: Optional[int] = None):
+        """Start sampling the given thread, the calling thread by default"""
+        self._thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and wait for the sampler thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                self.sample(frame)
+
+    def sample(self, frame):
+        """Record the interpreter location of a stack of Python frames"""
+        line = 0
+        functions = []
+        while frame is not None:
+            code = frame.f_code
+            if code is FUNCTION_CODE:
+                node = frame.f_locals.get("node")
+                functions.append(f"{node.name}:{node.line}" if node.line else node.name)
+            elif code is EVALUATE_CODE and not line:
+                line = getattr(frame.f_locals.get("node"), "line", 0)
+            frame = frame.f_back
+
+        self.total += 1
+        if line:
+            self.line_samples[line] += 1
+        functions.append(ROOT_FRAME)
+        self.stacks[tuple(reversed(functions))] += 1
+
+    def report(self) -> str:
+        """Human readable summary, hottest first"""
+        total = self.total or 1
+        lines = [f"{self.total} samples every {self.interval * 1000:g} ms", "",
+                 "Lines", f"{'line':>10} {'samples':>10} {'percent':>8}"]
+        for line, count in sorted(self.line_samples.items(), key=lambda item: item[1], reverse=True):
+            lines.append(f"{line:>10} {count:>10} {100 * count / total:>7.1f}%")
+
+        inclusive: Dict[str, int] = defaultdict(int)
+        for stack, count in self.stacks.items():
+            for label in set(stack[1:]):
+                inclusive[label] += count
+        lines += ["", "Functions (inclusive)", f"{'samples':>10} {'percent':>8}  function"]
+        for label, count in sorted(inclusive.items(), key=lambda item: item[1], reverse=True):
+            lines.append(f"{count:>10} {100 * count / total:>7.1f}%  {label}")
+        return "\\n".join(lines) + "\\n"
+
+    def collapsed_stacks(self) -> str:
+        """Sample counts per call stack in the collapsed format flame graph tools read"""
+        return "".join(f"{';'.join(stack)} {count}\\n" for stack, count in sorted(self.stacks.items()))
+
+    def write(self, prefix: str) -> Tuple[str, str]:
+        """Write the report and the collapsed stacks next to prefix"""
+        report_path = f"{prefix}.samples.txt"
+        stacks_path = f"{prefix}.samples.folded"
+        with open(report_path, "w") as f:
+            f.write(self.report())
+        with open(stacks_path, "w") as f:
+            f.write(self.collapsed_stacks())
+        return report_path, stacks_path
+'''
+
+    def _generate_debugger(self) -> str:
+        """Generate tracing hooks and the console debugger"""
+        return '''"""
+Tracing and debugger hooks for the interpreter
+Auto-generated by Illiterate Wizard
+
+Attaching a Tracer swaps the interpreter's evaluate for a traced one; an
+interpreter without a tracer runs exactly the untraced code.
+"""
+
+import sys
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+from ast_nodes import ASTNode, AssignmentNode, IdentifierNode, VariableDeclarationNode
+
+# Marks a watched variable that has no value yet
+UNSET = object()
+
+
+@dataclass
+class TraceEvent:
+    """Something the traced interpreter reports to the callback"""
+    kind: str  # "line", "breakpoint", "node" or "watch"
+    node: ASTNode
+    line: int
+    name: Optional[str] = None
+    old: Any = None
+    new: Any = None
+
+
+class Tracer:
+    """Line tracing, breakpoints and variable watches through a callback"""
+
+    def __init__(self, callback: Callable[[TraceEvent, Any], None], trace_nodes: bool = False):
+        self.callback = callback
+        self.trace_nodes = trace_nodes
+        self.breakpoints: Set[int] = set()
+        self.watches: Dict[str, Any] = {}
+        self.stepping = False
+
+        self.interpreter = None
+        self._evaluate = None
+        self._had_override = False
+        self._line = 0
+
+    def add_breakpoint(self, line: int):
+        self.breakpoints.add(line)
+
+    def remove_breakpoint(self, line: int):
+        self.breakpoints.discard(line)
+
+    def watch(self, name: str):
+        """Report every change to a variable"""
+        self.watches.setdefault(name, UNSET)
+
+    def attach(self, interpreter) -> "Tracer":
+        """Install the traced evaluate on an interpreter"""
+        if self.interpreter is not None:
+            raise RuntimeError("Tracer is already attached")
+        self.interpreter = interpreter
+        self._evaluate = interpreter.evaluate
+        self._had_override = "evaluate" in vars(interpreter)
+        interpreter.evaluate = self._traced_evaluate
+        return self
+
+    def detach(self):
+        """Restore the evaluate the interpreter had before attach"""
+        if self.interpreter is None:
+            return
+        if self.interpreter.evaluate != self._traced_evaluate:
+            raise RuntimeError("Detach evaluation hooks in the reverse order they were attached")
+        if self._had_override:
+            self.interpreter.evaluate = self._evaluate
+        else:
+            # Back to the class method, exactly as before attach
+            del self.interpreter.evaluate
+        self.interpreter = None
+        self._evaluate = None
+
+    def _traced_evaluate(self, node: ASTNode) -> Any:
+        line = node.line
+        if line and line != self._line:
+            self._line = line
+            kind = "breakpoint" if self.stepping or line in self.breakpoints else "line"
+            self.callback(TraceEvent(kind, node, line), self.interpreter)
+        if self.trace_nodes:
+            self.callback(TraceEvent("node", node, line), self.interpreter)
+
+        result = self._evaluate(node)
+
+        if self.watches and isinstance(node, (AssignmentNode, VariableDeclarationNode)):
+            target = node.target if isinstance(node, AssignmentNode) else node
+            name = target.name if isinstance(target, (IdentifierNode, VariableDeclarationNode)) else None
+            if name in self.watches:
+                self._report_watch(node, name)
+        return result
+
+    def _report_watch(self, node: ASTNode, name: str):
+        old = self.watches[name]
+        new = self.interpreter.current_env.get(name)
+        if old is UNSET or old != new:
+            self.watches[name] = new
+            self.callback(TraceEvent("watch", node, node.line, name, None if old is UNSET else old, new),
+                          self.interpreter)
+
+
+class ConsoleDebugger:
+    """Tracer callback that prints trace output and prompts at breakpoints"""
+
+    def __init__(self, source: str, trace_lines: bool = False, stdin=None, stdout=None):
+        self.source_lines = source.splitlines()
+        self.trace_lines = trace_lines
+        self.stdin = stdin or sys.stdin
+        self.stdout = stdout or sys.stderr
+        self.tracer: Optional[Tracer] = None
+
+    def attach(self, interpreter, breakpoints: Iterable[int] = (), watches: Iterable[str] = ()) -> Tracer:
+        self.tracer = Tracer(self)
+        for line in breakpoints:
+            self.tracer.add_breakpoint(line)
+        for name in watches:
+            self.tracer.watch(name)
+        return self.tracer.attach(interpreter)
+
+    def __call__(self, event: TraceEvent, interpreter):
+        if event.kind == "watch":
+            self._print(f"watch {event.name}: {event.old!r} -> {event.new!r} (line {event.line})")
+        elif event.kind == "line" and self.trace_lines:
+            self._print(f"line {event.line}: {self._source(event.line)}")
+        elif event.kind == "breakpoint":
+            self._prompt(event, interpreter)
+
+    def _source(self, line: int) -> str:
+        return self.source_lines[line - 1].strip() if 0 < line <= len(self.source_lines) else ""
+
+    def _print(self, text: str):
+        print(text, file=self.stdout)
+
+    def _prompt(self, event: TraceEvent, interpreter):
+        self._print(f"break at line {event.line}: {self._source(event.line)}")
+        while True:
+            self.stdout.write("(debug) ")
+            self.stdout.flush()
+            command = self.stdin.readline()
+            if not command:
+                command = "c"
+            parts = command.split()
+            if not parts:
+                continue
+            if parts[0] in ("c", "continue"):
+                self.tracer.stepping = False
+                return
+            if parts[0] in ("s", "step"):
+                self.tracer.stepping = True
+                return
+            if parts[0] in ("p", "print") and len(parts) == 2:
+                try:
+                    self._print(repr(interpreter.current_env.get(parts[1])))
+                except NameError as e:
+                    self._print(str(e))
+            elif parts[0] in ("w", "watch") and len(parts) == 2:
+                self.tracer.watch(parts[1])
+            elif parts[0] in ("b", "break") and len(parts) == 2 and parts[1].isdigit():
+                self.tracer.add_breakpoint(int(parts[1]))
+            elif parts[0] in ("q", "quit"):
+                raise SystemExit(1)
+            else:
+                self._print("commands: c(ontinue), s(tep), p(rint) NAME, w(atch) NAME, b(reak) LINE, q(uit)")
+'''
+
     def _generate_main(self) -> str:
         """Generate main runner script"""
         return '''#!/usr/bin/env python3
@@ -347,36 +1132,67 @@ def create_global_environment() -> Environment:
 {name} Language Interpreter
 Auto-generated by Illiterate Wizard
 
-Usage: {cmd} <source_file>
+Usage: {cmd} [source_file] [--profile] [--sample [--sample-interval MS]]
+                 [--trace] [--break LINE ...] [--watch NAME ...]
+                 [--max-steps N] [--max-time SECONDS] [--max-memory BYTES]
+
+Exits with status 3 when a program exceeds its execution budget. The budget is
+checked every BUDGET_CHECK_INTERVAL steps, and --max-memory traces every
+allocation with tracemalloc, which slows the program down.
+With --profile, writes <source_file>.profile.txt and a collapsed-stack
+<source_file>.folded for flame graph tools. With --sample, a low-overhead
+sampling profiler writes <source_file>.samples.txt and .samples.folded on exit.
+--trace, --break and --watch run the program under the console debugger.
+Parsed programs are cached in __astcache__ next to the source (see --no-cache).
+--intern shares repeated names and constants in the AST, for large generated programs.
 """
 
+import argparse
 import sys
+from ast_cache import load_program, read_source
 from lexer import Lexer
 from parser import Parser
-from interpreter import Interpreter
+from interpreter import ExecutionBudgetExceeded, Interpreter
+from profiler import Profiler, SamplingProfiler
+from debugger import ConsoleDebugger
 
 
-def run_file(filepath: str):
+def run_file(filepath: str, profile: bool = False, sample_interval: float = None,
+             trace: bool = False, breakpoints=(), watches=(), use_cache: bool = True,
+             cache_dir: str = None, intern: bool = False, **budget):
     """Run a {name} source file"""
     try:
-        with open(filepath, 'r') as f:
-            source = f.read()
-
-        # Lex
-        lexer = Lexer(source)
-        tokens = lexer.tokenize()
-
-        # Parse
-        parser = Parser(tokens)
-        ast = parser.parse()
+        # Lex and parse, or load the cached AST
+        ast = load_program(filepath, cache_dir=cache_dir, use_cache=use_cache, intern=intern)
 
         # Interpret
-        interpreter = Interpreter()
-        interpreter.interpret(ast)
+        interpreter = Interpreter(**budget)
+        profiler = Profiler() if profile else None
+        if profiler:
+            profiler.attach(interpreter)
+        sampler = SamplingProfiler(sample_interval) if sample_interval else None
+        if sampler:
+            sampler.start()
+        if trace or breakpoints or watches:
+            ConsoleDebugger(read_source(filepath), trace_lines=trace).attach(interpreter, breakpoints, watches)
+        try:
+            interpreter.interpret(ast)
+        finally:
+            if profiler:
+                profiler.finish()
+                report_path, stacks_path = profiler.write(filepath)
+                print(f"Profile written to {{report_path}} and {{stacks_path}}", file=sys.stderr)
+            if sampler:
+                sampler.stop()
+                report_path, stacks_path = sampler.write(filepath)
+                print(f"Samples written to {{report_path}} and {{stacks_path}}", file=sys.stderr)
 
     except FileNotFoundError:
         print(f"Error: File '{{filepath}}' not found")
         sys.exit(1)
+    except ExecutionBudgetExceeded as e:
+        print(f"Error: {{e}}")
+        sys.exit(3)
     except SyntaxError as e:
         print(f"Syntax Error: {{e}}")
         sys.exit(1)
@@ -385,12 +1201,12 @@ def run_file(filepath: str):
         sys.exit(1)
 
 
-def repl():
+def repl(**budget):
     """Run interactive REPL"""
     print("{name} REPL v{version}")
     print("Type 'exit()' to quit")
 
-    interpreter = Interpreter()
+    interpreter = Interpreter(**budget)
 
     while True:
         try:
@@ -409,18 +1225,42 @@ def repl():
             # Interpret
             interpreter.interpret(ast)
 
-        except (SyntaxError, RuntimeError) as e:
-            print(f"Error: {{e}}")
         except (KeyboardInterrupt, EOFError):
             print("\\nGoodbye!")
             break
+        except Exception as e:
+            print(f"Error: {{e}}")
 
 
 def main():
-    if len(sys.argv) < 2:
-        repl()
+    arg_parser = argparse.ArgumentParser(description="{name} interpreter")
+    arg_parser.add_argument("source_file", nargs="?", help="program to run; starts the REPL if omitted")
+    arg_parser.add_argument("--profile", action="store_true", help="write per-function and per-line timings")
+    arg_parser.add_argument("--sample", action="store_true", help="write statistical samples of the running program")
+    arg_parser.add_argument("--sample-interval", type=float, default=10.0, help="milliseconds between samples")
+    arg_parser.add_argument("--trace", action="store_true", help="print each source line as it runs")
+    arg_parser.add_argument("--break", dest="breakpoints", type=int, action="append", default=[],
+                            metavar="LINE", help="stop at a line and open the debugger prompt")
+    arg_parser.add_argument("--watch", dest="watches", action="append", default=[],
+                            metavar="NAME", help="print every change to a variable")
+    arg_parser.add_argument("--max-steps", type=int, help="maximum number of evaluation steps")
+    arg_parser.add_argument("--max-time", type=float, help="maximum wall time in seconds")
+    arg_parser.add_argument("--max-memory", type=int,
+                            help="maximum bytes allocated while running; tracing allocations slows the program")
+    arg_parser.add_argument("--no-cache", action="store_true", help="always re-parse instead of using cached ASTs")
+    arg_parser.add_argument("--cache-dir", help="directory for cached ASTs (default: __astcache__ beside the source)")
+    arg_parser.add_argument("--intern", action="store_true",
+                            help="intern names and share identical literal and identifier nodes")
+    args = arg_parser.parse_args()
+
+    budget = dict(max_steps=args.max_steps, max_seconds=args.max_time, max_memory=args.max_memory)
+    if args.source_file:
+        sample_interval = args.sample_interval / 1000 if args.sample else None
+        run_file(args.source_file, profile=args.profile, sample_interval=sample_interval,
+                 trace=args.trace, breakpoints=args.breakpoints, watches=args.watches,
+                 use_cache=not args.no_cache, cache_dir=args.cache_dir, intern=args.intern, **budget)
     else:
-        run_file(sys.argv[1])
+        repl(**budget)
 
 
 if __name__ == "__main__":
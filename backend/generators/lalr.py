@@ -0,0 +1,341 @@
+"""
+LALR(1) parse tables for the grammar model
+
+States are the LR(0) item sets of the grammar's productions. Lookaheads are
+added with the spontaneous generation and propagation method: each kernel item
+is closed once with a placeholder lookahead to find which lookaheads it creates
+and which it passes on.
+
+The built-in expression parser is treated as one more terminal, `<expression>`.
+The generated parser shifts it by calling `_parse_expression()` when the current
+token can start an expression and the state has no action for the token itself.
+
+Tables are packed into comb vectors: each state's row is placed at an offset in
+shared `value`/`check` arrays so that its entries land on free slots, and an
+entry belongs to the row when `check[base[row] + column] == row`. Rows whose
+reductions all use one production keep that reduction as a default instead.
+"""
+
+from dataclasses import asdict, dataclass
+from typing import Dict, FrozenSet, List, Set, Tuple
+
+from .grammar import Expression, Grammar, NonTerminal, Production, Symbol
+
+# Bumped when the table layout changes, so cached tables are rebuilt
+TABLE_FORMAT = 2
+
+# Lookahead placeholder used while finding propagated lookaheads
+_PROPAGATE = "#"
+
+Item = Tuple[int, int]  # (production index, dot position)
+
+
+@dataclass
+class LRConflict:
+    """Two actions for one (state, terminal) pair"""
+    state: int
+    terminal: str
+    chosen: str
+    rejected: str
+
+    def __str__(self) -> str:
+        return (f"LALR(1) conflict in state {self.state} on {self.terminal}: "
+                f"using {self.chosen} over {self.rejected}")
+
+
+@dataclass
+class LALRTables:
+    """Packed ACTION/GOTO tables. Actions are shift s -> s + 1, reduce p -> -(p + 1), error 0."""
+    terminals: List[str]
+    nonterminals: List[str]
+    lhs: List[int]
+    lengths: List[int]
+    productions: List[str]
+    action_base: List[int]
+    action_check: List[int]
+    action_value: List[int]
+    default_reduce: List[int]
+    goto_base: List[int]
+    goto_check: List[int]
+    goto_value: List[int]
+    start_terminals: List[str]
+    state_count: int
+    conflicts: List[str]
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "LALRTables":
+        return cls(**data)
+
+    def action(self, state: int, terminal: str) -> int:
+        """Unpacked action lookup, without the default reduction"""
+        index = self.action_base[state] + self.terminals.index(terminal)
+        return self.action_value[index] if self.action_check[index] == state else 0
+
+
+class LALRBuilder:
+    """Build LALR(1) tables for the statement forms of a grammar"""
+
+    # Start rule of the automaton: one production per statement form
+    START = Grammar.STATEMENT
+
+    def __init__(self, grammar: Grammar):
+        self.grammar = grammar
+        # Column of the expression parser; not a valid rule or token name
+        self.expression = "<expression>"
+        # Every statement form is a start production; the LL(1) expression statement is not needed
+        self.productions: List[Production] = [Production(self.START, (NonTerminal(root),)) for root in grammar.roots]
+        self.productions += [p for p in grammar.productions if p.lhs != grammar.STATEMENT]
+        self.nonterminals = [self.START] + [name for name in grammar.rules if name != grammar.STATEMENT]
+        self.terminals = sorted(grammar.token_names) + [self.expression]
+        self.by_lhs: Dict[str, List[int]] = {}
+        for index, production in enumerate(self.productions):
+            self.by_lhs.setdefault(production.lhs, []).append(index)
+        self.nullable = grammar.nullable
+        self.first = self._compute_first()
+        self.conflicts: List[LRConflict] = []
+
+    def build(self) -> LALRTables:
+        states, transitions = self._lr0_states()
+        lookaheads = self._lookaheads(states, transitions)
+        actions, gotos = self._action_rows(states, transitions, lookaheads)
+        start_terminals = sorted(self.terminals[column] for column in actions[0])
+        for terminal in start_terminals:
+            if terminal in self.grammar.expression_first or terminal == self.expression:
+                self.conflicts.append(LRConflict(0, terminal, "a grammar rule statement", "an expression statement"))
+        defaults = [self._default_reduction(row) for row in actions]
+
+        action_base, action_check, action_value = _pack(actions, len(self.terminals))
+        goto_base, goto_check, goto_value = _pack(gotos, len(self.nonterminals))
+        return LALRTables(
+            terminals=self.terminals,
+            nonterminals=self.nonterminals,
+            lhs=[self.nonterminals.index(p.lhs) for p in self.productions],
+            lengths=[len(p.rhs) for p in self.productions],
+            productions=[str(p) for p in self.productions],
+            action_base=action_base,
+            action_check=action_check,
+            action_value=action_value,
+            default_reduce=defaults,
+            goto_base=goto_base,
+            goto_check=goto_check,
+            goto_value=goto_value,
+            start_terminals=start_terminals,
+            state_count=len(states),
+            conflicts=[str(conflict) for conflict in self.conflicts],
+        )
+
+    def _name(self, symbol: Symbol) -> str:
+        return self.expression if isinstance(symbol, Expression) else symbol.name
+
+    def _compute_first(self) -> Dict[str, Set[str]]:
+        """FIRST sets with `expression` as a terminal"""
+        first: Dict[str, Set[str]] = {name: set() for name in self.nonterminals}
+        changed = True
+        while changed:
+            changed = False
+            for production in self.productions:
+                symbols, _ = self._first_of(production.rhs, first)
+                if not symbols <= first[production.lhs]:
+                    first[production.lhs] |= symbols
+                    changed = True
+        return first
+
+    def _first_of(self, symbols: Tuple[Symbol, ...], first=None) -> Tuple[Set[str], bool]:
+        first = self.first if first is None else first
+        result: Set[str] = set()
+        for symbol in symbols:
+            if not isinstance(symbol, NonTerminal):
+                result.add(self._name(symbol))
+                return result, False
+            result |= first[symbol.name]
+            if symbol.name not in self.nullable:
+                return result, False
+        return result, True
+
+    def _closure(self, kernel: FrozenSet[Item]) -> Set[Item]:
+        items = set(kernel)
+        stack = list(kernel)
+        while stack:
+            production, dot = stack.pop()
+            rhs = self.productions[production].rhs
+            if dot < len(rhs) and isinstance(rhs[dot], NonTerminal):
+                for index in self.by_lhs[rhs[dot].name]:
+                    if (index, 0) not in items:
+                        items.add((index, 0))
+                        stack.append((index, 0))
+        return items
+
+    def _lr0_states(self) -> Tuple[List[FrozenSet[Item]], Dict[Tuple[int, str], int]]:
+        """Kernels of the LR(0) item sets and the transitions between them"""
+        start = frozenset((index, 0) for index in self.by_lhs[self.START])
+        states = [start]
+        numbers = {start: 0}
+        transitions: Dict[Tuple[int, str], int] = {}
+        state = 0
+        while state < len(states):
+            moves: Dict[str, Set[Item]] = {}
+            for production, dot in sorted(self._closure(states[state])):
+                rhs = self.productions[production].rhs
+                if dot < len(rhs):
+                    moves.setdefault(self._name(rhs[dot]), set()).add((production, dot + 1))
+            for symbol, items in moves.items():
+                kernel = frozenset(items)
+                if kernel not in numbers:
+                    numbers[kernel] = len(states)
+                    states.append(kernel)
+                transitions[(state, symbol)] = numbers[kernel]
+            state += 1
+        return states, transitions
+
+    def _closure1(self, item: Item) -> Set[Tuple[int, int, str]]:
+        """LR(1) closure of one kernel item with the placeholder lookahead"""
+        items = {(item[0], item[1], _PROPAGATE)}
+        stack = list(items)
+        while stack:
+            production, dot, lookahead = stack.pop()
+            rhs = self.productions[production].rhs
+            if dot < len(rhs) and isinstance(rhs[dot], NonTerminal):
+                first, nullable = self._first_of(rhs[dot + 1:])
+                if nullable:
+                    first = first | {lookahead}
+                for index in self.by_lhs[rhs[dot].name]:
+                    for terminal in first:
+                        if (index, 0, terminal) not in items:
+                            items.add((index, 0, terminal))
+                            stack.append((index, 0, terminal))
+        return items
+
+    def _lookaheads(self, states, transitions) -> List[Dict[Item, Set[str]]]:
+        lookaheads: List[Dict[Item, Set[str]]] = [{item: set() for item in kernel} for kernel in states]
+        # Statements are not separated, so any terminal can follow one
+        for item in states[0]:
+            lookaheads[0][item] |= set(self.terminals)
+
+        propagate: Dict[Tuple[int, Item], List[Tuple[int, Item]]] = {}
+        for state, kernel in enumerate(states):
+            for item in kernel:
+                for production, dot, lookahead in self._closure1(item):
+                    rhs = self.productions[production].rhs
+                    if dot == len(rhs):
+                        continue
+                    target = (transitions[(state, self._name(rhs[dot]))], (production, dot + 1))
+                    if lookahead == _PROPAGATE:
+                        propagate.setdefault((state, item), []).append(target)
+                    else:
+                        lookaheads[target[0]][target[1]].add(lookahead)
+
+        changed = True
+        while changed:
+            changed = False
+            for (state, item), targets in propagate.items():
+                source = lookaheads[state][item]
+                for target_state, target_item in targets:
+                    target = lookaheads[target_state][target_item]
+                    if not source <= target:
+                        target |= source
+                        changed = True
+        return lookaheads
+
+    def _action_rows(self, states, transitions, lookaheads) -> Tuple[List[Dict[int, int]], List[Dict[int, int]]]:
+        """ACTION and GOTO rows by column; shifts win over reductions, earlier productions over later"""
+        terminal_ids = {name: i for i, name in enumerate(self.terminals)}
+        nonterminal_ids = {name: i for i, name in enumerate(self.nonterminals)}
+        actions: List[Dict[int, int]] = [{} for _ in states]
+        gotos: List[Dict[int, int]] = [{} for _ in states]
+        for (state, symbol), target in transitions.items():
+            if symbol in terminal_ids:
+                actions[state][terminal_ids[symbol]] = target + 1
+            else:
+                gotos[state][nonterminal_ids[symbol]] = target
+
+        for state, kernel in enumerate(states):
+            reductions: Dict[Item, Set[str]] = {}
+            for production, dot in self._closure(kernel):
+                if dot != len(self.productions[production].rhs):
+                    continue
+                if (production, dot) in kernel:
+                    reductions[(production, dot)] = lookaheads[state][(production, dot)]
+                else:
+                    # Empty productions added by the closure take their lookaheads from the kernel
+                    reductions[(production, dot)] = self._closure_lookaheads(kernel, lookaheads[state], production)
+            for (production, _), terminals in sorted(reductions.items()):
+                for terminal in sorted(terminals):
+                    self._add_reduction(state, actions[state], terminal_ids[terminal], production)
+            self._check_expression(state, actions[state], terminal_ids)
+        return actions, gotos
+
+    def _closure_lookaheads(self, kernel, kernel_lookaheads, production) -> Set[str]:
+        result: Set[str] = set()
+        for item in kernel:
+            for index, dot, lookahead in self._closure1(item):
+                if index == production and dot == 0:
+                    result |= kernel_lookaheads[item] if lookahead == _PROPAGATE else {lookahead}
+        return result
+
+    def _add_reduction(self, state: int, row: Dict[int, int], column: int, production: int):
+        existing = row.get(column)
+        if existing is None:
+            row[column] = -(production + 1)
+            return
+        if existing == -(production + 1):
+            return
+        terminal = self.terminals[column]
+        reduce = f"reduce by {self.productions[production]}"
+        if existing > 0:
+            self.conflicts.append(LRConflict(state, terminal, "shift", reduce))
+        else:
+            chosen = f"reduce by {self.productions[-existing - 1]}"
+            self.conflicts.append(LRConflict(state, terminal, chosen, reduce))
+
+    def _check_expression(self, state: int, row: Dict[int, int], terminal_ids: Dict[str, int]):
+        """A token's own action hides the expression action for tokens that start an expression"""
+        expression = row.get(terminal_ids[self.expression])
+        if expression is None:
+            return
+        for terminal in sorted(self.grammar.expression_first):
+            action = row.get(terminal_ids[terminal])
+            if action is not None and action != expression:
+                self.conflicts.append(LRConflict(state, terminal, terminal, self.expression))
+
+    def _default_reduction(self, row: Dict[int, int]) -> int:
+        """Move the reductions of a row that all use one production out of the row"""
+        reductions = {action for action in row.values() if action < 0}
+        if len(reductions) != 1:
+            return 0
+        default = reductions.pop()
+        expression = row.get(self.terminals.index(self.expression), default)
+        for column, action in list(row.items()):
+            # Tokens that start an expression must not fall through to an expression shift
+            if action == default and (expression == default
+                                      or self.terminals[column] not in self.grammar.expression_first):
+                del row[column]
+        return default
+
+
+def _pack(rows: List[Dict[int, int]], width: int) -> Tuple[List[int], List[int], List[int]]:
+    """Pack sparse rows into comb vectors, densest rows first"""
+    base = [0] * len(rows)
+    check: List[int] = []
+    value: List[int] = []
+    for row in sorted(range(len(rows)), key=lambda r: -len(rows[r])):
+        columns = sorted(rows[row])
+        offset = 0
+        while any(offset + c < len(check) and check[offset + c] != -1 for c in columns):
+            offset += 1
+        base[row] = offset
+        needed = offset + width
+        if len(check) < needed:
+            check.extend([-1] * (needed - len(check)))
+            value.extend([0] * (needed - len(value)))
+        for column in columns:
+            check[offset + column] = row
+            value[offset + column] = rows[row][column]
+    return base, check, value
+
+
+def build_lalr(grammar: Grammar) -> LALRTables:
+    """LALR(1) tables for the statement forms of a grammar"""
+    return LALRBuilder(grammar).build()
@@ -1,13 +1,137 @@
+import hashlib
+import json
+import os
+import textwrap
 from pathlib import Path
-from typing import List
-from models.language_spec import LanguageSpecification
+from typing import Dict, List, Optional, Set, Tuple
+from models.language_spec import LanguageSpecification, Operator
+from .grammar import Expression, Grammar, NonTerminal, Pattern, Repeat, Sequence, Terminal, references
+from .lalr import TABLE_FORMAT, LALRTables, build_lalr
+
+
+# Token name fragments for characters that may appear in operator symbols
+OPERATOR_CHAR_NAMES = {
+    '+': 'PLUS', '-': 'MINUS', '*': 'STAR', '/': 'SLASH', '=': 'EQ',
+    '<': 'LT', '>': 'GT', '!': 'BANG', '&': 'AMP', '|': 'PIPE', '%': 'MOD',
+    '^': 'CARET', '~': 'TILDE', '?': 'QUESTION', ':': 'COLON', '@': 'AT',
+    '.': 'DOT', '$': 'DOLLAR', '#': 'HASH',
+}
+
+# Operators handled by the fixed precedence levels of the generated parser
+STANDARD_OPERATORS = {
+    '=', '||', '&&', '|', '&', '==', '!=', '<', '>', '<=', '>=',
+    '+', '-', '*', '/', '%', '!',
+}
+
+# Binary precedence levels of the generated parser, loosest first, as (method suffix, symbols,
+# precedence when the spec declares none of the symbols). Unary takes its precedence from '!'.
+PRECEDENCE_LEVELS = [
+    ('logical_or', ('||', '|'), 2),
+    ('logical_and', ('&&', '&'), 3),
+    ('equality', ('==', '!='), 5),
+    ('comparison', ('<', '>', '<=', '>='), 6),
+    ('addition', ('+', '-'), 10),
+    ('multiplication', ('*', '/', '%'), 20),
+    ('unary', ('!',), 30),
+]
+
+# Punctuation the generated lexer always recognizes, by TokenType member
+SYMBOL_TOKENS = {
+    '(': 'LPAREN', ')': 'RPAREN', '{': 'LBRACE', '}': 'RBRACE', '[': 'LBRACKET',
+    ']': 'RBRACKET', ';': 'SEMICOLON', ',': 'COMMA', '.': 'DOT',
+}
+
+# Token types produced for literals and names
+VALUE_TOKENS = ['INTEGER', 'FLOAT', 'STRING', 'BOOLEAN', 'IDENTIFIER']
+
+
+def _int_array(values: List[int]) -> str:
+    """Source for an array('i') of the values, wrapped for the generated file"""
+    lines = textwrap.wrap(", ".join(map(str, values)), 96)
+    return "array('i', [\n" + "".join(f"    {line}\n" for line in lines) + "])"
 
 
 class ParserGenerator:
     """Generates parser code for the language"""
 
-    def __init__(self, spec: LanguageSpecification):
+    # LALR(1) tables by canonical grammar hash, kept on disk beside the generated languages and
+    # in memory for the most recently used grammars
+    TABLE_CACHE_DIR = Path(__file__).resolve().parent.parent / "storage" / "parse_tables"
+    TABLE_CACHE_SIZE = 16
+    _table_cache: Dict[str, LALRTables] = {}
+
+    def __init__(self, spec: LanguageSpecification, algorithm: Optional[str] = None):
+        """algorithm overrides spec.grammar_mode: "lalr", "peg", or "auto" to use LL(1)
+        unless the grammar rules need LALR(1)"""
+        self.algorithm = algorithm or spec.grammar_mode
+        if self.algorithm not in ("auto", "lalr", "peg"):
+            raise ValueError(f"Unknown parsing algorithm: {self.algorithm}")
         self.spec = spec
+        self.grammar = Grammar(spec.grammar_rules, self._grammar_literals(),
+                               self._token_names(), self._expression_first())
+        self.lalr: Optional[LALRTables] = None
+        if self.algorithm != "peg" and self.grammar.roots and (self.algorithm == "lalr" or not self.grammar.is_ll1):
+            self.lalr = self._lalr_tables()
+
+    def _lalr_tables(self) -> LALRTables:
+        """LALR(1) tables for the grammar, built once per canonical grammar hash"""
+        key = f"lalr{TABLE_FORMAT}-{self.grammar.canonical_hash()}"
+        tables = self._table_cache.pop(key, None)
+        if tables is not None:
+            self._table_cache[key] = tables  # Most recently used last
+            return tables
+
+        path = self.TABLE_CACHE_DIR / f"{key}.json"
+        try:
+            with open(path) as f:
+                tables = LALRTables.from_dict(json.load(f))
+        except (OSError, ValueError, TypeError):
+            tables = build_lalr(self.grammar)
+            try:
+                self.TABLE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+                temp_path.write_text(json.dumps(tables.to_dict()))
+                os.replace(temp_path, path)
+            except OSError:
+                pass  # Tables are rebuilt next time
+        if len(self._table_cache) >= self.TABLE_CACHE_SIZE:
+            del self._table_cache[next(iter(self._table_cache))]
+        self._table_cache[key] = tables
+        return tables
+
+    def grammar_report(self) -> List[str]:
+        """Grammar problems for the parser that is generated, LL(1) or LALR(1)"""
+        if self.algorithm == "peg":
+            # Ordered choice has no conflicts; only left recursion is a problem
+            return self.grammar.errors + [f"{name}: is left-recursive, which the PEG parser cannot use"
+                                          for name in self.grammar.left_recursive]
+        if self.lalr is None:
+            return self.grammar.report()
+        return self.grammar.errors + self.lalr.conflicts
+
+    def _grammar_literals(self) -> Dict[str, str]:
+        """TokenType member name for each quoted terminal a grammar rule may use"""
+        literals = dict(SYMBOL_TOKENS)
+        literals.update({op.symbol: self._token_name(op.symbol) for op in self.spec.operators})
+        literals.update({kw.word: kw.word.upper() for kw in self.spec.keywords})
+        return literals
+
+    def _token_names(self) -> Set[str]:
+        return set(self._grammar_literals().values()) | set(VALUE_TOKENS) | {"EOF"}
+
+    def _expression_first(self) -> Set[str]:
+        """Tokens that can start an expression in the generated parser"""
+        defined = {op.symbol for op in self.spec.operators}
+        unary = {self._token_name(symbol) for symbol in ("!", "-") if symbol in defined}
+        return {"INTEGER", "FLOAT", "STRING", "IDENTIFIER", "LPAREN", "LBRACKET"} | unary
+
+    @staticmethod
+    def _token_name(symbol: str) -> str:
+        """Get the TokenType member name for an operator symbol"""
+        return "OP_" + "".join(
+            OPERATOR_CHAR_NAMES.get(char, char.upper() if char.isalnum() else f"X{ord(char):X}")
+            for char in symbol
+        )
 
     def generate(self, output_dir: Path) -> List[str]:
         """Generate parser files"""
@@ -34,11 +158,34 @@ class ParserGenerator:
         # Generate AST node definitions
         ast_file = output_dir / "ast_nodes.py"
         with open(ast_file, 'w') as f:
-            f.write(self._generate_ast_nodes())
+            f.write(self._generate_ast_nodes(self._ast_version()))
         generated_files.append(str(ast_file))
 
+        # Generate incremental lexer/parser for editors
+        incremental_file = output_dir / "incremental.py"
+        with open(incremental_file, 'w') as f:
+            f.write(self._generate_incremental())
+        generated_files.append(str(incremental_file))
+
+        # Generate parsed-AST cache
+        cache_file = output_dir / "ast_cache.py"
+        with open(cache_file, 'w') as f:
+            f.write(self._generate_ast_cache())
+        generated_files.append(str(cache_file))
+
+        # Generate binary AST encoding
+        codec_file = output_dir / "ast_codec.py"
+        with open(codec_file, 'w') as f:
+            f.write(self._generate_ast_codec())
+        generated_files.append(str(codec_file))
+
         return generated_files
 
+    def _ast_version(self) -> str:
+        """Stamp that changes whenever the generated lexer, parser or AST nodes change"""
+        generated = self._generate_lexer() + self._generate_parser() + self._generate_ast_nodes("")
+        return hashlib.sha256(generated.encode()).hexdigest()[:16]
+
     def _generate_grammar(self) -> str:
         """Generate EBNF grammar specification"""
         grammar = f"(* Grammar for {self.spec.name} *)\n\n"
@@ -64,6 +211,12 @@ class ParserGenerator:
             for keyword in self.spec.keywords:
                 grammar += f"(* {keyword.word}: {keyword.description} *)\n"
 
+        # Report what the table-driven parser could not use
+        if self.grammar_report():
+            grammar += "\n(* Grammar problems *)\n"
+            for problem in self.grammar_report():
+                grammar += f"(* {problem} *)\n"
+
         return grammar
 
     def _generate_lexer(self) -> str:
@@ -74,9 +227,11 @@ Auto-generated by Illiterate Wizard
 """
 
 import re
+from array import array
+from bisect import bisect_right
 from enum import Enum, auto
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
 
 class TokenType(Enum):
@@ -117,101 +272,272 @@ class Token:
     value: str
     line: int
     column: int
+    start: int = 0   # offset of the token's first character in the source
+    length: int = 0  # number of source characters the token spans
 
 
-class Lexer:
+# TokenType by its integer value, for the kind column of a TokenBuffer
+TOKEN_TYPES: List[Optional[TokenType]] = [None] * (max(t.value for t in TokenType) + 1)
+for _token_type in TokenType:
+    TOKEN_TYPES[_token_type.value] = _token_type
+
+_STRING_KIND = TokenType.STRING.value
+_WHITESPACE = re.compile(r'[ \\t\\r\\n]*')
+_ESCAPE = re.compile(r'\\\\(.)', re.S)
+
+
+def token_text(token_type: TokenType, source: str, start: int, end: int) -> str:
+    """Value of the token spanning source[start:end]; strings lose their quotes and escapes"""
+    if token_type is TokenType.STRING:
+        text = source[start + 1:end - 1]
+        return _ESCAPE.sub(_unescape, text) if '\\\\' in text else text
+    return source[start:end]
+
+
+def _unescape(match: re.Match) -> str:
+    return match.group(1)
+
+
+class LineIndex:
+    """Maps source offsets to lines and columns.
+
+    The offsets where lines start are only collected the first time a position is
+    asked for, and each lookup is a bisect over them. Works on str and byte sources.
+    """
+    __slots__ = ("source", "_starts")
+
+    def __init__(self, source):
+        self.source = source
+        # A list rather than an array: bisect compares its ints without boxing them
+        self._starts: Optional[List[int]] = None
+
+    def line(self, offset: int) -> int:
+        return bisect_right(self._starts or self._build(), offset)
+
+    def position(self, offset: int) -> Tuple[int, int]:
+        """1-based line and column of an offset"""
+        starts = self._starts or self._build()
+        line = bisect_right(starts, offset)
+        return line, offset - starts[line - 1] + 1
+
+    def _build(self) -> List[int]:
+        source = self.source
+        newline = '\\n' if isinstance(source, str) else b'\\n'
+        starts = [0]
+        find = source.find
+        pos = find(newline)
+        while pos != -1:
+            starts.append(pos + 1)
+            pos = find(newline, pos + 1)
+        self._starts = starts
+        return starts
+
+
+class TokenBuffer:
+    """Tokens stored column-wise in array('i') columns instead of one Token object each.
+
+    Kinds are TokenType values; values are sliced from the source and Tokens built
+    only when asked for, so lexing a large file allocates a few arrays. The source is
+    a str or, from ByteLexer, a bytes-like buffer whose slices are decoded as UTF-8.
+    Lines and columns are looked up from the start offsets through a LineIndex.
+    """
+    __slots__ = ("source", "kinds", "starts", "lengths", "index")
+
     def __init__(self, source: str):
         self.source = source
-        self.pos = 0
-        self.line = 1
-        self.column = 1
-        self.tokens: List[Token] = []
+        self.kinds = array('i')
+        self.starts = array('i')
+        self.lengths = array('i')
+        self.index = LineIndex(source)
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def __getitem__(self, index: int) -> Token:
+        if index < 0:
+            index += len(self.kinds)
+        line, column = self.index.position(self.starts[index])
+        return Token(self.type(index), self.value(index), line, column, self.starts[index], self.lengths[index])
+
+    def __iter__(self) -> Iterator[Token]:
+        return (self[index] for index in range(len(self.kinds)))
+
+    def types(self) -> List[TokenType]:
+        """The kind column as TokenType members"""
+        return list(map(TOKEN_TYPES.__getitem__, self.kinds))
 
-        # Build keyword map
-        self.keywords = {{
+    def type(self, index: int) -> TokenType:
+        return TOKEN_TYPES[self.kinds[index]]
+
+    def value(self, index: int) -> str:
+        start = self.starts[index]
+        text = self.source[start:start + self.lengths[index]]
+        if not isinstance(text, str):
+            text = str(text, 'utf-8')
+        if self.kinds[index] != _STRING_KIND:
+            return text
+        return token_text(TokenType.STRING, text, 0, len(text))
+
+    def line(self, index: int) -> int:
+        return self.index.line(self.starts[index])
+
+    def column(self, index: int) -> int:
+        return self.index.position(self.starts[index])[1]
+
+
+def _build_operator_trie(operators: Dict[str, TokenType]) -> Dict[str, list]:
+    """Build a trie of [token type or None, children] nodes keyed by character"""
+    root: Dict[str, list] = {{}}
+    for symbol, token_type in operators.items():
+        children = root
+        for char in symbol[:-1]:
+            children = children.setdefault(char, [None, {{}}])[1]
+        children.setdefault(symbol[-1], [None, {{}}])[0] = token_type
+    return root
+
+
+class Lexer:
+    # Lookup tables shared by every Lexer instance
+    KEYWORDS = {{
 {keyword_map}
-        }}
+    }}
 
-        # Build operator map
-        self.operators = {{
+    OPERATORS = {{
 {operator_map}
-        }}
+    }}
+
+    SYMBOLS = {{
+        '(': TokenType.LPAREN,
+        ')': TokenType.RPAREN,
+        '{{': TokenType.LBRACE,
+        '}}': TokenType.RBRACE,
+        '[': TokenType.LBRACKET,
+        ']': TokenType.RBRACKET,
+        ';': TokenType.SEMICOLON,
+        ',': TokenType.COMMA,
+        '.': TokenType.DOT,
+    }}
+
+    COMMENT = {single_line_comment}
+
+    # The root of the trie doubles as the first-character table for operators
+    OPERATOR_TRIE = _build_operator_trie(OPERATORS)
+
+    def __init__(self, source: str, pos: int = 0, line: int = 1, column: int = 1):
+        # Lexing can resume at any token boundary given its line and column
+        self.source = source
+        self.pos = pos
+        self.tokens: List[Token] = []
+        # Matchers only move pos; lines are counted between token starts when a Token
+        # needs one. _line is the line at offset _line_pos, which starts at _line_start.
+        self._line = line
+        self._line_pos = pos
+        self._line_start = pos - column + 1
+
+    @property
+    def line(self) -> int:
+        return self.position(self.pos)[0]
+
+    @property
+    def column(self) -> int:
+        return self.position(self.pos)[1]
+
+    def position(self, offset: int) -> Tuple[int, int]:
+        """Line and column of an offset no earlier than the last one asked for"""
+        source = self.source
+        newlines = source.count('\\n', self._line_pos, offset)
+        if newlines:
+            self._line += newlines
+            self._line_start = source.rfind('\\n', self._line_pos, offset) + 1
+        self._line_pos = offset
+        return self._line, offset - self._line_start + 1
 
     def tokenize(self) -> List[Token]:
         """Tokenize the source code"""
-        while self.pos < len(self.source):
-            self._skip_whitespace()
+        while self.step():
+            pass
 
-            if self.pos >= len(self.source):
-                break
+        self.tokens.append(self.eof())
+        return self.tokens
 
-            # Try to match each token type
-            if self._match_comment():
-                continue
-            elif self._match_number():
-                continue
-            elif self._match_string():
-                continue
-            elif self._match_operator():
-                continue
-            elif self._match_identifier_or_keyword():
-                continue
-            elif self._match_symbol():
-                continue
-            else:
-                raise SyntaxError(f"Unexpected character '{{self.source[self.pos]}}' at line {{self.line}}, column {{self.column}}")
+    def tokenize_buffer(self) -> TokenBuffer:
+        """Tokenize into a TokenBuffer, without creating a Token per token"""
+        buffer = TokenBuffer(self.source)
+        kinds, starts, lengths = buffer.kinds.append, buffer.starts.append, buffer.lengths.append
+
+        def add(token_type: TokenType, start: int):
+            kinds(token_type.value)
+            starts(start)
+            lengths(self.pos - start)
+
+        self._add = add
+        try:
+            while self.step():
+                pass
+        finally:
+            del self._add
+        add(TokenType.EOF, self.pos)
+        return buffer
+
+    def step(self) -> bool:
+        """Consume the next token or comment; returns False at the end of the source"""
+        source = self.source
+        self.pos = _WHITESPACE.match(source, self.pos).end()
+        if self.pos >= len(source):
+            return False
 
-        self.tokens.append(Token(TokenType.EOF, '', self.line, self.column))
-        return self.tokens
+        # Only try the matchers that can start with this character
+        for match in self.DISPATCH.get(source[self.pos], self.DEFAULT_MATCHERS):
+            if match(self):
+                return True
+        self._error(f"Unexpected character '{{source[self.pos]}}'", self.pos)
 
-    def _skip_whitespace(self):
-        """Skip whitespace characters"""
-        while self.pos < len(self.source) and self.source[self.pos] in ' \\t\\r\\n':
-            if self.source[self.pos] == '\\n':
-                self.line += 1
-                self.column = 1
-            else:
-                self.column += 1
-            self.pos += 1
+    def eof(self) -> Token:
+        """End-of-input token for the current position"""
+        line, column = self.position(self.pos)
+        return Token(TokenType.EOF, '', line, column, self.pos, 0)
+
+    def _add(self, token_type: TokenType, start: int):
+        """Record the token from start to the current position"""
+        line, column = self.position(start)
+        self.tokens.append(Token(token_type, token_text(token_type, self.source, start, self.pos),
+                                 line, column, start, self.pos - start))
+
+    def _error(self, message: str, offset: int):
+        line, column = self.position(offset)
+        raise SyntaxError(f"{{message}} at line {{line}}, column {{column}}")
 
     def _match_comment(self) -> bool:
         """Match comment syntax"""
-        single_line = {single_line_comment}
-        if self.source[self.pos:self.pos+len(single_line)] == single_line:
-            while self.pos < len(self.source) and self.source[self.pos] != '\\n':
-                self.pos += 1
+        if self.source.startswith(self.COMMENT, self.pos):
+            end = self.source.find('\\n', self.pos)
+            self.pos = len(self.source) if end == -1 else end
             return True
         return False
 
     def _match_number(self) -> bool:
         """Match integer or float"""
         start = self.pos
-        start_col = self.column
 
         if not self.source[self.pos].isdigit():
             return False
 
         while self.pos < len(self.source) and self.source[self.pos].isdigit():
             self.pos += 1
-            self.column += 1
 
         # Check for float
         if self.pos < len(self.source) and self.source[self.pos] == '.':
             self.pos += 1
-            self.column += 1
 
             if not (self.pos < len(self.source) and self.source[self.pos].isdigit()):
-                raise SyntaxError(f"Invalid number at line {{self.line}}, column {{start_col}}")
+                self._error("Invalid number", start)
 
             while self.pos < len(self.source) and self.source[self.pos].isdigit():
                 self.pos += 1
-                self.column += 1
 
-            value = self.source[start:self.pos]
-            self.tokens.append(Token(TokenType.FLOAT, value, self.line, start_col))
+            self._add(TokenType.FLOAT, start)
         else:
-            value = self.source[start:self.pos]
-            self.tokens.append(Token(TokenType.INTEGER, value, self.line, start_col))
+            self._add(TokenType.INTEGER, start)
 
         return True
 
@@ -222,44 +548,40 @@ class Lexer:
 
         quote = self.source[self.pos]
         start = self.pos
-        start_col = self.column
         self.pos += 1
-        self.column += 1
 
-        value = ""
+        # The value, without quotes and escapes, is built from the source span when needed
         while self.pos < len(self.source) and self.source[self.pos] != quote:
-            if self.source[self.pos] == '\\\\':
-                self.pos += 1
-                self.column += 1
-                if self.pos < len(self.source):
-                    value += self.source[self.pos]
-                    self.pos += 1
-                    self.column += 1
-            else:
-                value += self.source[self.pos]
-                self.pos += 1
-                self.column += 1
+            self.pos += 2 if self.source[self.pos] == '\\\\' else 1
 
         if self.pos >= len(self.source):
-            raise SyntaxError(f"Unterminated string at line {{self.line}}, column {{start_col}}")
+            self._error("Unterminated string", start)
 
         self.pos += 1  # Skip closing quote
-        self.column += 1
-        self.tokens.append(Token(TokenType.STRING, value, self.line, start_col))
+        self._add(TokenType.STRING, start)
         return True
 
     def _match_operator(self) -> bool:
-        """Match operators"""
-        # Try longest operators first
-        for length in range(3, 0, -1):
-            if self.pos + length <= len(self.source):
-                op = self.source[self.pos:self.pos+length]
-                if op in self.operators:
-                    self.tokens.append(Token(self.operators[op], op, self.line, self.column))
-                    self.pos += length
-                    self.column += length
-                    return True
-        return False
+        """Match the longest operator at the current position"""
+        source = self.source
+        node = self.OPERATOR_TRIE.get(source[self.pos])
+        end = self.pos + 1
+        match_end = end
+        token_type = None
+        while node is not None:
+            if node[0] is not None:
+                token_type, match_end = node[0], end
+            if end >= len(source):
+                break
+            node = node[1].get(source[end])
+            end += 1
+
+        if token_type is None:
+            return False
+        start = self.pos
+        self.pos = match_end
+        self._add(token_type, start)
+        return True
 
     def _match_identifier_or_keyword(self) -> bool:
         """Match identifiers or keywords"""
@@ -267,45 +589,129 @@ class Lexer:
             return False
 
         start = self.pos
-        start_col = self.column
 
         while self.pos < len(self.source) and (self.source[self.pos].isalnum() or self.source[self.pos] == '_'):
             self.pos += 1
-            self.column += 1
-
-        value = self.source[start:self.pos]
 
-        # Check if it's a keyword
-        if value in self.keywords:
-            token_type = self.keywords[value]
-        else:
-            token_type = TokenType.IDENTIFIER
-
-        self.tokens.append(Token(token_type, value, self.line, start_col))
+        token_type = self.KEYWORDS.get(self.source[start:self.pos], TokenType.IDENTIFIER)
+        self._add(token_type, start)
         return True
 
     def _match_symbol(self) -> bool:
         """Match single-character symbols"""
-        symbols = {{
-            '(': TokenType.LPAREN,
-            ')': TokenType.RPAREN,
-            '{{': TokenType.LBRACE,
-            '}}': TokenType.RBRACE,
-            '[': TokenType.LBRACKET,
-            ']': TokenType.RBRACKET,
-            ';': TokenType.SEMICOLON,
-            ',': TokenType.COMMA,
-            '.': TokenType.DOT,
-        }}
-
         char = self.source[self.pos]
-        if char in symbols:
-            self.tokens.append(Token(symbols[char], char, self.line, self.column))
-            self.pos += 1
-            self.column += 1
-            return True
+        token_type = self.SYMBOLS.get(char)
+        if token_type is None:
+            return False
 
-        return False
+        self.pos += 1
+        self._add(token_type, self.pos - 1)
+        return True
+
+
+def _build_dispatch() -> Dict[str, Tuple[Callable[[Lexer], bool], ...]]:
+    """Map each character that can start a token to its matchers, in priority order"""
+    candidates = [
+        (Lexer._match_comment, Lexer.COMMENT[:1]),
+        (Lexer._match_number, "0123456789"),
+        (Lexer._match_string, "\\"'"),
+        (Lexer._match_operator, "".join(Lexer.OPERATOR_TRIE)),
+        (Lexer._match_identifier_or_keyword, ""),
+        (Lexer._match_symbol, "".join(Lexer.SYMBOLS)),
+    ]
+    chars = set("".join(start for _, start in candidates))
+    dispatch = {{}}
+    for char in chars:
+        dispatch[char] = tuple(
+            match for match, start in candidates
+            if char in start or (match is Lexer._match_identifier_or_keyword and (char.isalpha() or char == '_'))
+        )
+    return dispatch
+
+
+Lexer.DISPATCH = _build_dispatch()
+# Characters outside the table can only start an identifier
+Lexer.DEFAULT_MATCHERS = (Lexer._match_identifier_or_keyword,)
+
+# ByteLexer actions for matches that are not a plain token kind
+_BYTE_SPACE, _BYTE_IDENTIFIER, _BYTE_BAD_NUMBER, _BYTE_BAD_STRING = -1, -2, -3, -4
+
+
+class ByteLexer:
+    """Lexer over a bytes, bytearray or mmap buffer that never copies the source.
+
+    One compiled regex scans the buffer in place. Tokens go into a TokenBuffer of
+    byte offsets, so identifier and string values are decoded only when the parser
+    reads them. Columns count bytes, and any non-ASCII byte may appear in an
+    identifier; otherwise it produces the same tokens as Lexer.
+    """
+    KEYWORDS = {{word.encode(): token_type.value for word, token_type in Lexer.KEYWORDS.items()}}
+
+    def __init__(self, data):
+        self.data = data
+
+    def tokenize(self) -> TokenBuffer:
+        """Tokenize the whole buffer; the TokenBuffer keeps a reference to it"""
+        data = self.data
+        buffer = TokenBuffer(data)
+        kinds, starts, lengths = buffer.kinds.append, buffer.starts.append, buffer.lengths.append
+        match, actions, keywords = self.PATTERN.match, self.ACTIONS, self.KEYWORDS
+        identifier = TokenType.IDENTIFIER.value
+        pos, end = 0, len(data)
+        while pos < end:
+            found = match(data, pos)
+            if found is None:
+                self._error(buffer, f"Unexpected character '{{chr(data[pos])}}'", pos)
+            start, pos = found.span()
+            kind = actions[found.lastindex]
+            if kind < 0:
+                if kind == _BYTE_SPACE:
+                    continue
+                if kind == _BYTE_IDENTIFIER:
+                    kind = keywords.get(found.group(), identifier)
+                elif kind == _BYTE_BAD_NUMBER:
+                    self._error(buffer, "Invalid number", start)
+                else:
+                    self._error(buffer, "Unterminated string", start)
+            kinds(kind)
+            starts(start)
+            lengths(pos - start)
+        kinds(TokenType.EOF.value)
+        starts(pos)
+        lengths(0)
+        return buffer
+
+    @staticmethod
+    def _error(buffer: TokenBuffer, message: str, offset: int):
+        line, column = buffer.index.position(offset)
+        raise SyntaxError(f"{{message}} at line {{line}}, column {{column}}")
+
+
+def _build_byte_pattern() -> Tuple["re.Pattern[bytes]", List[int]]:
+    """One regex with a group per token, in Lexer's matcher order, and each group's action"""
+    groups = [(rb'[ \\t\\r\\n]+', _BYTE_SPACE)]
+    if Lexer.COMMENT:
+        groups.append((re.escape(Lexer.COMMENT.encode()) + rb'[^\\n]*', _BYTE_SPACE))
+    groups += [
+        (rb'[0-9]+\\.[0-9]+', TokenType.FLOAT.value),
+        (rb'[0-9]+\\.', _BYTE_BAD_NUMBER),
+        (rb'[0-9]+', TokenType.INTEGER.value),
+        (rb'"(?:[^"\\\\]|\\\\.)*"', _STRING_KIND),
+        (rb"'(?:[^'\\\\]|\\\\.)*'", _STRING_KIND),
+        (rb'[\\x22\\x27]', _BYTE_BAD_STRING),
+    ]
+    # Longest operators first, so alternation finds the same match as the trie
+    for symbol in sorted(Lexer.OPERATORS, key=len, reverse=True):
+        groups.append((re.escape(symbol.encode()), Lexer.OPERATORS[symbol].value))
+    groups.append((rb'[A-Za-z_\\x80-\\xff][A-Za-z0-9_\\x80-\\xff]*', _BYTE_IDENTIFIER))
+    for symbol, token_type in Lexer.SYMBOLS.items():
+        groups.append((re.escape(symbol.encode()), token_type.value))
+
+    pattern = re.compile(b"|".join(b"(" + source + b")" for source, _ in groups), re.S)
+    return pattern, [0] + [action for _, action in groups]
+
+
+ByteLexer.PATTERN, ByteLexer.ACTIONS = _build_byte_pattern()
 '''
 
         # Generate keyword tokens
@@ -316,19 +722,19 @@ class Lexer:
 
         # Generate operator tokens
         operator_tokens = "\n".join([
-            f"    OP_{op.symbol.replace('+', 'PLUS').replace('-', 'MINUS').replace('*', 'STAR').replace('/', 'SLASH').replace('=', 'EQ').replace('<', 'LT').replace('>', 'GT').replace('!', 'BANG').replace('&', 'AMP').replace('|', 'PIPE').replace('%', 'MOD')} = auto()  # {op.symbol}"
+            f"    {self._token_name(op.symbol)} = auto()  # {op.symbol}"
             for op in self.spec.operators
         ]) if self.spec.operators else "    pass"
 
         # Generate keyword map
         keyword_map = ",\n".join([
-            f"            '{kw.word}': TokenType.{kw.word.upper()}"
+            f"        '{kw.word}': TokenType.{kw.word.upper()}"
             for kw in self.spec.keywords
         ]) if self.spec.keywords else ""
 
         # Generate operator map
         operator_map = ",\n".join([
-            f"            '{op.symbol}': TokenType.OP_{op.symbol.replace('+', 'PLUS').replace('-', 'MINUS').replace('*', 'STAR').replace('/', 'SLASH').replace('=', 'EQ').replace('<', 'LT').replace('>', 'GT').replace('!', 'BANG').replace('&', 'AMP').replace('|', 'PIPE').replace('%', 'MOD')}"
+            f"        {op.symbol!r}: TokenType.{self._token_name(op.symbol)}"
             for op in self.spec.operators
         ]) if self.spec.operators else ""
 
@@ -348,24 +754,40 @@ Parser for {name}
 Auto-generated by Illiterate Wizard
 """
 
-from typing import List, Optional
-from lexer import Token, TokenType, Lexer
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Union
+from lexer import Token, TokenBuffer, TokenType, Lexer
 from ast_nodes import *
-
+{grammar_tables}
 
 class Parser:
-    def __init__(self, tokens: List[Token]):
+    def __init__(self, tokens: Union[List[Token], TokenBuffer], intern: bool = False):
         self.tokens = tokens
         self.pos = 0
+        # A TokenBuffer is read column by column; Token objects are only built for errors
+        if isinstance(tokens, TokenBuffer):
+            self.types = tokens.types()
+            self._value = tokens.value
+            self._line = tokens.line
+        else:
+            self.types = [token.type for token in tokens]
+            self._value = lambda index: tokens[index].value
+            self._line = lambda index: tokens[index].line
+        # Interning mode: names go through sys.intern and equal literal and identifier
+        # leaves are shared from a pool. Shared leaves carry no line (0).
+        self._leaves: Optional[Dict[Any, ASTNode]] = {{}} if intern else None
+        self._name = (lambda index: sys.intern(self._value(index))) if intern else self._value{grammar_init}
 
     def parse(self) -> ProgramNode:
         """Parse the token stream into an AST"""
-        statements = []
+        return ProgramNode(list(self.iter_statements()))
+
+    def iter_statements(self) -> Iterator[ASTNode]:
+        """Parse top-level statements lazily, so each can be used and dropped before the next is parsed"""
         while not self._check(TokenType.EOF):
             stmt = self._parse_statement()
             if stmt:
-                statements.append(stmt)
-        return ProgramNode(statements)
+                yield stmt
 
     def _current(self) -> Token:
         """Get current token"""
@@ -373,26 +795,25 @@ class Parser:
             return self.tokens[self.pos]
         return self.tokens[-1]
 
-    def _advance(self) -> Token:
-        """Move to next token"""
-        token = self._current()
-        if not self._check(TokenType.EOF):
+    def _advance(self) -> int:
+        """Move to next token; returns the index of the token moved past"""
+        index = self.pos
+        if self.types[index] is not TokenType.EOF:
             self.pos += 1
-        return token
+        return index
 
     def _check(self, token_type: TokenType) -> bool:
         """Check if current token is of given type"""
-        return self._current().type == token_type
+        return self.types[self.pos] is token_type
 
     def _match(self, *token_types: TokenType) -> bool:
         """Check and consume if current token matches any of the types"""
-        for token_type in token_types:
-            if self._check(token_type):
-                self._advance()
-                return True
+        if self.types[self.pos] in token_types:
+            self._advance()
+            return True
         return False
 
-    def _expect(self, token_type: TokenType, message: str) -> Token:
+    def _expect(self, token_type: TokenType, message: str) -> int:
         """Consume token or raise error"""
         if self._check(token_type):
             return self._advance()
@@ -401,123 +822,164 @@ class Parser:
     def _parse_statement(self):
         """Parse a statement"""
         # This is a template - specific statement parsing depends on grammar
-        current = self._current()
-
+        current = self.types[self.pos]
+        line = self._line(self.pos)
+{grammar_dispatch}
         # Try to match against defined syntax rules
 {statement_parsers}
         # Default: try expression statement
         expr = self._parse_expression()
         if self._match(TokenType.SEMICOLON):
-            return ExpressionStatementNode(expr)
+            return self._at(ExpressionStatementNode(expr), line)
         return expr
 
+    def _at(self, node, line: int):
+        """Record the source line a node starts on"""
+        node.line = line
+        return node
+
+    def _leaf(self, node_type, value: Any, line: int):
+        """A LiteralNode or IdentifierNode, taken from the leaf pool in interning mode"""
+        leaves = self._leaves
+        if leaves is None:
+            node = node_type(value)
+            node.line = line
+            return node
+        # The value's type is part of the key, since 1, 1.0 and True are equal
+        key = (node_type, value.__class__, value)
+        node = leaves.get(key)
+        if node is None:
+            node = leaves[key] = node_type(value)
+        return node
+{grammar_methods}
     def _parse_expression(self):
         """Parse an expression"""
         return self._parse_assignment()
 
     def _parse_assignment(self):
         """Parse assignment expression"""
-        expr = self._parse_logical_or()
+        start = self.pos
+        expr = self._parse_{assignment_operand}()
 
-        if self._match(TokenType.OP_EQ):
+        if self._match({assign_tokens}):
             value = self._parse_assignment()
-            return AssignmentNode(expr, value)
+            return self._at(AssignmentNode(expr, value), self._line(start))
 
         return expr
 
     def _parse_logical_or(self):
         """Parse logical OR expression"""
-        expr = self._parse_logical_and()
+        start = self.pos
+        expr = self._parse_{logical_or_operand}()
 
-        while self._match(TokenType.OP_PIPE, TokenType.OP_PIPE):
-            op = self.tokens[self.pos - 1].value
-            right = self._parse_logical_and()
-            expr = BinaryOpNode(expr, op, right)
+        while self._match({or_tokens}):
+            op = self._value(self.pos - 1)
+            right = self._parse_{logical_or_operand}()
+            expr = self._at(BinaryOpNode(expr, op, right), self._line(start))
 
         return expr
 
     def _parse_logical_and(self):
         """Parse logical AND expression"""
-        expr = self._parse_equality()
+        start = self.pos
+        expr = self._parse_{logical_and_operand}()
 
-        while self._match(TokenType.OP_AMP, TokenType.OP_AMP):
-            op = self.tokens[self.pos - 1].value
-            right = self._parse_equality()
-            expr = BinaryOpNode(expr, op, right)
+        while self._match({and_tokens}):
+            op = self._value(self.pos - 1)
+            right = self._parse_{logical_and_operand}()
+            expr = self._at(BinaryOpNode(expr, op, right), self._line(start))
 
         return expr
 
     def _parse_equality(self):
         """Parse equality expression"""
-        expr = self._parse_comparison()
+        start = self.pos
+        expr = self._parse_{equality_operand}()
 
-        while self._match(TokenType.OP_EQEQ, TokenType.OP_BANGEQ):
-            op = self.tokens[self.pos - 1].value
-            right = self._parse_comparison()
-            expr = BinaryOpNode(expr, op, right)
+        while self._match({equality_tokens}):
+            op = self._value(self.pos - 1)
+            right = self._parse_{equality_operand}()
+            expr = self._at(BinaryOpNode(expr, op, right), self._line(start))
 
         return expr
 
     def _parse_comparison(self):
         """Parse comparison expression"""
-        expr = self._parse_addition()
+        start = self.pos
+        expr = self._parse_{comparison_operand}()
 
-        while self._match(TokenType.OP_LT, TokenType.OP_GT, TokenType.OP_LTEQ, TokenType.OP_GTEQ):
-            op = self.tokens[self.pos - 1].value
-            right = self._parse_addition()
-            expr = BinaryOpNode(expr, op, right)
+        while self._match({comparison_tokens}):
+            op = self._value(self.pos - 1)
+            right = self._parse_{comparison_operand}()
+            expr = self._at(BinaryOpNode(expr, op, right), self._line(start))
 
         return expr
 
     def _parse_addition(self):
         """Parse addition/subtraction"""
-        expr = self._parse_multiplication()
+        start = self.pos
+        expr = self._parse_{addition_operand}()
 
-        while self._match(TokenType.OP_PLUS, TokenType.OP_MINUS):
-            op = self.tokens[self.pos - 1].value
-            right = self._parse_multiplication()
-            expr = BinaryOpNode(expr, op, right)
+        while self._match({addition_tokens}):
+            op = self._value(self.pos - 1)
+            right = self._parse_{addition_operand}()
+            expr = self._at(BinaryOpNode(expr, op, right), self._line(start))
 
         return expr
 
     def _parse_multiplication(self):
         """Parse multiplication/division"""
-        expr = self._parse_unary()
+        start = self.pos
+        expr = self._parse_{multiplication_operand}()
 
-        while self._match(TokenType.OP_STAR, TokenType.OP_SLASH, TokenType.OP_MOD):
-            op = self.tokens[self.pos - 1].value
-            right = self._parse_unary()
-            expr = BinaryOpNode(expr, op, right)
+        while self._match({multiplication_tokens}):
+            op = self._value(self.pos - 1)
+            right = self._parse_{multiplication_operand}()
+            expr = self._at(BinaryOpNode(expr, op, right), self._line(start))
 
         return expr
-
+{custom_levels}
     def _parse_unary(self):
         """Parse unary expression"""
-        if self._match(TokenType.OP_BANG, TokenType.OP_MINUS):
-            op = self.tokens[self.pos - 1].value
+        if self._match({unary_tokens}):
+            op = self.pos - 1
             expr = self._parse_unary()
-            return UnaryOpNode(op, expr)
+            return self._at(UnaryOpNode(self._value(op), expr), self._line(op))
+
+        return self._parse_{unary_operand}()
+
+    def _parse_postfix(self):
+        """Parse index expressions"""
+        start = self.pos
+        expr = self._parse_primary()
+
+        while self._match(TokenType.LBRACKET):
+            index = self._parse_expression()
+            self._expect(TokenType.RBRACKET, "Expected ']' after index")
+            expr = self._at(IndexNode(expr, index), self._line(start))
 
-        return self._parse_primary()
+        return expr
 
     def _parse_primary(self):
         """Parse primary expression"""
+        line = self._line(self.pos)
+
         # Literals
         if self._check(TokenType.INTEGER):
-            value = self._advance().value
-            return LiteralNode(int(value))
+            value = self._value(self._advance())
+            return self._leaf(LiteralNode, int(value), line)
 
         if self._check(TokenType.FLOAT):
-            value = self._advance().value
-            return LiteralNode(float(value))
+            value = self._value(self._advance())
+            return self._leaf(LiteralNode, float(value), line)
 
         if self._check(TokenType.STRING):
-            value = self._advance().value
-            return LiteralNode(value)
+            value = self._value(self._advance())
+            return self._leaf(LiteralNode, value, line)
 
         # Identifiers
         if self._check(TokenType.IDENTIFIER):
-            name = self._advance().value
+            name = self._name(self._advance())
 
             # Function call
             if self._match(TokenType.LPAREN):
@@ -527,9 +989,19 @@ class Parser:
                     while self._match(TokenType.COMMA):
                         args.append(self._parse_expression())
                 self._expect(TokenType.RPAREN, "Expected ')' after arguments")
-                return FunctionCallNode(name, args)
+                return self._at(FunctionCallNode(name, args), line)
+
+            return self._leaf(IdentifierNode, name, line)
 
-            return IdentifierNode(name)
+        # Array literals
+        if self._match(TokenType.LBRACKET):
+            elements = []
+            if not self._check(TokenType.RBRACKET):
+                elements.append(self._parse_expression())
+                while self._match(TokenType.COMMA):
+                    elements.append(self._parse_expression())
+            self._expect(TokenType.RBRACKET, "Expected ']' after array elements")
+            return self._at(ArrayLiteralNode(elements), line)
 
         # Grouping
         if self._match(TokenType.LPAREN):
@@ -550,26 +1022,507 @@ class Parser:
         # Join parsers or leave empty (no pass needed, there's already default code)
         parser_code = "\n".join(statement_parsers) if statement_parsers else ""
 
+        # Each level parses its operands with the next tighter one; custom levels slot in between
+        levels = self._precedence_levels()
+        methods = ["assignment"] + [name for name, _, _ in levels] + ["postfix"]
+        operands = {f"{name}_operand": operand for name, operand in zip(methods, methods[1:])}
+        tokens = {name: symbols for name, symbols, _ in levels}
+        custom_levels = "".join(
+            self._custom_level(name, symbols, associativity, operands[f"{name}_operand"])
+            for name, symbols, associativity in levels if name.startswith("custom")
+        )
+
         return code.format(
             name=self.spec.name,
-            statement_parsers=parser_code
+            statement_parsers=parser_code,
+            **self._grammar_parser_parts(),
+            **operands,
+            custom_levels=custom_levels,
+            assign_tokens=self._level_tokens("="),
+            or_tokens=self._level_tokens(*tokens["logical_or"]),
+            and_tokens=self._level_tokens(*tokens["logical_and"]),
+            equality_tokens=self._level_tokens(*tokens["equality"]),
+            comparison_tokens=self._level_tokens(*tokens["comparison"]),
+            addition_tokens=self._level_tokens(*tokens["addition"]),
+            multiplication_tokens=self._level_tokens(*tokens["multiplication"]),
+            unary_tokens=self._level_tokens("!", "-")
         )
 
-    def _generate_ast_nodes(self) -> str:
+    def _precedence_levels(self) -> List[Tuple[str, List[str], str]]:
+        """Binary levels of the expression parser, loosest first, as (method suffix, symbols,
+        associativity). The fixed levels keep their order. A custom operator joins the first fixed
+        level of its declared precedence, or else a level shared with the custom operators of that
+        precedence, placed before the first fixed level that binds tighter. A shared level is
+        right-associative only when all of its operators are."""
+        declared: Dict[str, int] = {}
+        for op in self.spec.operators:
+            declared.setdefault(op.symbol, op.precedence)
+        fixed = []
+        for name, symbols, default in PRECEDENCE_LEVELS:
+            precedence = min((declared[symbol] for symbol in symbols if symbol in declared), default=default)
+            fixed.append((precedence, name, list(symbols) if name != "unary" else []))
+
+        groups: Dict[int, List[Operator]] = {}
+        for op in self.spec.operators:
+            if op.symbol in STANDARD_OPERATORS:
+                continue
+            joined = next((symbols for precedence, name, symbols in fixed
+                           if name != "unary" and precedence == op.precedence), None)
+            if joined is not None:
+                joined.append(op.symbol)
+            else:
+                groups.setdefault(op.precedence, []).append(op)
+
+        levels = []
+        for precedence, ops in sorted(groups.items()):
+            # At the unary precedence or above, a binary operator binds tighter than the prefix operators
+            position = next((index for index, level in enumerate(fixed) if level[0] > precedence), len(fixed))
+            associativity = "right" if all(op.associativity == "right" for op in ops) else "left"
+            levels.append((position, [op.symbol for op in ops], associativity))
+
+        result = []
+        for index, (_, name, symbols) in enumerate(fixed + [(None, None, None)]):
+            for position, custom, associativity in levels:
+                if position == index:
+                    result.append((f"custom_{len(result) - index + 1}", custom, associativity))
+            if name is not None:
+                result.append((name, symbols, "left"))
+        return result
+
+    def _custom_level(self, name: str, symbols: List[str], associativity: str, operand: str) -> str:
+        """Parser method for user-defined binary operators sharing one precedence"""
+        tokens = self._level_tokens(*symbols)
+        if associativity == "right":
+            return f'''
+    def _parse_{name}(self):
+        """Parse right-associative user-defined binary operators"""
+        start = self.pos
+        expr = self._parse_{operand}()
+
+        if self._match({tokens}):
+            op = self._value(self.pos - 1)
+            right = self._parse_{name}()
+            expr = self._at(BinaryOpNode(expr, op, right), self._line(start))
+
+        return expr
+'''
+        return f'''
+    def _parse_{name}(self):
+        """Parse user-defined binary operators"""
+        start = self.pos
+        expr = self._parse_{operand}()
+
+        while self._match({tokens}):
+            op = self._value(self.pos - 1)
+            right = self._parse_{operand}()
+            expr = self._at(BinaryOpNode(expr, op, right), self._line(start))
+
+        return expr
+'''
+
+    def _grammar_parser_parts(self) -> Dict[str, str]:
+        """Tables and driver for the statement forms in the grammar rules"""
+        if not self.grammar.roots:
+            return {"grammar_tables": "", "grammar_dispatch": "", "grammar_methods": "", "grammar_init": ""}
+        init = ""
+        if self.algorithm == "peg":
+            tables, dispatch, methods = self._peg_parser_parts()
+            init = '''
+        # Packrat memo per grammar rule, cleared for each statement
+        self._peg_memo = [{} if limit != 0 else None for limit in PEG_MEMO_LIMITS]
+        self._peg_expression_memo = {}
+        self._peg_hits = [0] * len(PEG_NAMES)
+        self._peg_misses = [0] * len(PEG_NAMES)
+        self._peg_peak = [0] * len(PEG_NAMES)'''
+        elif self.lalr is not None:
+            tables, dispatch, methods = self._lalr_parser_parts()
+        else:
+            tables, dispatch, methods = self._ll1_parser_parts()
+        methods += '''
+    def _rule_leaf(self, index: int):
+        """Child for a matched token: names and literals become nodes, other tokens their text"""
+        token_type = self.types[index]
+        if token_type is TokenType.IDENTIFIER:
+            return self._leaf(IdentifierNode, self._name(index), self._line(index))
+        value = self._value(index)
+        if token_type is TokenType.INTEGER:
+            return self._leaf(LiteralNode, int(value), self._line(index))
+        if token_type is TokenType.FLOAT:
+            return self._leaf(LiteralNode, float(value), self._line(index))
+        if token_type is TokenType.STRING:
+            return self._leaf(LiteralNode, value, self._line(index))
+        return value
+'''
+        return {"grammar_tables": tables, "grammar_dispatch": dispatch, "grammar_methods": methods,
+                "grammar_init": init}
+
+    def _ll1_parser_parts(self) -> Tuple[str, str, str]:
+        """LL(1) prediction table and a stack-based driver"""
+        grammar = self.grammar
+        names = [name for name in grammar.rules if name != grammar.STATEMENT]
+        ids = {name: i for i, name in enumerate(names)}
+
+        def symbol(item) -> str:
+            if isinstance(item, Terminal):
+                return f"(TERMINAL, TokenType.{item.name})"
+            if isinstance(item, NonTerminal):
+                return f"(RULE, {ids[item.name]})"
+            return "(EXPRESSION, None)"
+
+        productions = "\n".join(
+            f"    ({''.join(symbol(item) + ', ' for item in production.rhs)}),  # {production}"
+            for production in grammar.productions
+        )
+        table = "\n".join(
+            "    {" + ", ".join(f"TokenType.{token}: {index}" for token, index in sorted(grammar.table[name].items()))
+            + f"}},  # {name}"
+            for name in names
+        )
+        statements = ", ".join(
+            f"TokenType.{token}: {ids[grammar.productions[index].rhs[0].name]}"
+            for token, index in sorted(grammar.table[grammar.STATEMENT].items())
+            if not isinstance(grammar.productions[index].rhs[0], Expression)
+        )
+
+        tables = f'''
+# LL(1) tables generated from the grammar rules
+TERMINAL, RULE, EXPRESSION = 0, 1, 2
+RULE_NAMES = {names!r}
+# Helper rules for groups and repetitions add their children to the enclosing rule's node
+RULE_INLINE = {["#" in name for name in names]!r}
+PRODUCTIONS = [
+{productions}
+]
+LL1_TABLE = [
+{table}
+]
+# First token of each statement form
+STATEMENT_RULES = {{{statements}}}
+'''
+        dispatch = '''
+        # Statement forms from the grammar rules
+        rule = STATEMENT_RULES.get(current)
+        if rule is not None:
+            return self._parse_rule(rule)
+'''
+        methods = '''
+    def _parse_rule(self, rule: int) -> RuleNode:
+        """Parse a grammar rule with the LL(1) table, using an explicit stack"""
+        holder = RuleNode("", [])
+        stack = [(RULE, rule, holder)]
+        while stack:
+            kind, value, parent = stack.pop()
+            token_type = self.types[self.pos]
+            if kind == TERMINAL:
+                if token_type is not value:
+                    raise SyntaxError(f"Expected {value.name} at line {self._line(self.pos)}, got {token_type}")
+                parent.children.append(self._rule_leaf(self._advance()))
+            elif kind == EXPRESSION:
+                parent.children.append(self._parse_expression())
+            else:
+                production = LL1_TABLE[value].get(token_type)
+                if production is None:
+                    expected = ", ".join(sorted(t.name for t in LL1_TABLE[value]))
+                    raise SyntaxError(f"Unexpected {token_type.name} in {RULE_NAMES[value]} at line "
+                                      f"{self._line(self.pos)}, expected one of {expected}")
+                if not RULE_INLINE[value]:
+                    node = self._at(RuleNode(RULE_NAMES[value], []), self._line(self.pos))
+                    parent.children.append(node)
+                    parent = node
+                stack.extend((kind, value, parent) for kind, value in reversed(PRODUCTIONS[production]))
+        return holder.children[0]
+'''
+        return tables, dispatch, methods
+
+    def _lalr_parser_parts(self) -> Tuple[str, str, str]:
+        """Packed LALR(1) action/goto arrays and a shift-reduce driver"""
+        lalr = self.lalr
+        columns = ", ".join(f"TokenType.{name}: {i}" for i, name in enumerate(lalr.terminals[:-1]))
+        starts = ", ".join(f"TokenType.{name}" for name in self._lalr_start_tokens())
+        expression_start = ", ".join(f"TokenType.{name}" for name in sorted(self.grammar.expression_first))
+        productions = "\n".join(f"#   {i}: {production}" for i, production in enumerate(lalr.productions))
+        conflicts = "".join(f"# {conflict}\n" for conflict in lalr.conflicts)
+
+        tables = f'''
+from array import array
+
+# LALR(1) tables generated from the grammar rules ({lalr.state_count} states)
+{productions}
+{conflicts}LR_COLUMNS = {{{columns}}}
+# Column of the built-in expression parser
+LR_EXPRESSION = {len(lalr.terminals) - 1}
+LR_EXPRESSION_START = frozenset({{{expression_start}}})
+LR_STATEMENT_START = frozenset({{{starts}}})
+LR_NAMES = {lalr.nonterminals!r}
+# Helper rules for groups and repetitions add their children to the enclosing rule's node
+LR_INLINE = {["#" in name for name in lalr.nonterminals]!r}
+LR_LHS = {_int_array(lalr.lhs)}
+LR_LENGTH = {_int_array(lalr.lengths)}
+# Actions: shift to s is s + 1, reduce by p is -(p + 1), 0 is an error
+LR_ACTION_BASE = {_int_array(lalr.action_base)}
+LR_ACTION_CHECK = {_int_array(lalr.action_check)}
+LR_ACTION = {_int_array(lalr.action_value)}
+LR_DEFAULT_REDUCE = {_int_array(lalr.default_reduce)}
+LR_GOTO_BASE = {_int_array(lalr.goto_base)}
+LR_GOTO = {_int_array(lalr.goto_value)}
+'''
+        dispatch = '''
+        # Statement forms from the grammar rules
+        if current in LR_STATEMENT_START:
+            return self._parse_lalr()
+'''
+        methods = '''
+    def _parse_lalr(self) -> RuleNode:
+        """Parse a grammar rule statement with the LALR(1) tables"""
+        states = [0]
+        values = []
+        lines = []
+        while True:
+            token_type = self.types[self.pos]
+            state = states[-1]
+            column = LR_COLUMNS.get(token_type)
+            action = self._lr_action(state, column) if column is not None else 0
+            expression = False
+            if not action and token_type in LR_EXPRESSION_START:
+                action = self._lr_action(state, LR_EXPRESSION)
+                expression = action > 0
+            if not action:
+                action = LR_DEFAULT_REDUCE[state]
+
+            if action > 0:
+                states.append(action - 1)
+                lines.append(self._line(self.pos))
+                if expression:
+                    values.append(self._parse_expression())
+                else:
+                    values.append(self._rule_leaf(self._advance()))
+            elif action < 0:
+                production = -action - 1
+                count = len(values) - LR_LENGTH[production]
+                children = []
+                for value in values[count:]:
+                    if isinstance(value, list):
+                        children.extend(value)
+                    else:
+                        children.append(value)
+                line = lines[count] if count < len(lines) else self._line(self.pos)
+                del values[count:], states[count + 1:], lines[count:]
+                rule = LR_LHS[production]
+                if rule == 0:
+                    return children[0]
+                values.append(children if LR_INLINE[rule] else self._at(RuleNode(LR_NAMES[rule], children), line))
+                lines.append(line)
+                goto = states[-1]
+                states.append(LR_GOTO[LR_GOTO_BASE[goto] + rule])
+            else:
+                expected = ", ".join(sorted(t.name for t, c in LR_COLUMNS.items() if self._lr_action(state, c)))
+                raise SyntaxError(f"Unexpected {token_type.name} at line {self._line(self.pos)}, "
+                                  f"expected one of {expected}")
+
+    def _lr_action(self, state: int, column: int) -> int:
+        index = LR_ACTION_BASE[state] + column
+        return LR_ACTION[index] if LR_ACTION_CHECK[index] == state else 0
+'''
+        return tables, dispatch, methods
+
+    def _peg_parser_parts(self) -> Tuple[str, str, str]:
+        """Pattern tables and a memoizing backtracking driver (packrat parsing)"""
+        grammar = self.grammar
+        names = list(grammar.patterns)
+        ids = {name: i for i, name in enumerate(names)}
+        limits = {rule.name: rule.memo for rule in self.spec.grammar_rules}
+        # Statement forms that reach a left-recursive rule would never return
+        roots = [name for name in grammar.roots
+                 if not self._reachable_rules(name) & set(grammar.left_recursive)]
+        starts = sorted(set().union(*(grammar.first[name] for name in roots))) if roots else []
+
+        patterns = "\n".join(f"    {self._peg_pattern(grammar.patterns[name], ids)},  # {name}" for name in names)
+        tables = f'''
+import sys
+from typing import Dict
+
+# Packrat (PEG) tables generated from the grammar rules: alternatives are tried in order
+TERMINAL, RULE, EXPRESSION, SEQUENCE, CHOICE, REPEAT = range(6)
+PEG_NAMES = {names!r}
+PEG_RULES = [
+{patterns}
+]
+# Memo entries kept per rule and statement: None is unbounded (linear time), 0 disables the memo
+PEG_MEMO_LIMITS = {[limits.get(name) for name in names]!r}
+PEG_ROOTS = {[ids[name] for name in roots]!r}
+PEG_STATEMENT_START = frozenset({{{", ".join(f"TokenType.{name}" for name in starts)}}})
+# Approximate size of one memo entry: a dict slot and a (node, end) tuple
+PEG_ENTRY_SIZE = sys.getsizeof((None, 0)) + 3 * sys.getsizeof(0)
+'''
+        dispatch = '''
+        # Statement forms from the grammar rules, tried in order
+        if current in PEG_STATEMENT_START:
+            self._peg_clear()
+            for rule in PEG_ROOTS:
+                node = self._peg_rule(rule)
+                if node is not None:
+                    return node
+'''
+        methods = '''
+    def _peg_rule(self, rule: int) -> Optional[RuleNode]:
+        """Match a grammar rule at the current position, memoized per (rule, position)"""
+        start = self.pos
+        memo = self._peg_memo[rule]
+        if memo is not None and start in memo:
+            self._peg_hits[rule] += 1
+            node, self.pos = memo[start]
+            return node
+
+        self._peg_misses[rule] += 1
+        line = self._line(self.pos)
+        children = []
+        if self._peg_match(PEG_RULES[rule], children):
+            node = self._at(RuleNode(PEG_NAMES[rule], children), line)
+        else:
+            node = None
+        if memo is not None:
+            limit = PEG_MEMO_LIMITS[rule]
+            if limit is not None and len(memo) >= limit:
+                del memo[next(iter(memo))]  # Oldest entry
+            memo[start] = (node, self.pos)
+        return node
+
+    def _peg_match(self, pattern, children: list) -> bool:
+        """Match a pattern, appending to children; on failure nothing is consumed or appended"""
+        kind = pattern[0]
+        if kind == TERMINAL:
+            if self.types[self.pos] is not pattern[1]:
+                return False
+            children.append(self._rule_leaf(self._advance()))
+            return True
+        if kind == RULE or kind == EXPRESSION:
+            node = self._peg_rule(pattern[1]) if kind == RULE else self._peg_expression()
+            if node is None:
+                return False
+            children.append(node)
+            return True
+        if kind == CHOICE:
+            return any(self._peg_match(option, children) for option in pattern[1])
+
+        start, count = self.pos, len(children)
+        if kind == SEQUENCE:
+            for item in pattern[1]:
+                if not self._peg_match(item, children):
+                    self.pos = start
+                    del children[count:]
+                    return False
+            return True
+
+        # REPEAT: greedy, at least pattern[2] and at most pattern[3] (None for no limit) times
+        matched = 0
+        while pattern[3] is None or matched < pattern[3]:
+            before = self.pos
+            if not self._peg_match(pattern[1], children) or self.pos == before:
+                break
+            matched += 1
+        if matched < pattern[2]:
+            self.pos = start
+            del children[count:]
+            return False
+        return True
+
+    def _peg_expression(self) -> Optional[ASTNode]:
+        """The built-in expression parser as a memoized PEG rule that fails instead of raising"""
+        start = self.pos
+        memo = self._peg_expression_memo
+        if start in memo:
+            node, self.pos = memo[start]
+            return node
+        try:
+            node = self._parse_expression()
+        except SyntaxError:
+            node = None
+            self.pos = start
+        memo[start] = (node, self.pos)
+        return node
+
+    def _peg_clear(self):
+        """Drop the memo of the previous statement; no later match can start before this one"""
+        for rule, memo in enumerate(self._peg_memo):
+            if memo is not None:
+                self._peg_peak[rule] = max(self._peg_peak[rule], len(memo))
+                memo.clear()
+        self._peg_expression_memo.clear()
+
+    def memo_stats(self) -> Dict[str, Dict[str, float]]:
+        """Memo hits, misses, hit rate and peak entries and bytes per grammar rule"""
+        stats = {}
+        for rule, name in enumerate(PEG_NAMES):
+            memo = self._peg_memo[rule]
+            peak = max(self._peg_peak[rule], len(memo) if memo is not None else 0)
+            lookups = self._peg_hits[rule] + self._peg_misses[rule]
+            stats[name] = {
+                "hits": self._peg_hits[rule],
+                "misses": self._peg_misses[rule],
+                "hit_rate": self._peg_hits[rule] / lookups if lookups else 0.0,
+                "peak_entries": peak,
+                "peak_bytes": peak * PEG_ENTRY_SIZE,
+            }
+        return stats
+'''
+        return tables, dispatch, methods
+
+    def _peg_pattern(self, pattern: Pattern, ids: Dict[str, int]) -> str:
+        """Source for a pattern as nested (kind, ...) tuples"""
+        if isinstance(pattern, Terminal):
+            return f"(TERMINAL, TokenType.{pattern.name})"
+        if isinstance(pattern, NonTerminal):
+            return f"(RULE, {ids[pattern.name]})"
+        if isinstance(pattern, Expression):
+            return "(EXPRESSION, None)"
+        if isinstance(pattern, Repeat):
+            bounds = {'*': (0, None), '+': (1, None), '?': (0, 1)}[pattern.kind]
+            return f"(REPEAT, {self._peg_pattern(pattern.item, ids)}, {bounds[0]}, {bounds[1]})"
+        kind, items = ("SEQUENCE", pattern.items) if isinstance(pattern, Sequence) else ("CHOICE", pattern.options)
+        return f"({kind}, ({''.join(self._peg_pattern(item, ids) + ', ' for item in items)}))"
+
+    def _reachable_rules(self, name: str) -> Set[str]:
+        """Grammar rules a rule uses, directly or through other rules"""
+        seen, stack = set(), [name]
+        while stack:
+            current = stack.pop()
+            if current not in seen:
+                seen.add(current)
+                stack.extend(references(self.grammar.patterns[current]))
+        return seen
+
+    def _lalr_start_tokens(self) -> List[str]:
+        """Tokens that begin a grammar rule statement in the LALR(1) parser"""
+        tokens = [name for name in self.lalr.start_terminals if name in self.grammar.token_names]
+        if len(tokens) < len(self.lalr.start_terminals):
+            # A statement form can start with an expression
+            tokens = sorted(set(tokens) | self.grammar.expression_first)
+        return tokens
+
+    def _level_tokens(self, *symbols: str) -> str:
+        """TokenType arguments for the operators of a precedence level the spec defines"""
+        defined = {op.symbol for op in self.spec.operators}
+        return ", ".join(f"TokenType.{self._token_name(symbol)}" for symbol in symbols if symbol in defined)
+
+    def _generate_ast_nodes(self, version: str) -> str:
         """Generate AST node class definitions"""
         code = '''"""
 AST Node definitions for {name}
 Auto-generated by Illiterate Wizard
 """
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any, List, Optional
 
+# Identifies the lexer/parser/AST this module was generated with; cached ASTs must match
+AST_VERSION = "{version}"
+
 
 @dataclass
 class ASTNode:
     """Base class for all AST nodes"""
-    pass
+    # Source line the node starts on (0 when unknown); not a dataclass field
+    line = 0
 
 
 @dataclass
@@ -596,6 +1549,8 @@ class BinaryOpNode(ASTNode):
     left: ASTNode
     operator: str
     right: ASTNode
+    # Operator callable, resolved by the interpreter on first evaluation
+    op_func: Any = field(default=None, repr=False, compare=False)
 
 
 @dataclass
@@ -605,6 +1560,19 @@ class UnaryOpNode(ASTNode):
     operand: ASTNode
 
 
+@dataclass
+class ArrayLiteralNode(ASTNode):
+    """Array literal"""
+    elements: List[ASTNode]
+
+
+@dataclass
+class IndexNode(ASTNode):
+    """Index expression"""
+    target: ASTNode
+    index: ASTNode
+
+
 @dataclass
 class AssignmentNode(ASTNode):
     """Assignment expression"""
@@ -617,6 +1585,8 @@ class FunctionCallNode(ASTNode):
     """Function call"""
     name: str
     arguments: List[ASTNode]
+    # Inline cache of (environment version, global scope, callable) for this call site
+    call_cache: Any = field(default=None, repr=False, compare=False)
 
 
 @dataclass
@@ -625,6 +1595,13 @@ class ExpressionStatementNode(ASTNode):
     expression: ASTNode
 
 
+@dataclass
+class RuleNode(ASTNode):
+    """Statement form parsed from a grammar rule; children are nodes and matched token text"""
+    rule: str
+    children: List[Any]
+
+
 @dataclass
 class BlockNode(ASTNode):
     """Block of statements"""
@@ -677,4 +1654,676 @@ class VariableDeclarationNode(ASTNode):
     initializer: Optional[ASTNode] = None
 '''
 
-        return code.format(name=self.spec.name)
+        return code.format(name=self.spec.name, version=version)
+
+    def _generate_incremental(self) -> str:
+        """Generate the incremental re-lexer and re-parser used for live editing"""
+        return '''"""
+Incremental lexing and parsing
+Auto-generated by Illiterate Wizard
+
+A Document keeps the tokens and AST of each top-level statement. edit() relexes
+from the last statement that cannot have been affected until the new tokens line
+up with an old statement again, then reparses only the statements in between.
+Positions of the statements after an edit are shifted lazily: statements from
+index `_gap` on store offsets and lines relative to the pending shift, which is
+applied as the gap moves past them. Moving the gap costs one addition per
+statement, plus a walk over tokens and AST when the edit changed the line count.
+
+Run `python incremental.py FILE` to time single-character edits on a file.
+"""
+
+import random
+import sys
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+from ast_nodes import ASTNode, ProgramNode
+from lexer import Lexer, Token, TokenType
+from parser import Parser
+
+
+class Segment:
+    """The tokens and AST of one top-level statement"""
+    __slots__ = ("start", "tokens", "node")
+
+    def __init__(self, tokens: List[Token], node: Optional[ASTNode]):
+        # Token offsets are kept relative to the statement, so moving it only changes `start`
+        self.start = tokens[0].start
+        for token in tokens:
+            token.start -= self.start
+        self.tokens = tokens
+        self.node = node
+
+
+@dataclass
+class StatementChange:
+    """Top-level statements [start, start + removed) were replaced by `statements`"""
+    start: int
+    removed: int
+    statements: List[Optional[ASTNode]]
+
+
+def _shift_lines(node: ASTNode, delta: int):
+    """Move every line number recorded in an AST by delta"""
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, ASTNode):
+            if "line" in item.__dict__:
+                item.line += delta
+            stack.extend(item.__dict__.values())
+        elif isinstance(item, list):
+            stack.extend(item)
+
+
+class Document:
+    def __init__(self, source: str = ""):
+        self.source = source
+        self._segments: List[Segment] = []
+        self._eof: Optional[Token] = None
+        self._gap = 0
+        self._shift = 0
+        self._line_shift = 0
+        # Set while the source does not lex or parse; the next edit starts over
+        self.error: Optional[SyntaxError] = None
+        try:
+            self._rebuild()
+        except SyntaxError as e:
+            self.error = e
+
+    @property
+    def program(self) -> ProgramNode:
+        """AST of the whole document"""
+        self._check_valid()
+        self._move_gap(len(self._segments))
+        return ProgramNode([segment.node for segment in self._segments if segment.node])
+
+    @property
+    def tokens(self) -> List[Token]:
+        """Token stream of the whole document"""
+        self._check_valid()
+        self._move_gap(len(self._segments))
+        return [token for index in range(len(self._segments)) for token in self._exact_tokens(index)] + [self._eof]
+
+    def edit(self, offset: int, removed: int, inserted: str) -> StatementChange:
+        """Replace `removed` characters at `offset` with `inserted` and update the AST"""
+        if offset < 0 or removed < 0 or offset + removed > len(self.source):
+            raise ValueError(f"Edit ({offset}, {removed}) is outside the document")
+        self.source = self.source[:offset] + inserted + self.source[offset + removed:]
+        try:
+            if self.error is not None:
+                old_count = len(self._segments)
+                self._rebuild()
+                self.error = None
+                return StatementChange(0, old_count, [segment.node for segment in self._segments])
+            return self._apply(offset, removed, len(inserted))
+        except SyntaxError as e:
+            self.error = e
+            raise
+
+    def _check_valid(self):
+        if self.error is not None:
+            raise self.error
+
+    def _rebuild(self):
+        """Lex and parse the whole source"""
+        tokens = Lexer(self.source).tokenize()
+        parser = Parser(tokens)
+        segments = []
+        while not parser._check(TokenType.EOF):
+            start = parser.pos
+            node = parser._parse_statement()
+            segments.append(Segment(tokens[start:parser.pos], node))
+        self._segments = segments
+        self._eof = tokens[-1]
+        self._gap = len(segments)
+        self._shift = self._line_shift = 0
+
+    def _move_gap(self, index: int):
+        """Make the statements before index hold exact positions"""
+        segments, gap = self._segments, self._gap
+        if self._shift or self._line_shift:
+            if index > gap:
+                self._shift_segments(segments[gap:index], self._shift, self._line_shift)
+            elif index < gap:
+                self._shift_segments(segments[index:gap], -self._shift, -self._line_shift)
+        self._gap = index
+
+    @staticmethod
+    def _shift_segments(segments: List[Segment], delta: int, line_delta: int):
+        for segment in segments:
+            segment.start += delta
+            if line_delta:
+                for token in segment.tokens:
+                    token.line += line_delta
+                if segment.node is not None:
+                    _shift_lines(segment.node, line_delta)
+
+    def _pending(self, index: int):
+        """Offset and line shift still to be applied to a statement"""
+        return (0, 0) if index < self._gap else (self._shift, self._line_shift)
+
+    def _first_token(self, index: int) -> Token:
+        """Copy of the first token of a statement at its exact position"""
+        segment = self._segments[index]
+        token = segment.tokens[0]
+        shift, line_shift = self._pending(index)
+        return Token(token.type, token.value, token.line + line_shift, token.column,
+                     segment.start + shift, token.length)
+
+    def _exact_tokens(self, index: int) -> List[Token]:
+        """Copies of a statement's tokens at their exact positions"""
+        segment = self._segments[index]
+        shift, line_shift = self._pending(index)
+        start = segment.start + shift
+        return [Token(token.type, token.value, token.line + line_shift, token.column,
+                      start + token.start, token.length) for token in segment.tokens]
+
+    def _restart_segment(self, offset: int) -> int:
+        """Last statement whose first token ends before offset; the ones before it cannot change"""
+        low, high = 0, len(self._segments)
+        while low < high:
+            middle = (low + high) // 2
+            token = self._first_token(middle)
+            if token.start + token.length < offset:
+                low = middle + 1
+            else:
+                high = middle
+        return max(low - 1, 0)
+
+    def _apply(self, offset: int, removed: int, inserted: int) -> StatementChange:
+        segments = self._segments
+        count = len(segments)
+        delta = inserted - removed
+        damage_end = offset + removed
+        first = self._restart_segment(offset)
+
+        # Relex until a new token starts where an old statement did, past the edit
+        if first:
+            restart = self._first_token(first)
+            lexer = Lexer(self.source, restart.start, restart.line, restart.column)
+        else:
+            # Leading comments and whitespace may have been edited
+            lexer = Lexer(self.source)
+        resume = first + 1
+        sync = None
+        while sync is None and lexer.step():
+            if not lexer.tokens:
+                continue
+            old_start = lexer.tokens[-1].start - delta
+            if old_start < damage_end:
+                continue
+            while resume < count and self._first_token(resume).start < old_start:
+                resume += 1
+            if resume < count and self._first_token(resume).start == old_start:
+                sync = lexer.tokens.pop()
+        if sync is None:
+            resume = count
+        region = lexer.tokens
+
+        # Statements from `resume` on are reused; bring their stored positions up to date
+        self._move_gap(resume)
+        if sync is not None:
+            old = self._first_token(resume)
+            self._shift_columns(resume, old, sync.column - old.column)
+            eof = self._eof
+            eof.start += delta
+            eof.line += sync.line - old.line
+            self._line_shift += sync.line - old.line
+        else:
+            eof = lexer.eof()
+        self._shift += delta
+        self._eof = eof
+
+        parsed, absorbed = self._parse_region(region, resume)
+        segments[first:resume + absorbed] = parsed
+        self._gap = first + len(parsed)
+        return StatementChange(first, resume + absorbed - first, [segment.node for segment in parsed])
+
+    def _shift_columns(self, index: int, old: Token, delta: int):
+        """Fix columns of the reused tokens that share a line with the edit"""
+        if not delta:
+            return
+        if self._eof.line == old.line:
+            self._eof.column += delta
+        stored_line = self._segments[index].tokens[0].line
+        for segment in self._segments[index:]:
+            for token in segment.tokens:
+                if token.line != stored_line:
+                    return
+                token.column += delta
+
+    def _parse_region(self, region: List[Token], resume: int):
+        """Parse the relexed tokens into statements.
+
+        A statement may run on into the statements after the region, so the parser
+        also sees exact copies of the next few; when it reaches the end of those
+        before a statement boundary, it retries with twice as many. Returns the new
+        statements and how many of the following old statements they replace.
+        """
+        count = len(self._segments)
+        parsed = []
+        pos = 0
+        lookahead = 1
+        while True:
+            tokens = list(region)
+            boundaries = []
+            for index in range(resume, min(resume + lookahead, count)):
+                tokens.extend(self._exact_tokens(index))
+                boundaries.append(len(tokens))
+            complete = resume + lookahead >= count
+            tokens.append(self._eof)
+            end = len(tokens) - 1
+
+            parser = Parser(tokens)
+            parser.pos = pos
+            try:
+                while parser.pos < end and parser.pos != len(region) and parser.pos not in boundaries:
+                    start = parser.pos
+                    node = parser._parse_statement()
+                    if parser.pos == end and not complete:
+                        break
+                    parsed.append((tokens[start:parser.pos], node))
+                    pos = parser.pos
+                else:
+                    absorbed = sum(1 for boundary in boundaries if boundary <= pos)
+                    return [Segment(tokens, node) for tokens, node in parsed], absorbed
+            except SyntaxError:
+                if complete or parser.pos < end:
+                    raise
+            lookahead *= 2
+
+
+def benchmark(path: str, bursts: int = 50, keystrokes: int = 10):
+    """Time typing bursts: move to a random statement, type a few characters and delete half of them"""
+    with open(path) as f:
+        source = f.read()
+    began = time.perf_counter()
+    document = Document(source)
+    document._check_valid()
+    print(f"Full parse of {len(source.splitlines())} lines: {(time.perf_counter() - began) * 1000:.1f} ms")
+
+    rng = random.Random(0)
+    jumps, typing = [], []
+    for _ in range(bursts):
+        offset = document._first_token(rng.randrange(len(document._segments))).start
+        edits = [(offset + i, 0, " ") for i in range(keystrokes)]
+        edits += [(offset + i, 1, "") for i in reversed(range(keystrokes // 2, keystrokes))]
+        for i, edit in enumerate(edits):
+            began = time.perf_counter()
+            document.edit(*edit)
+            (typing if i else jumps).append(time.perf_counter() - began)
+
+    for label, timings in (("first edit after a jump", jumps), ("edits while typing", typing)):
+        timings.sort()
+        print(f"{len(timings)} {label}: median {timings[len(timings) // 2] * 1e6:.0f} us, "
+              f"p95 {timings[int(len(timings) * 0.95)] * 1e6:.0f} us")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python incremental.py <source_file>")
+        sys.exit(1)
+    benchmark(sys.argv[1])
+'''
+
+    def _generate_ast_codec(self) -> str:
+        """Generate the compact binary AST encoding"""
+        return '''"""
+Binary AST codec
+Auto-generated by Illiterate Wizard
+
+A compact alternative to pickling ASTs for caches, worker IPC and snapshots. A
+stream is MAGIC and the AST_VERSION, then one frame per top-level statement (a
+varint byte length and the statement's encoding), ending with an empty frame.
+Each value starts with a one-byte tag:
+
+    NONE, TRUE, FALSE     no payload
+    INT                   zigzag varint
+    FLOAT                 8-byte little-endian double
+    STRING                varint byte length and UTF-8 bytes, added to the string table
+    STRING_REF            varint index into the string table
+    LIST                  varint item count, then the items
+    NODE_BASE + kind      varint line, then the node's fields in order
+
+The string table is shared by all frames of a stream, so each identifier and
+string literal is stored once, and decoded strings are interned. Leaves without
+a line come from a parser in interning mode and are shared again when decoded.
+iter_statements decodes a frame at a time, so a stream can be consumed without
+holding all of it in memory.
+"""
+
+import io
+import struct
+import sys
+from dataclasses import fields
+from typing import Any, BinaryIO, Dict, Iterator, List, Tuple
+
+import ast_nodes
+from ast_nodes import AST_VERSION, ASTNode, ProgramNode
+
+MAGIC = b"ASTB"
+NONE, TRUE, FALSE, INT, FLOAT, STRING, STRING_REF, LIST = range(8)
+NODE_BASE = 16
+
+DOUBLE = struct.Struct("<d")
+
+# Node classes by kind, and the fields each one encodes: those compared for
+# equality, which leaves out the interpreter's inline caches. The caches come
+# last, so the encoded fields can be passed to the constructor positionally.
+NODE_TYPES = sorted(
+    (cls for cls in vars(ast_nodes).values()
+     if isinstance(cls, type) and issubclass(cls, ASTNode) and cls is not ASTNode),
+    key=lambda cls: cls.__name__,
+)
+NODE_FIELDS = [tuple(f.name for f in fields(cls) if f.compare) for cls in NODE_TYPES]
+NODE_TAGS = {cls: NODE_BASE + kind for kind, cls in enumerate(NODE_TYPES)}
+LEAF_KINDS = {NODE_TYPES.index(ast_nodes.LiteralNode), NODE_TYPES.index(ast_nodes.IdentifierNode)}
+
+
+class ASTCodecError(ValueError):
+    """Raised for values that cannot be encoded and for malformed streams"""
+
+
+def _write_varint(value: int, out: bytearray):
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+class Encoder:
+    """Encodes statements as frames that share one string table"""
+
+    def __init__(self):
+        self.strings: Dict[str, int] = {}
+
+    def frame(self, node: ASTNode) -> bytes:
+        """The length-prefixed encoding of one statement"""
+        body = bytearray()
+        self._value(node, body)
+        out = bytearray()
+        _write_varint(len(body), out)
+        return bytes(out + body)
+
+    def _value(self, value: Any, out: bytearray):
+        tag = NODE_TAGS.get(type(value))
+        if tag is not None:
+            out.append(tag)
+            _write_varint(value.line, out)
+            for name in NODE_FIELDS[tag - NODE_BASE]:
+                self._value(getattr(value, name), out)
+        elif type(value) is str:
+            index = self.strings.get(value)
+            if index is None:
+                self.strings[value] = len(self.strings)
+                data = value.encode("utf-8")
+                out.append(STRING)
+                _write_varint(len(data), out)
+                out += data
+            else:
+                out.append(STRING_REF)
+                _write_varint(index, out)
+        elif value is None:
+            out.append(NONE)
+        elif value is True:
+            out.append(TRUE)
+        elif value is False:
+            out.append(FALSE)
+        elif type(value) is int:
+            out.append(INT)
+            _write_varint(value << 1 if value >= 0 else (-value << 1) - 1, out)
+        elif type(value) is float:
+            out.append(FLOAT)
+            out += DOUBLE.pack(value)
+        elif type(value) is list:
+            out.append(LIST)
+            _write_varint(len(value), out)
+            for item in value:
+                self._value(item, out)
+        else:
+            raise ASTCodecError(f"Cannot encode {type(value).__name__} value {value!r}")
+
+
+class Decoder:
+    """Decodes the frames of one stream, rebuilding its string table as it goes"""
+
+    def __init__(self):
+        self.strings: List[str] = []
+        self.leaves: Dict[Any, ASTNode] = {}
+
+    def decode_frame(self, data: bytes) -> ASTNode:
+        """Decode the body of one frame"""
+        try:
+            node, pos = self._value(data, 0)
+        except (IndexError, TypeError, struct.error, UnicodeDecodeError) as e:
+            raise ASTCodecError(f"Malformed AST frame: {e}") from None
+        if pos != len(data):
+            raise ASTCodecError("Malformed AST frame: trailing bytes")
+        return node
+
+    def _value(self, data: bytes, pos: int) -> Tuple[Any, int]:
+        tag = data[pos]
+        pos += 1
+        if tag >= NODE_BASE:
+            kind = tag - NODE_BASE
+            line, pos = _read_varint(data, pos)
+            args = []
+            for _ in NODE_FIELDS[kind]:
+                value, pos = self._value(data, pos)
+                args.append(value)
+            node = NODE_TYPES[kind](*args)
+            if line:
+                node.line = line
+            elif kind in LEAF_KINDS:
+                node = self.leaves.setdefault((kind, args[0].__class__, args[0]), node)
+            return node, pos
+        if tag == STRING_REF:
+            index, pos = _read_varint(data, pos)
+            return self.strings[index], pos
+        if tag == STRING:
+            size, pos = _read_varint(data, pos)
+            value = sys.intern(str(data[pos:pos + size], "utf-8"))
+            self.strings.append(value)
+            return value, pos + size
+        if tag == LIST:
+            count, pos = _read_varint(data, pos)
+            items = []
+            for _ in range(count):
+                value, pos = self._value(data, pos)
+                items.append(value)
+            return items, pos
+        if tag == INT:
+            value, pos = _read_varint(data, pos)
+            return (value >> 1) if not value & 1 else -((value + 1) >> 1), pos
+        if tag == FLOAT:
+            return DOUBLE.unpack_from(data, pos)[0], pos + DOUBLE.size
+        if tag == NONE:
+            return None, pos
+        if tag == TRUE:
+            return True, pos
+        if tag == FALSE:
+            return False, pos
+        raise ASTCodecError(f"Malformed AST frame: unknown tag {tag}")
+
+
+def write_program(program: ProgramNode, stream: BinaryIO):
+    """Write a program to a binary stream"""
+    stream.write(MAGIC + AST_VERSION.encode())
+    encoder = Encoder()
+    for statement in program.statements:
+        stream.write(encoder.frame(statement))
+    stream.write(bytes(1))
+
+
+def iter_statements(stream: BinaryIO) -> Iterator[ASTNode]:
+    """Yield a program's statements as their frames are read from a binary stream"""
+    header = MAGIC + AST_VERSION.encode()
+    if stream.read(len(header)) != header:
+        raise ASTCodecError("Not an AST stream for this AST_VERSION")
+    decoder = Decoder()
+    while True:
+        size = shift = 0
+        while True:
+            byte = stream.read(1)
+            if not byte:
+                raise ASTCodecError("Truncated AST stream")
+            size |= (byte[0] & 0x7F) << shift
+            if byte[0] < 0x80:
+                break
+            shift += 7
+        if size == 0:
+            return
+        data = stream.read(size)
+        if len(data) != size:
+            raise ASTCodecError("Truncated AST stream")
+        yield decoder.decode_frame(data)
+
+
+def read_program(stream: BinaryIO) -> ProgramNode:
+    """Read a whole program from a binary stream"""
+    return ProgramNode(list(iter_statements(stream)))
+
+
+def encode(program: ProgramNode) -> bytes:
+    """The encoding of a program as bytes"""
+    stream = io.BytesIO()
+    write_program(program, stream)
+    return stream.getvalue()
+
+
+def decode(data: bytes) -> ProgramNode:
+    """A program from its encoding"""
+    return read_program(io.BytesIO(data))
+'''
+
+    def _generate_ast_cache(self) -> str:
+        """Generate the on-disk cache of parsed ASTs"""
+        return '''"""
+Parsed-AST cache
+Auto-generated by Illiterate Wizard
+
+Parsed programs are stored in __astcache__/<file>.<path hash>.astc next to the
+source, much like Python's __pycache__, in the binary encoding of ast_codec. The
+hash of the resolved source path keeps same-named files apart in a shared cache
+directory. An entry is used when its AST_VERSION matches and the source has the
+recorded mtime and size, or failing that the recorded hash.
+
+Source files are memory-mapped rather than read, and lexed in place by ByteLexer,
+so a large program is never held in memory as a str. ASTs parsed in interning
+mode are cached under their own magic, so each mode only loads its own entries.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple, Union
+
+from ast_codec import ASTCodecError, read_program, write_program
+from ast_nodes import AST_VERSION, ProgramNode
+from lexer import ByteLexer, Lexer
+from parser import Parser
+
+MAGIC = b"ASTC"
+INTERNED_MAGIC = b"ASTI"
+CACHE_DIR_NAME = "__astcache__"
+# magic, AST version, source mtime (ns), source size, source sha256
+HEADER = struct.Struct("<4s16sqq32s")
+
+
+def cache_path(filepath: str, cache_dir: Optional[str] = None) -> str:
+    """Location of the cache entry for a source file"""
+    directory = cache_dir or os.path.join(os.path.dirname(os.path.abspath(filepath)), CACHE_DIR_NAME)
+    key = hashlib.sha256(os.fsencode(os.path.realpath(filepath))).hexdigest()[:16]
+    return os.path.join(directory, f"{os.path.basename(filepath)}.{key}.astc")
+
+
+def parse_source(source: Union[str, bytes, mmap.mmap], intern: bool = False) -> ProgramNode:
+    """Lex and parse source text, or UTF-8 source in a byte buffer"""
+    if isinstance(source, str):
+        return Parser(Lexer(source).tokenize_buffer(), intern=intern).parse()
+    return Parser(ByteLexer(source).tokenize(), intern=intern).parse()
+
+
+@contextmanager
+def mapped_source(filepath: str) -> Iterator[Union[bytes, mmap.mmap]]:
+    """Map a source file read-only; an empty file, which cannot be mapped, gives empty bytes"""
+    with open(filepath, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield data
+
+
+def read_source(filepath: str) -> str:
+    """The text of a source file, for tools that show source lines"""
+    with open(filepath, encoding="utf-8") as f:
+        return f.read()
+
+
+def load_program(filepath: str, cache_dir: Optional[str] = None, use_cache: bool = True,
+                 intern: bool = False) -> ProgramNode:
+    """Return the AST of a source file, using the cache when valid"""
+    if not use_cache:
+        with mapped_source(filepath) as data:
+            return parse_source(data, intern)
+
+    magic = INTERNED_MAGIC if intern else MAGIC
+    stat = os.stat(filepath)
+    path = cache_path(filepath, cache_dir)
+    with mapped_source(filepath) as data:
+        digest = None
+        try:
+            with open(path, "rb") as f:
+                cached_magic, version, mtime, size, cached_digest = HEADER.unpack(f.read(HEADER.size))
+                if cached_magic == magic and version == AST_VERSION.encode():
+                    fresh = mtime == stat.st_mtime_ns and size == stat.st_size
+                    if not fresh:
+                        digest = hashlib.sha256(data).digest()
+                    if fresh or digest == cached_digest:
+                        return read_program(f)
+        except (OSError, struct.error, ASTCodecError):
+            pass
+
+        ast = parse_source(data, intern)
+        digest = digest or hashlib.sha256(data).digest()
+    _store(path, magic, ast, stat, digest)
+    return ast
+
+
+def load_ast(filepath: str, cache_dir: Optional[str] = None, use_cache: bool = True) -> Tuple[str, ProgramNode]:
+    """Read a source file and return its text and AST, using the cache when valid"""
+    return read_source(filepath), load_program(filepath, cache_dir, use_cache)
+
+
+def _store(path: str, magic: bytes, ast: ProgramNode, stat: os.stat_result, digest: bytes):
+    """Write a cache entry atomically; caching is best effort"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(magic, AST_VERSION.encode(), stat.st_mtime_ns, stat.st_size, digest))
+            write_program(ast, f)
+        os.replace(tmp_path, path)
+    except (OSError, ASTCodecError, RecursionError):
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+'''
@@ -159,6 +159,8 @@ async def generate_language(request: GenerateRequest):
         parser_gen = ParserGenerator(spec)
         parser_files = parser_gen.generate(output_dir)
         result["files_generated"].extend(parser_files)
+        # Grammar rules the parser could not use, and conflicts it resolved
+        result["grammar_report"] = parser_gen.grammar_report()
 
         # Generate interpreter or compiler
         if spec.language_type == "interpreted":
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import List, Dict, Optional, Literal
 from enum import Enum
 
@@ -26,6 +26,7 @@ class GrammarRule(BaseModel):
     node_id: str  # For visual representation
     x: float = 0  # Position in visual editor
     y: float = 0
+    memo: Optional[int] = None  # PEG memo entries kept per statement; None is unbounded, 0 disables
 
 
 class SyntaxRule(BaseModel):
@@ -48,19 +49,30 @@ class SemanticAction(BaseModel):
 class BuiltinFunction(BaseModel):
     """Built-in function definition"""
     name: str
-    parameters: List[Dict[str, DataType]]
+    parameters: List[Dict[str, str]]  # [{"name": ..., "type": DataType}]
     return_type: DataType
     implementation: str  # Code template or actual implementation
     description: str
 
 
+# Operators the generated runtimes implement natively, so their implementation may be left empty
+NATIVE_OPERATORS = {"=", "||", "&&", "==", "!=", "<", ">", "<=", ">=", "+", "-", "*", "/", "%", "!"}
+
+
 class Operator(BaseModel):
     """Operator definition"""
     symbol: str
     precedence: int
     associativity: Literal["left", "right"]
     operation_type: str  # e.g., "arithmetic", "logical", "comparison"
-    implementation: str
+    implementation: str  # Python expression over the operands a and b
+
+    @model_validator(mode="after")
+    def check_implementation(self) -> "Operator":
+        if not self.implementation.strip() and self.symbol not in NATIVE_OPERATORS:
+            raise ValueError(f"Operator '{self.symbol}' needs an implementation, "
+                             f"a Python expression over its operands a and b such as 'a + b'")
+        return self
 
 
 class Keyword(BaseModel):
@@ -79,6 +91,7 @@ class LanguageSpecification(BaseModel):
 
     # Grammar and syntax
     grammar_rules: List[GrammarRule] = Field(default_factory=list)
+    grammar_mode: Literal["auto", "lalr", "peg"] = "auto"  # How grammar rule statements are parsed
     syntax_rules: List[SyntaxRule] = Field(default_factory=list)
     semantic_actions: List[SemanticAction] = Field(default_factory=list)
 
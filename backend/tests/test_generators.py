@@ -3,6 +3,11 @@ Tests for language generators
 """
 import pytest
 from pathlib import Path
+import importlib
+import io
+import operator
+import os
+import sys
 import tempfile
 import shutil
 
@@ -65,6 +70,38 @@ def sample_spec():
     )
 
 
+@pytest.fixture
+def runtime_spec():
+    """Create a specification with every operator the generated parser understands"""
+    symbols = [
+        ("=", 1, "right", "assignment", "a = b"),
+        ("||", 2, "left", "logical", "a or b"),
+        ("&&", 3, "left", "logical", "a and b"),
+        ("==", 5, "left", "comparison", "a == b"),
+        ("!=", 5, "left", "comparison", "a != b"),
+        ("<", 6, "left", "comparison", "a < b"),
+        (">", 6, "left", "comparison", "a > b"),
+        ("<=", 6, "left", "comparison", "a <= b"),
+        (">=", 6, "left", "comparison", "a >= b"),
+        ("+", 10, "left", "arithmetic", "a + b"),
+        ("-", 10, "left", "arithmetic", "a - b"),
+        ("*", 20, "left", "arithmetic", "a * b"),
+        ("/", 20, "left", "arithmetic", "a / b"),
+        ("%", 20, "left", "arithmetic", "a % b"),
+        ("!", 30, "right", "logical", "not a"),
+    ]
+    return LanguageSpecification(
+        name="RunLang",
+        description="A language whose generated runtime is executed by the tests",
+        language_type=LanguageType.INTERPRETED,
+        keywords=[Keyword(word="if", category="control_flow", description="Conditional statement")],
+        operators=[
+            Operator(symbol=sym, precedence=prec, associativity=assoc, operation_type=kind, implementation=impl)
+            for sym, prec, assoc, kind, impl in symbols
+        ]
+    )
+
+
 @pytest.fixture
 def temp_output_dir():
     """Create a temporary directory for output"""
@@ -73,6 +110,44 @@ def temp_output_dir():
     shutil.rmtree(temp_dir)
 
 
+@pytest.fixture
+def table_cache(tmp_path, monkeypatch):
+    """Keep LALR(1) tables built by a test out of the backend's storage"""
+    monkeypatch.setattr(ParserGenerator, "TABLE_CACHE_DIR", tmp_path / "parse_tables")
+    monkeypatch.setattr(ParserGenerator, "_table_cache", {})
+    return tmp_path / "parse_tables"
+
+
+GENERATED_MODULES = [
+    "lexer", "parser", "ast_nodes", "interpreter", "environment", "lang_builtins", "profiler", "debugger",
+    "ast_cache", "ast_codec", "incremental", "codegen", "compiler", "runlang", "type_inference",
+]
+
+
+def load_generated(output_dir, *names):
+    """Import freshly generated modules from output_dir"""
+    for name in GENERATED_MODULES:
+        sys.modules.pop(name, None)
+    sys.path.insert(0, str(output_dir))
+    try:
+        return [importlib.import_module(name) for name in names]
+    finally:
+        sys.path.remove(str(output_dir))
+
+
+def run_program(spec, output_dir, source):
+    """Generate an interpreted language and run source through it"""
+    ParserGenerator(spec).generate(output_dir)
+    InterpreterGenerator(spec).generate(output_dir)
+    lexer, parser, interpreter = load_generated(output_dir, "lexer", "parser", "interpreter")
+
+    tokens = lexer.Lexer(source).tokenize()
+    ast = parser.Parser(tokens).parse()
+    runtime = interpreter.Interpreter()
+    runtime.interpret(ast)
+    return runtime
+
+
 class TestParserGenerator:
     def test_generate_creates_files(self, sample_spec, temp_output_dir):
         """Test that parser generator creates all expected files"""
@@ -113,6 +188,83 @@ class TestParserGenerator:
         for operator in sample_spec.operators:
             assert operator.symbol in content
 
+    def test_lexer_matches_longest_operator(self, runtime_spec, temp_output_dir):
+        """Test maximal munch over operators of any length"""
+        for symbol in ["<=>", "<==>", "**"]:
+            runtime_spec.operators.append(Operator(symbol=symbol, precedence=6, associativity="left",
+                                                   operation_type="comparison", implementation="a < b"))
+        ParserGenerator(runtime_spec).generate(temp_output_dir)
+        lexer, = load_generated(temp_output_dir, "lexer")
+
+        tokens = lexer.Lexer("a<==>b<=>c<=<d**e*f // <==>").tokenize()
+
+        assert [t.value for t in tokens[:-1]] == ["a", "<==>", "b", "<=>", "c", "<=", "<", "d", "**", "e", "*", "f"]
+        assert tokens[3].column == 7
+
+    def test_token_buffer_matches_token_list(self, runtime_spec, temp_output_dir):
+        """Test that the column-wise token buffer holds the same tokens and parses the same"""
+        ParserGenerator(runtime_spec).generate(temp_output_dir)
+        lexer, parser = load_generated(temp_output_dir, "lexer", "parser")
+        source = 'x = 1.5 * y\n  s = "a\\"b" // note\nprint(-x, [s]) <= 2;'
+
+        tokens = lexer.Lexer(source).tokenize()
+        buffer = lexer.Lexer(source).tokenize_buffer()
+
+        assert buffer.kinds.typecode == "i" and len(buffer) == len(tokens)
+        assert list(buffer) == tokens
+        assert buffer.value(7) == 'a"b' and buffer.column(7) == 7
+        assert parser.Parser(buffer).parse() == parser.Parser(tokens).parse()
+
+    def test_byte_lexer_matches_lexer(self, runtime_spec, temp_output_dir):
+        """Test that lexing a memory-mapped file gives the same tokens as lexing its text"""
+        ParserGenerator(runtime_spec).generate(temp_output_dir)
+        lexer, ast_cache = load_generated(temp_output_dir, "lexer", "ast_cache")
+        source = 'x = 1.5 * y\n  s = "a\\"b" // note\nprint(-x, [\'c\']) <= 2 and true;'
+        source_file = Path(temp_output_dir) / "prog.test"
+        source_file.write_text(source)
+
+        with ast_cache.mapped_source(str(source_file)) as data:
+            buffer = lexer.ByteLexer(data).tokenize()
+            assert list(buffer) == lexer.Lexer(source).tokenize()
+        assert ast_cache.load_program(str(source_file), use_cache=False) == ast_cache.parse_source(source)
+        with pytest.raises(SyntaxError, match="Unterminated string at line 2, column 5"):
+            lexer.ByteLexer(b'x = 1\ny = "abc').tokenize()
+
+
+    def test_positions_from_line_index(self, runtime_spec, temp_output_dir):
+        """Test that lines and columns are found from offsets, also when lexing resumes mid-source"""
+        ParserGenerator(runtime_spec).generate(temp_output_dir)
+        lexer, = load_generated(temp_output_dir, "lexer")
+        source = 'a = 1\r\n\n  bb = "x\\ny"\n c'
+
+        for index in (lexer.LineIndex(source), lexer.LineIndex(source.encode())):
+            assert [index.position(offset) for offset in (0, 6, 10, 23, 24)] == [
+                (1, 1), (1, 7), (3, 3), (4, 2), (4, 3)
+            ]
+        buffer = lexer.Lexer(source).tokenize_buffer()
+        assert [(token.line, token.column) for token in buffer][3:] == [(3, 3), (3, 6), (3, 8), (4, 2), (4, 3)]
+
+        resumed = lexer.Lexer(source, source.index("bb"), 3, 3).tokenize()
+        assert [(token.line, token.column) for token in resumed] == [(3, 3), (3, 6), (3, 8), (4, 2), (4, 3)]
+        with pytest.raises(SyntaxError, match="Unterminated string at line 3, column 3"):
+            lexer.Lexer('a = 1\n\n  "b').tokenize_buffer()
+
+    def test_interning_shares_leaves(self, runtime_spec, temp_output_dir):
+        """Test that interning mode shares equal leaves and interned names, also after encoding"""
+        ParserGenerator(runtime_spec).generate(temp_output_dir)
+        lexer, parser, ast_codec = load_generated(temp_output_dir, "lexer", "parser", "ast_codec")
+        source = 'total = count + count * 2;\ncount = 2;'
+
+        program = parser.Parser(lexer.Lexer(source).tokenize_buffer(), intern=True).parse()
+        first, second = (statement.expression for statement in program.statements)
+        assert (first.line, second.line) == (1, 2)
+        assert first.value.left is first.value.right.left and first.value.right.right is second.value
+        assert first.value.left.name is sys.intern("count")
+        assert repr(program) == repr(parser.Parser(lexer.Lexer(source).tokenize_buffer()).parse())
+
+        decoded = ast_codec.decode(ast_codec.encode(program))
+        assert decoded.statements[0].expression.value.left is decoded.statements[1].expression.target
+
 
 class TestInterpreterGenerator:
     def test_generate_creates_files(self, sample_spec, temp_output_dir):
@@ -137,11 +289,764 @@ class TestInterpreterGenerator:
         with open(interpreter_file, 'r') as f:
             content = f.read()
 
-        assert "_eval_binary_op" in content
+        assert "BINARY_OPS" in content
         # Check for at least some operator implementations
         assert "+" in content or "-" in content or "*" in content
 
 
+class TestCustomBuiltins:
+    def test_builtin_implementation_runs_natively(self, runtime_spec, sample_spec, temp_output_dir, capsys):
+        """Test that BuiltinFunction implementations become callable runtime functions"""
+        runtime_spec.builtin_functions = sample_spec.builtin_functions + [
+            BuiltinFunction(
+                name="first",
+                parameters=[{"name": "values", "type": DataType.ARRAY}],
+                return_type=DataType.INTEGER,
+                implementation="return args[0][0]",
+                description="First element"
+            ),
+            BuiltinFunction(
+                name="twice",
+                parameters=[{"name": "n", "type": DataType.INTEGER}],
+                return_type=DataType.INTEGER,
+                implementation="n * 2",
+                description="Double a number"
+            ),
+        ]
+
+        runtime = run_program(runtime_spec, temp_output_dir, "print(sqrt(16), first([7, 8]), twice(21));")
+
+        assert capsys.readouterr().out.strip() == "4.0 7 42"
+        assert runtime.global_env.get("sqrt").__name__ == "sqrt_impl"
+
+    def test_invalid_builtin_implementation_rejected(self, sample_spec, temp_output_dir):
+        """Test that a builtin that is not valid Python fails generation"""
+        sample_spec.builtin_functions[0].implementation = "return math.sqrt(x"
+
+        with pytest.raises(ValueError, match="sqrt"):
+            InterpreterGenerator(sample_spec).generate(temp_output_dir)
+
+
+class TestOperatorDispatch:
+    def test_standard_operators_use_operator_module(self, runtime_spec, temp_output_dir):
+        """Test that stock implementations compile to operator module callables"""
+        InterpreterGenerator(runtime_spec).generate(temp_output_dir)
+        ParserGenerator(runtime_spec).generate(temp_output_dir)
+        interpreter, = load_generated(temp_output_dir, "interpreter")
+
+        assert interpreter.BINARY_OPS["+"] is operator.add
+        assert interpreter.BINARY_OPS["<="] is operator.le
+        assert interpreter.BINARY_OPS["&&"] is interpreter._logical_and
+        assert interpreter.BINARY_OPS["||"](0, 3) is True
+        assert "=" not in interpreter.BINARY_OPS
+        assert "!" not in interpreter.BINARY_OPS
+
+    def test_custom_operator_runs(self, runtime_spec, temp_output_dir, capsys):
+        """Test that an operator outside the built-in set is parsed and evaluated"""
+        runtime_spec.operators.append(
+            Operator(symbol="**", precedence=25, associativity="left", operation_type="arithmetic", implementation="a ** b")
+        )
+        runtime_spec.operators.append(
+            Operator(symbol="<>", precedence=5, associativity="left", operation_type="comparison", implementation="left != right")
+        )
+
+        run_program(runtime_spec, temp_output_dir, "print(2 ** 3 + 1, 1 <> 2, 0 || 3 < 4)")
+
+        assert capsys.readouterr().out.strip() == "9 True True"
+
+    def test_invalid_custom_operator_rejected(self, runtime_spec, temp_output_dir):
+        """Test that a custom operator without an expression implementation fails generation"""
+        runtime_spec.operators.append(
+            Operator(symbol="<=>", precedence=5, associativity="left", operation_type="comparison", implementation="compare(")
+        )
+
+        with pytest.raises(ValueError, match="<=>"):
+            InterpreterGenerator(runtime_spec).generate(temp_output_dir)
+
+    def test_custom_operator_needs_implementation(self):
+        """Test that a custom operator without an implementation is rejected with the spec"""
+        with pytest.raises(ValueError, match="'<\\+>' needs an implementation"):
+            Operator(symbol="<+>", precedence=0, associativity="left", operation_type="arithmetic", implementation=" ")
+        assert Operator(symbol="+", precedence=0, associativity="left", operation_type="arithmetic", implementation="")
+
+    @pytest.mark.parametrize("symbol, implementation, message", [
+        ("+", "a +", "needs a Python expression"),
+        ("<=>", "x - y", "uses x, y; operands are named a and b"),
+    ])
+    def test_unusable_implementation_rejected(self, runtime_spec, temp_output_dir, symbol, implementation, message):
+        """Test that standard operators do not silently fall back and unknown names are caught"""
+        runtime_spec.operators = [op for op in runtime_spec.operators if op.symbol != symbol]
+        runtime_spec.operators.append(Operator(symbol=symbol, precedence=6, associativity="left",
+                                               operation_type="arithmetic", implementation=implementation))
+
+        with pytest.raises(ValueError, match=message):
+            InterpreterGenerator(runtime_spec).generate(temp_output_dir)
+
+    def test_custom_operators_parse_at_declared_precedence(self, runtime_spec, temp_output_dir, capsys):
+        """Test that custom operators bind at their precedence and associativity"""
+        runtime_spec.operators += [
+            Operator(symbol="<+>", precedence=8, associativity="left", operation_type="arithmetic",
+                     implementation="[a, b]"),
+            Operator(symbol="^", precedence=25, associativity="right", operation_type="arithmetic",
+                     implementation="a ** b"),
+        ]
+
+        run_program(runtime_spec, temp_output_dir, "print(1 + 2 <+> 3 * 4, 2 ^ 3 ^ 2, -2 ^ 2)")
+
+        assert capsys.readouterr().out.strip() == "[3, 12] 512 4"
+
+    def test_operators_sharing_precedence_are_grouped(self, runtime_spec, temp_output_dir, capsys):
+        """Test that specs with every operator at one precedence, as the editor defaults to, still parse"""
+        for op in runtime_spec.operators:
+            op.precedence = 0
+        runtime_spec.operators += [
+            Operator(symbol="<+>", precedence=0, associativity="right", operation_type="arithmetic",
+                     implementation="[a, b]"),
+            Operator(symbol="<->", precedence=8, associativity="left", operation_type="arithmetic",
+                     implementation="a - b"),
+        ]
+
+        run_program(runtime_spec, temp_output_dir, "print(1 <+> 2 <+> 3, 1 || 7 <-> 2 * 3)")
+
+        assert capsys.readouterr().out.strip() == "[[1, 2], 3] True"
+
+
+class TestCallSiteCaches:
+    def test_loop_hits_call_site_cache(self, runtime_spec, temp_output_dir):
+        """Test that repeated calls to a builtin skip the scope-chain walk"""
+        ParserGenerator(runtime_spec).generate(temp_output_dir)
+        InterpreterGenerator(runtime_spec).generate(temp_output_dir)
+        nodes, interpreter = load_generated(temp_output_dir, "ast_nodes", "interpreter")
+
+        counter = nodes.IdentifierNode("i")
+        program = nodes.ProgramNode([
+            nodes.VariableDeclarationNode("i", initializer=nodes.LiteralNode(0)),
+            nodes.WhileNode(
+                nodes.BinaryOpNode(counter, "<", nodes.LiteralNode(5)),
+                nodes.BlockNode([
+                    nodes.ExpressionStatementNode(nodes.FunctionCallNode("str", [counter])),
+                    nodes.AssignmentNode(counter, nodes.BinaryOpNode(counter, "+", nodes.LiteralNode(1))),
+                ])
+            ),
+        ])
+        runtime = interpreter.Interpreter()
+        runtime.interpret(program)
+
+        assert runtime.cache_stats() == {"hits": 4, "misses": 1, "hit_rate": 0.8}
+
+    def test_rebinding_global_invalidates_cache(self, runtime_spec, temp_output_dir):
+        """Test that assigning a new function to a cached name is observed"""
+        ParserGenerator(runtime_spec).generate(temp_output_dir)
+        InterpreterGenerator(runtime_spec).generate(temp_output_dir)
+        nodes, interpreter = load_generated(temp_output_dir, "ast_nodes", "interpreter")
+
+        call = nodes.FunctionCallNode("str", [nodes.LiteralNode(7)])
+        runtime = interpreter.Interpreter()
+
+        assert runtime.evaluate(call) == "7"
+        runtime.evaluate(nodes.AssignmentNode(nodes.IdentifierNode("str"), nodes.IdentifierNode("float")))
+        assert runtime.evaluate(call) == 7.0
+        assert runtime.call_cache_misses == 2
+
+    def test_cache_state_belongs_to_each_interpreter(self, runtime_spec, temp_output_dir):
+        """Test that one interpreter's local names and rebindings leave another's caches alone"""
+        ParserGenerator(runtime_spec).generate(temp_output_dir)
+        InterpreterGenerator(runtime_spec).generate(temp_output_dir)
+        nodes, interpreter, environment = load_generated(temp_output_dir, "ast_nodes", "interpreter", "environment")
+
+        call = nodes.FunctionCallNode("str", [nodes.LiteralNode(7)])
+        first, second = interpreter.Interpreter(), interpreter.Interpreter()
+        first.evaluate(nodes.BlockNode([nodes.VariableDeclarationNode("str", initializer=nodes.LiteralNode(1))]))
+        first.evaluate(nodes.AssignmentNode(nodes.IdentifierNode("str"), nodes.IdentifierNode("float")))
+
+        assert [second.evaluate(call) for _ in range(3)] == ["7"] * 3
+        assert second.cache_stats()["hits"] == 2
+        assert first.global_env.local_names == {"str"} and not second.global_env.local_names
+        assert not hasattr(environment.Environment, "local_names")
+
+
+class TestExecutionBudgets:
+    def _load(self, spec, output_dir):
+        ParserGenerator(spec).generate(output_dir)
+        InterpreterGenerator(spec).generate(output_dir)
+        return load_generated(output_dir, "ast_nodes", "interpreter")
+
+    def test_unbudgeted_interpreter_is_not_wrapped(self, runtime_spec, temp_output_dir):
+        """Test that interpreters without limits evaluate through the plain method"""
+        nodes, interpreter = self._load(runtime_spec, temp_output_dir)
+
+        runtime = interpreter.Interpreter()
+
+        assert "evaluate" not in vars(runtime)
+
+    @pytest.mark.parametrize("limits, resource", [
+        ({"max_steps": 1000}, "step"),
+        ({"max_seconds": 0.05}, "time"),
+        ({"max_memory": 100_000}, "memory"),
+    ])
+    def test_infinite_loop_exceeds_budget(self, runtime_spec, temp_output_dir, limits, resource):
+        """Test that a runaway loop is stopped with a dedicated error"""
+        nodes, interpreter = self._load(runtime_spec, temp_output_dir)
+
+        text = nodes.IdentifierNode("text")
+        program = nodes.ProgramNode([
+            nodes.VariableDeclarationNode("text", initializer=nodes.LiteralNode("")),
+            nodes.WhileNode(
+                nodes.LiteralNode(1),
+                nodes.AssignmentNode(text, nodes.BinaryOpNode(text, "+", nodes.LiteralNode("x" * 64)))
+            ),
+        ])
+        runtime = interpreter.Interpreter(**limits)
+
+        with pytest.raises(interpreter.ExecutionBudgetExceeded) as excinfo:
+            runtime.interpret(program)
+
+        assert excinfo.value.resource == resource
+
+    def test_budget_error_reported_once(self, runtime_spec, temp_output_dir, capsys):
+        """Test that the runner alone reports an exceeded budget"""
+        ParserGenerator(runtime_spec).generate(temp_output_dir)
+        InterpreterGenerator(runtime_spec).generate(temp_output_dir)
+        runner, = load_generated(temp_output_dir, "runlang")
+        source_file = Path(temp_output_dir) / f"long{runtime_spec.file_extension}"
+        source_file.write_text("1 + 1;\n" * 50)
+
+        with pytest.raises(SystemExit) as excinfo:
+            runner.run_file(str(source_file), use_cache=False, max_steps=10)
+
+        assert excinfo.value.code == 3
+        assert capsys.readouterr().out == "Error: Execution budget exceeded: step limit of 10\n"
+
+
+class TestProfiler:
+    def test_parser_records_source_lines(self, runtime_spec, temp_output_dir):
+        """Test that parsed nodes carry the line of their first token"""
+        ParserGenerator(runtime_spec).generate(temp_output_dir)
+        lexer, parser = load_generated(temp_output_dir, "lexer", "parser")
+
+        ast = parser.Parser(lexer.Lexer("print(1);\n\nprint(2 +\n 3);").tokenize()).parse()
+
+        assert [statement.line for statement in ast.statements] == [1, 3]
+        assert ast.statements[1].expression.arguments[0].right.line == 4
+
+    def test_profiles_functions_and_lines(self, runtime_spec, temp_output_dir):
+        """Test call counts, line hits and collapsed stacks for a recursive function"""
+        ParserGenerator(runtime_spec).generate(temp_output_dir)
+        InterpreterGenerator(runtime_spec).generate(temp_output_dir)
+        nodes, interpreter, profiler = load_generated(temp_output_dir, "ast_nodes", "interpreter", "profiler")
+
+        def at(node, line):
+            node.line = line
+            return node
+
+        n = nodes.IdentifierNode("n")
+        recurse = nodes.FunctionCallNode("fib", [nodes.BinaryOpNode(n, "-", nodes.LiteralNode(1))])
+        body = nodes.BlockNode([
+            at(nodes.IfNode(nodes.BinaryOpNode(n, "<", nodes.LiteralNode(2)), nodes.ReturnNode(n)), 2),
+            at(nodes.ReturnNode(nodes.BinaryOpNode(recurse, "+", n)), 3),
+        ])
+        program = nodes.ProgramNode([
+            at(nodes.FunctionDefNode("fib", ["n"], body), 1),
+            at(nodes.ExpressionStatementNode(nodes.FunctionCallNode("fib", [nodes.LiteralNode(4)])), 5),
+        ])
+
+        runtime = interpreter.Interpreter()
+        prof = profiler.Profiler()
+        prof.attach(runtime)
+        runtime.interpret(program)
+        prof.finish()
+
+        stats = prof.functions["fib:1"]
+        assert stats.calls == 4
+        assert stats.cumulative >= stats.self_time > 0
+        assert prof.lines[2].hits == 4
+        assert prof.lines[3].hits == 3
+        assert prof.lines[5].hits == 1
+
+        stacks = prof.collapsed_stacks().splitlines()
+        assert any(line.startswith("<program>;fib:1;fib:1;fib:1;fib:1 ") for line in stacks)
+        assert "fib (line 1)" in prof.report()
+
+
+class TestSamplingProfiler:
+    def _load(self, spec, output_dir):
+        ParserGenerator(spec).generate(output_dir)
+        InterpreterGenerator(spec).generate(output_dir)
+        return load_generated(output_dir, "ast_nodes", "interpreter", "profiler")
+
+    def test_sample_reads_interpreter_frames(self, runtime_spec, temp_output_dir):
+        """Test that a sample is attributed to the source line and user function stack"""
+        nodes, interpreter, profiler = self._load(runtime_spec, temp_output_dir)
+        sampler = profiler.SamplingProfiler()
+
+        probe = nodes.ExpressionStatementNode(nodes.FunctionCallNode("probe", []))
+        probe.line = 2
+        definition = nodes.FunctionDefNode("work", [], nodes.BlockNode([probe]))
+        definition.line = 1
+        call = nodes.ExpressionStatementNode(nodes.FunctionCallNode("work", []))
+        call.line = 4
+
+        runtime = interpreter.Interpreter()
+        runtime.global_env.define("probe", lambda: sampler.sample(sys._getframe(1)))
+        runtime.interpret(nodes.ProgramNode([definition, call]))
+
+        assert sampler.total == 1
+        assert dict(sampler.line_samples) == {2: 1}
+        assert sampler.collapsed_stacks() == "<program>;work:1 1\n"
+
+    def test_background_thread_collects_samples(self, runtime_spec, temp_output_dir):
+        """Test that the sampler thread records a running program"""
+        nodes, interpreter, profiler = self._load(runtime_spec, temp_output_dir)
+        sampler = profiler.SamplingProfiler(interval=0.001)
+
+        condition = nodes.FunctionCallNode("sampling", [])
+        condition.line = 7
+        runtime = interpreter.Interpreter(max_seconds=10)
+        runtime.global_env.define("sampling", lambda: sampler.total < 3)
+
+        sampler.start()
+        try:
+            runtime.interpret(nodes.ProgramNode([nodes.WhileNode(condition, nodes.BlockNode([]))]))
+        finally:
+            sampler.stop()
+
+        assert sampler.total >= 3
+        assert "samples every 1 ms" in sampler.report()
+
+
+class TestTracer:
+    def test_trace_events_and_detach(self, runtime_spec, temp_output_dir, capsys):
+        """Test line, breakpoint and watch events, and that detach restores plain evaluation"""
+        ParserGenerator(runtime_spec).generate(temp_output_dir)
+        InterpreterGenerator(runtime_spec).generate(temp_output_dir)
+        nodes, interpreter, debugger = load_generated(temp_output_dir, "ast_nodes", "interpreter", "debugger")
+
+        total = nodes.IdentifierNode("total")
+        statements = [
+            nodes.VariableDeclarationNode("total", initializer=nodes.LiteralNode(0)),
+            nodes.AssignmentNode(total, nodes.BinaryOpNode(total, "+", nodes.LiteralNode(5))),
+            nodes.ExpressionStatementNode(nodes.FunctionCallNode("print", [total])),
+        ]
+        for line, statement in enumerate(statements, start=1):
+            statement.line = line
+
+        events = []
+        runtime = interpreter.Interpreter()
+        tracer = debugger.Tracer(lambda event, _: events.append((event.kind, event.line, event.name, event.new)))
+        tracer.add_breakpoint(3)
+        tracer.watch("total")
+        tracer.attach(runtime)
+        runtime.interpret(nodes.ProgramNode(statements))
+        tracer.detach()
+
+        assert events == [
+            ("line", 1, None, None),
+            ("watch", 1, "total", 0),
+            ("line", 2, None, None),
+            ("watch", 2, "total", 5),
+            ("breakpoint", 3, None, None),
+        ]
+        assert capsys.readouterr().out == "5\n"
+        assert "evaluate" not in vars(runtime)
+
+
+class TestArrays:
+    def test_array_literals_indexing_and_builtins(self, runtime_spec, temp_output_dir, capsys):
+        """Test that array literals, index expressions and array built-ins run"""
+        source = """
+        print([3, 1, 2][0], sort([3, 1.5, 2]), sum(range(10)), len(range(2, 10, 3)));
+        print(map(str, [1, 2])[1], [1, "a"]);
+        """
+
+        run_program(runtime_spec, temp_output_dir, source)
+
+        assert capsys.readouterr().out.splitlines() == ["3 [1.5, 2, 3] 45 3", "2 [1, 'a']"]
+
+    def test_numeric_arrays_are_unboxed(self, runtime_spec, temp_output_dir):
+        """Test that homogeneous numbers use typed storage that widens on demand"""
+        InterpreterGenerator(runtime_spec).generate(temp_output_dir)
+        ParserGenerator(runtime_spec).generate(temp_output_dir)
+        lang_builtins, = load_generated(temp_output_dir, "lang_builtins")
+
+        values = lang_builtins.Array([1, 2, 3])
+        assert values.kind == "int"
+        assert not isinstance(values.data, list)
+
+        floats = lang_builtins.Array([0.5, 1.5])
+        assert floats.kind == "float"
+        assert not isinstance(floats.data, list)
+
+        # Mixed ints and floats keep each element's type
+        mixed = lang_builtins.Array([1, 2.5])
+        assert mixed.kind == "any" and type(mixed[0]) is int
+        floats[0] = 1
+        assert floats.kind == "any" and floats.tolist() == [1, 1.5] and type(floats[0]) is int
+        values[0] = 0.5
+        assert values.kind == "any" and type(values[1]) is int
+        values[1] = "two"
+        assert values.tolist() == [0.5, "two", 3]
+
+    def test_numpy_storage_hands_out_python_numbers(self, runtime_spec, temp_output_dir):
+        """Test that NumPy-backed arrays behave like the array module ones"""
+        numpy = pytest.importorskip("numpy")
+        InterpreterGenerator(runtime_spec).generate(temp_output_dir)
+        ParserGenerator(runtime_spec).generate(temp_output_dir)
+        lang_builtins, = load_generated(temp_output_dir, "lang_builtins")
+
+        values = lang_builtins.Array([1, 2, 3])
+        assert isinstance(values.data, numpy.ndarray)
+        assert type(values[0]) is int and [type(v) for v in values] == [int, int, int]
+        values[0] = values[2]
+        assert values.kind == "int" and isinstance(values.data, numpy.ndarray)
+        assert lang_builtins._map(lambda v: type(v) is int, values).tolist() == [True, True, True]
+        assert type(lang_builtins.Array([1.5])[0]) is float
+        assert lang_builtins._sum(lang_builtins.Array([2 ** 62, 2 ** 62])) == 2 ** 63
+        assert type(lang_builtins._range(3)[1]) is int
+        assert lang_builtins._sum(lang_builtins._range(0)) == 0
+
+    def test_python_codegen_handles_arrays(self, runtime_spec, temp_output_dir):
+        """Test that compiled Python output keeps array semantics"""
+        runtime_spec.language_type = LanguageType.COMPILED
+        ParserGenerator(runtime_spec).generate(temp_output_dir)
+        CompilerGenerator(runtime_spec).generate(temp_output_dir)
+        compiler, = load_generated(temp_output_dir, "compiler")
+
+        output = compiler.Compiler().compile("print(sort([2, 1])[0], range(3));")
+
+        assert "print(sorted([2, 1])[0], list(range(3)))" in output
+
+
+class TestIncrementalParsing:
+    def assert_matches_full_parse(self, lexer, parser, document):
+        """The incremental AST, lines and tokens equal those of a fresh parse"""
+        tokens = lexer.Lexer(document.source).tokenize()
+        expected = parser.Parser(tokens).parse()
+        assert document.program == expected
+        assert [s.line for s in document.program.statements] == [s.line for s in expected.statements]
+        assert document.tokens == tokens
+
+    def test_edits_match_full_parse(self, runtime_spec, temp_output_dir):
+        """Test that edits only reparse nearby statements and agree with a full parse"""
+        ParserGenerator(runtime_spec).generate(temp_output_dir)
+        lexer, parser, incremental = load_generated(temp_output_dir, "lexer", "parser", "incremental")
+        source = "".join(f"x{i} = {i};\n" for i in range(50))
+        document = incremental.Document(source)
+
+        change = document.edit(source.index("20;"), 2, "7 * 3")
+        assert change.start == 20 and change.removed == 1 and len(change.statements) == 1
+        self.assert_matches_full_parse(lexer, parser, document)
+
+        document.edit(source.index("x5 ="), 0, "print(1); print(2);\n\n")
+        self.assert_matches_full_parse(lexer, parser, document)
+
+        # Deleting a semicolon joins two statements; inserting one splits them again
+        semicolon = document.source.index("x40 = 40;") + 8
+        document.edit(semicolon, 1, "")
+        document.edit(semicolon, 0, " - ")
+        self.assert_matches_full_parse(lexer, parser, document)
+        document.edit(semicolon, 3, ";")
+        self.assert_matches_full_parse(lexer, parser, document)
+
+        document.edit(0, 0, "// header\n")
+        document.edit(len(document.source), 0, "y = [1, 2];")
+        self.assert_matches_full_parse(lexer, parser, document)
+
+    def test_invalid_edit_recovers(self, runtime_spec, temp_output_dir):
+        """Test that a syntax error is reported and a later fixing edit restores the AST"""
+        ParserGenerator(runtime_spec).generate(temp_output_dir)
+        lexer, parser, incremental = load_generated(temp_output_dir, "lexer", "parser", "incremental")
+        document = incremental.Document("a = (1 + 2);\nb = a;")
+
+        with pytest.raises(SyntaxError):
+            document.edit(4, 1, "")
+        with pytest.raises(SyntaxError):
+            document.program
+
+        with pytest.raises(SyntaxError):
+            document.edit(0, 0, "c = ")
+        document.edit(8, 0, "(")
+        assert document.error is None
+        self.assert_matches_full_parse(lexer, parser, document)
+
+
+class TestASTCache:
+    def test_cached_ast_skips_lexing(self, runtime_spec, temp_output_dir, monkeypatch):
+        """Test that an unchanged source file is loaded from the AST cache"""
+        ParserGenerator(runtime_spec).generate(temp_output_dir)
+        ast_cache, = load_generated(temp_output_dir, "ast_cache")
+        source_file = Path(temp_output_dir) / "prog.test"
+        source_file.write_text("x = 1 + 2;")
+
+        _, first = ast_cache.load_ast(str(source_file))
+        assert Path(ast_cache.cache_path(str(source_file))).exists()
+
+        def fail(*args):
+            raise AssertionError("source was re-lexed")
+        monkeypatch.setattr(ast_cache.ByteLexer, "tokenize", fail)
+        _, second = ast_cache.load_ast(str(source_file))
+        assert second == first
+
+    def test_shared_cache_dir_keeps_same_named_files_apart(self, runtime_spec, temp_output_dir):
+        """Test that files with one basename in different directories get their own entries"""
+        ParserGenerator(runtime_spec).generate(temp_output_dir)
+        ast_cache, = load_generated(temp_output_dir, "ast_cache")
+        shared = str(Path(temp_output_dir) / "shared")
+        sources = []
+        for directory, text in [("one", "x = 1;"), ("two", "y = 2;")]:
+            (Path(temp_output_dir) / directory).mkdir()
+            sources.append(Path(temp_output_dir) / directory / "prog.test")
+            sources[-1].write_text(text)
+            ast_cache.load_ast(str(sources[-1]), cache_dir=shared)
+
+        assert len(os.listdir(shared)) == 2
+        for source in sources:
+            _, cached = ast_cache.load_ast(str(source), cache_dir=shared)
+            assert cached == ast_cache.parse_source(source.read_text())
+
+    def test_cache_invalidated_by_source_and_version(self, runtime_spec, temp_output_dir, monkeypatch):
+        """Test that edited sources and a new generator stamp are re-parsed"""
+        ParserGenerator(runtime_spec).generate(temp_output_dir)
+        ast_cache, = load_generated(temp_output_dir, "ast_cache")
+        source_file = Path(temp_output_dir) / "prog.test"
+        source_file.write_text("x = 1;")
+        ast_cache.load_ast(str(source_file))
+
+        source_file.write_text("x = 22;")
+        _, ast = ast_cache.load_ast(str(source_file))
+        assert ast.statements[0].expression.value.value == 22
+
+        monkeypatch.setattr(ast_cache, "AST_VERSION", "0" * 16)
+        calls = []
+        original = ast_cache.parse_source
+        monkeypatch.setattr(ast_cache, "parse_source", lambda source, *args: calls.append(bytes(source)) or original(source, *args))
+        ast_cache.load_ast(str(source_file))
+        assert calls == [b"x = 22;"]
+
+    def test_codec_round_trip(self, runtime_spec, temp_output_dir):
+        """Test that the binary encoding restores the AST and decodes statement by statement"""
+        ParserGenerator(runtime_spec).generate(temp_output_dir)
+        ast_cache, ast_codec = load_generated(temp_output_dir, "ast_cache", "ast_codec")
+        program = ast_cache.parse_source(
+            'name = [1, -300, 2.5, "text", true];\nprint(name, -name[0] + 1);\nname = "text";'
+        )
+
+        data = ast_codec.encode(program)
+        assert data.count(b"text") == 1
+        stream = io.BytesIO(data)
+        statements = ast_codec.iter_statements(stream)
+        first = next(statements)
+        assert stream.tell() < len(data)
+        assert repr(ast_codec.ProgramNode([first] + list(statements))) == repr(program)
+        assert [s.line for s in ast_codec.decode(data).statements] == [1, 2, 3]
+
+        with pytest.raises(ast_codec.ASTCodecError):
+            ast_codec.decode(data[:-5])
+
+    def test_ast_version_tracks_grammar(self, runtime_spec):
+        """Test that the version stamp changes with the generated parser"""
+        before = ParserGenerator(runtime_spec)._ast_version()
+        runtime_spec.keywords.append(Keyword(word="unless", category="control_flow", description="Negated if"))
+
+        assert ParserGenerator(runtime_spec)._ast_version() != before
+
+
+def parse_with(output_dir, source):
+    lexer, parser = load_generated(output_dir, "lexer", "parser")
+    return parser.Parser(lexer.Lexer(source).tokenize()).parse()
+
+
+def grammar_rule(name, pattern):
+    return GrammarRule(name=name, pattern=pattern, node_id=name)
+
+
+@pytest.mark.usefixtures("table_cache")
+class TestGrammarRules:
+    def test_first_follow_and_conflicts(self, runtime_spec):
+        """Test FIRST/FOLLOW sets and that LL(1) conflicts are reported"""
+        runtime_spec.keywords.append(Keyword(word="show", category="io", description="Show values"))
+        runtime_spec.grammar_rules = [
+            grammar_rule("show_stmt", "'show' expression (',' expression)* ';'"),
+            grammar_rule("pair", "IDENTIFIER '.' INTEGER | IDENTIFIER '=' INTEGER"),
+        ]
+        grammar = ParserGenerator(runtime_spec).grammar
+
+        assert grammar.roots == ["show_stmt", "pair"]
+        assert grammar.first["show_stmt"] == {"SHOW"}
+        assert grammar.follow["show_stmt#1"] == {"SEMICOLON"}
+        assert "EOF" in grammar.follow["show_stmt"]
+        reported = [(c.rule, c.token) for c in grammar.conflicts]
+        assert ("pair", "IDENTIFIER") in reported
+        assert ("statement'", "IDENTIFIER") in reported
+
+    def test_unusable_rules_reported(self, sample_spec, runtime_spec):
+        """Test that undefined references, bad patterns and left recursion are reported"""
+        assert ParserGenerator(sample_spec).grammar.report() == [
+            "expression: refers to undefined rule term",
+            "no statement forms remain, so the grammar rules are not used",
+        ]
+
+        runtime_spec.grammar_rules = [
+            grammar_rule("list", "list ',' INTEGER | INTEGER"),
+            grammar_rule("broken", "( INTEGER"),
+            grammar_rule("unknown", "'@' INTEGER"),
+        ]
+        report = ParserGenerator(runtime_spec).grammar.report()
+
+        assert any(problem.startswith("list: is left-recursive") for problem in report)
+        assert any(problem.startswith("broken: Missing ')'") for problem in report)
+        assert any(problem.startswith("unknown: '@' is not") for problem in report)
+
+    def test_mutually_recursive_statement_forms(self, runtime_spec, tmp_path):
+        """Test that a statement form reached only through a cycle of rules is still used"""
+        runtime_spec.keywords.append(Keyword(word="show", category="io", description="Show values"))
+        runtime_spec.grammar_rules = [
+            grammar_rule("stmt", "'show' expression ';' | block"),
+            grammar_rule("block", "'{' stmt* '}'"),
+        ]
+        generator = ParserGenerator(runtime_spec)
+
+        assert generator.grammar.roots == ["stmt"]
+        assert generator.grammar_report() == []
+        source = "show 1; { show 2; { } }\nx = 3"
+        for algorithm in ("auto", "lalr", "peg"):
+            (tmp_path / algorithm).mkdir()
+            ParserGenerator(runtime_spec, algorithm=algorithm).generate(tmp_path / algorithm)
+        program = parse_with(tmp_path / "auto", source)
+        assert [getattr(statement, "rule", None) for statement in program.statements] == ["stmt", "stmt", None]
+        assert repr(parse_with(tmp_path / "lalr", source)) == repr(program)
+        assert repr(parse_with(tmp_path / "peg", source)) == repr(program)
+
+    def test_rule_statements_parse_and_run(self, runtime_spec, temp_output_dir, capsys):
+        """Test that a statement form from the grammar rules is parsed by the LL(1) table"""
+        runtime_spec.keywords.append(Keyword(word="show", category="io", description="Show values"))
+        runtime_spec.grammar_rules = [grammar_rule("show_stmt", "'show' expression (',' expression)* ';'")]
+
+        run_program(runtime_spec, temp_output_dir, "show print(1 + 1), print(3);\nprint(4)")
+        assert capsys.readouterr().out.split() == ["2", "3", "4"]
+
+        lexer, parser = load_generated(temp_output_dir, "lexer", "parser")
+        statement = parser.Parser(lexer.Lexer("show 1, 2;").tokenize()).parse().statements[0]
+        assert statement.rule == "show_stmt"
+        assert [getattr(child, "value", child) for child in statement.children] == ["show", 1, ",", 2, ";"]
+        with pytest.raises(SyntaxError, match="expected one of COMMA, SEMICOLON"):
+            parser.Parser(lexer.Lexer("show 1 2;").tokenize()).parse()
+
+
+@pytest.mark.usefixtures("table_cache")
+class TestLALRParser:
+    def test_left_recursive_rules_use_lalr(self, runtime_spec, temp_output_dir):
+        """Test that a grammar that is not LL(1) gets LALR(1) tables"""
+        runtime_spec.keywords.append(Keyword(word="show", category="io", description="Show values"))
+        runtime_spec.grammar_rules = [grammar_rule("sum", "sum '+' INTEGER | 'show' INTEGER")]
+        generator = ParserGenerator(runtime_spec)
+        generator.generate(temp_output_dir)
+
+        assert generator.lalr is not None
+        # `show 1` followed by the expression statement `+ 2` is resolved by shifting
+        assert generator.grammar_report() == [
+            "LALR(1) conflict in state 1 on OP_PLUS: using shift over reduce by statement' -> sum"
+        ]
+        program = parse_with(temp_output_dir, "show 1 + 2 + 3\nx * 2")
+        outer = program.statements[0]
+        assert outer.rule == "sum" and outer.children[1] == "+" and outer.children[2].value == 3
+        assert [child.rule for child in (outer.children[0], outer.children[0].children[0])] == ["sum", "sum"]
+        assert program.statements[1].operator == "*"
+
+    def test_lalr_matches_ll1(self, runtime_spec, tmp_path):
+        """Test that both table-driven parsers build the same tree"""
+        runtime_spec.keywords.append(Keyword(word="show", category="io", description="Show values"))
+        runtime_spec.grammar_rules = [
+            grammar_rule("show_stmt", "'show' item (',' item)* ';'"),
+            grammar_rule("item", "expression | '{' '}'"),
+        ]
+        source = "show 1 + 2, {}, x;\nshow [1];\ny = 2"
+        (tmp_path / "ll1").mkdir()
+        (tmp_path / "lalr").mkdir()
+        ParserGenerator(runtime_spec).generate(tmp_path / "ll1")
+        generator = ParserGenerator(runtime_spec, algorithm="lalr")
+        generator.generate(tmp_path / "lalr")
+
+        assert generator.lalr is not None
+        assert repr(parse_with(tmp_path / "lalr", source)) == repr(parse_with(tmp_path / "ll1", source))
+        with pytest.raises(SyntaxError, match="Unexpected INTEGER at line 1"):
+            parse_with(tmp_path / "lalr", "show 1 2;")
+
+    def test_tables_cached_by_grammar_hash(self, runtime_spec, table_cache, monkeypatch):
+        """Test that tables are reused for the same grammar however it is spelled"""
+        runtime_spec.grammar_rules = [grammar_rule("list", "list ',' INTEGER | INTEGER")]
+        tables = ParserGenerator(runtime_spec).lalr
+        assert len(list(table_cache.iterdir())) == 1
+
+        monkeypatch.setattr(ParserGenerator, "_table_cache", {})
+        monkeypatch.setattr("generators.parser_generator.build_lalr", lambda grammar: pytest.fail("tables rebuilt"))
+        runtime_spec.grammar_rules = [grammar_rule("list", 'list  "," INTEGER|INTEGER')]
+        assert ParserGenerator(runtime_spec).lalr == tables
+
+    def test_table_cache_is_bounded(self, runtime_spec, monkeypatch):
+        """Test that only the most recently used grammars keep their tables in memory"""
+        monkeypatch.setattr(ParserGenerator, "TABLE_CACHE_SIZE", 2)
+        for separator in [",", ";", ".", ","]:
+            runtime_spec.grammar_rules = [grammar_rule("list", f"list '{separator}' INTEGER | INTEGER")]
+            ParserGenerator(runtime_spec, algorithm="lalr")
+
+        assert len(ParserGenerator._table_cache) == 2
+        assert list(ParserGenerator._table_cache.values())[-1] == ParserGenerator(runtime_spec, algorithm="lalr").lalr
+
+
+@pytest.fixture
+def peg_spec(runtime_spec):
+    """Ordered choice whose alternatives share a prefix, which LL(1) cannot predict"""
+    runtime_spec.keywords.append(Keyword(word="go", category="control_flow", description="Jump"))
+    runtime_spec.grammar_mode = "peg"
+    runtime_spec.grammar_rules = [
+        grammar_rule("cmd", "'go' target ';' | 'go' target '!' INTEGER"),
+        grammar_rule("target", "IDENTIFIER ('.' IDENTIFIER)*"),
+    ]
+    return runtime_spec
+
+
+@pytest.mark.usefixtures("table_cache")
+class TestPackratParser:
+    def test_ordered_choice_backtracks_with_memo(self, peg_spec, temp_output_dir):
+        """Test that a failed alternative's rule results are reused from the memo"""
+        ParserGenerator(peg_spec).generate(temp_output_dir)
+        lexer, parser = load_generated(temp_output_dir, "lexer", "parser")
+        runtime = parser.Parser(lexer.Lexer("go a.b ! 3\ngo c;\nx = 2").tokenize())
+        first, second, third = runtime.parse().statements
+
+        assert [child if isinstance(child, str) else child.rule for child in first.children[:3]] == ["go", "target", "!"]
+        assert second.children[-1] == ";"
+        assert third.value.value == 2
+        stats = runtime.memo_stats()
+        assert stats["target"]["hits"] == 1 and stats["target"]["misses"] == 2
+        assert stats["target"]["peak_entries"] == 1 and stats["target"]["peak_bytes"] > 0
+        # When no statement form matches, the built-in statement parser reports the error
+        with pytest.raises(SyntaxError, match="Unexpected token go"):
+            parser.Parser(lexer.Lexer("go 1;").tokenize()).parse()
+
+    def test_memo_can_be_bounded_or_disabled(self, peg_spec, temp_output_dir):
+        """Test the per-rule memo limit"""
+        peg_spec.grammar_rules[1].memo = 0
+        peg_spec.grammar_rules[0].memo = 1
+        ParserGenerator(peg_spec).generate(temp_output_dir)
+        lexer, parser = load_generated(temp_output_dir, "lexer", "parser")
+        runtime = parser.Parser(lexer.Lexer("go a ! 1").tokenize())
+        runtime.parse()
+
+        stats = runtime.memo_stats()
+        assert stats["target"]["hits"] == 0 and stats["target"]["misses"] == 2
+        assert stats["target"]["peak_entries"] == 0
+        assert stats["cmd"]["peak_entries"] == 1
+
+    def test_left_recursion_reported(self, peg_spec):
+        """Test that left-recursive statement forms are not used by the PEG parser"""
+        peg_spec.grammar_rules.append(grammar_rule("sum", "sum '+' INTEGER | 'go' INTEGER"))
+
+        assert ParserGenerator(peg_spec).grammar_report() == [
+            "sum: is left-recursive, which the PEG parser cannot use"
+        ]
+
+
 class TestCompilerGenerator:
     def test_generate_creates_files(self, sample_spec, temp_output_dir):
         """Test that compiler generator creates all expected files"""
@@ -170,6 +1075,225 @@ class TestCompilerGenerator:
         assert "python" in content.lower()
 
 
+class TestCompilerRunner:
+    def test_compile_many_skips_up_to_date_files(self, runtime_spec, temp_output_dir, capsys):
+        """Test that a directory compiles in parallel and unchanged outputs are not rebuilt"""
+        runtime_spec.language_type = LanguageType.COMPILED
+        ParserGenerator(runtime_spec).generate(temp_output_dir)
+        CompilerGenerator(runtime_spec).generate(temp_output_dir)
+        runner, codegen = load_generated(temp_output_dir, "runlang", "codegen")
+        sources = Path(temp_output_dir) / "src"
+        (sources / "nested").mkdir(parents=True)
+        first, second = sources / f"a{runtime_spec.file_extension}", sources / "nested" / f"b{runtime_spec.file_extension}"
+        first.write_text("print(1);")
+        second.write_text("print(2);")
+
+        assert runner.compile_many([str(sources)], jobs=2)
+        assert codegen.COMPILER_VERSION in first.with_suffix(".py").read_text()
+        assert "2 compiled, 0 up to date, 0 failed" in capsys.readouterr().out
+
+        stat = second.stat()
+        os.utime(second, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        (sources / f"c{runtime_spec.file_extension}").write_text("print(;")
+        assert not runner.compile_many([str(sources / "**" / f"*{runtime_spec.file_extension}")], jobs=2)
+        assert "1 compiled, 1 up to date, 1 failed" in capsys.readouterr().out
+
+    def test_watch_recompiles_changed_files(self, runtime_spec, temp_output_dir, monkeypatch):
+        """Test that watch mode rebuilds edited files only and reuses the ASTs of touched ones"""
+        runtime_spec.language_type = LanguageType.COMPILED
+        ParserGenerator(runtime_spec).generate(temp_output_dir)
+        CompilerGenerator(runtime_spec).generate(temp_output_dir)
+        runner, = load_generated(temp_output_dir, "runlang")
+        first, second = (Path(temp_output_dir) / f"{name}{runtime_spec.file_extension}" for name in "ab")
+        first.write_text("print(1);")
+        second.write_text("print(2);")
+        parsed = []
+        original = runner.parse_source
+        monkeypatch.setattr(runner, "parse_source", lambda data: parsed.append(data) or original(data))
+
+        watcher = runner.Watcher([str(temp_output_dir)], debounce=0)
+        assert watcher.step() == (2, 0)
+        assert watcher.step() == (0, 0)
+
+        def bump(path, text=None):
+            if text is not None:
+                path.write_text(text)
+            stat = path.stat()
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        bump(first, "print(10);")
+        bump(second)
+        parsed.clear()
+        assert watcher.step() == (1, 0)
+        assert parsed == [b"print(10);"]
+        assert "print(10)" in first.with_suffix(".py").read_text()
+
+
+class TestStreamedCompilation:
+    @pytest.mark.parametrize("target", ["python", "java"])
+    def test_streamed_output_matches_generate(self, runtime_spec, temp_output_dir, target):
+        """Test that streaming code into a sink writes what generate returns, however deep the nesting"""
+        runtime_spec.language_type = LanguageType.COMPILED
+        runtime_spec.target_language = target
+        ParserGenerator(runtime_spec).generate(temp_output_dir)
+        CompilerGenerator(runtime_spec).generate(temp_output_dir)
+        compiler, runner, nodes = load_generated(temp_output_dir, "compiler", "runlang", "ast_nodes")
+        x = nodes.IdentifierNode("x")
+        body = nodes.ExpressionStatementNode(nodes.AssignmentNode(x, nodes.LiteralNode(3)))
+        for _ in range(40):
+            body = nodes.IfNode(x, nodes.BlockNode([body]))
+        ast = nodes.ProgramNode([nodes.VariableDeclarationNode("x", None, nodes.LiteralNode(1)), body])
+
+        sink = io.StringIO()
+        compiler.Compiler().compile_to(ast, sink)
+
+        expected = compiler.Compiler().compile_ast(ast)
+        assert sink.getvalue() == expected + "\n"
+        assert "\n" + "    " * (42 if target == "java" else 40) + "x = 3" in expected
+        output_path = Path(temp_output_dir) / "out" / "program.txt"
+        runner.write_output(compiler.Compiler(), ast, str(output_path))
+        assert output_path.read_text() == sink.getvalue()
+        assert os.listdir(output_path.parent) == ["program.txt"]
+
+    def test_stream_compiles_statement_at_a_time(self, runtime_spec, temp_output_dir):
+        """Test that streamed builds parse lazily, match regular builds and leave nothing behind on errors"""
+        runtime_spec.language_type = LanguageType.COMPILED
+        ParserGenerator(runtime_spec).generate(temp_output_dir)
+        CompilerGenerator(runtime_spec).generate(temp_output_dir)
+        runner, lexer, parser = load_generated(temp_output_dir, "runlang", "lexer", "parser")
+        source = "".join(f"x{i} = {i} * 2;\n" for i in range(20)) + "print(x19);"
+        statements = parser.Parser(lexer.Lexer(source).tokenize_buffer())
+        first = next(statements.iter_statements())
+        assert first == parser.Parser(lexer.Lexer(source).tokenize()).parse().statements[0]
+        assert statements.pos == 6
+
+        source_file = Path(temp_output_dir) / f"big{runtime_spec.file_extension}"
+        source_file.write_text(source)
+        runner.build(str(source_file), str(temp_output_dir / "whole.py"), use_cache=False)
+        runner.build(str(source_file), str(temp_output_dir / "streamed.py"), stream=True)
+        assert (temp_output_dir / "streamed.py").read_text() == (temp_output_dir / "whole.py").read_text()
+
+        source_file.write_text(source + "\nprint(;")
+        with pytest.raises(SyntaxError):
+            runner.build(str(source_file), str(temp_output_dir / "broken.py"), stream=True)
+        assert not [name for name in os.listdir(temp_output_dir) if name.startswith("broken")]
+
+
+class TestJavaTypeInference:
+    def test_java_types_inferred_over_whole_program(self, runtime_spec, temp_output_dir):
+        """Test that Java types flow through later assignments, parameters and returns"""
+        runtime_spec.language_type = LanguageType.COMPILED
+        runtime_spec.target_language = "java"
+        ParserGenerator(runtime_spec).generate(temp_output_dir)
+        CompilerGenerator(runtime_spec).generate(temp_output_dir)
+        codegen, type_inference, n = load_generated(temp_output_dir, "codegen", "type_inference", "ast_nodes")
+        x, a, r = n.IdentifierNode("x"), n.IdentifierNode("a"), n.IdentifierNode("r")
+        assign = lambda target, value: n.ExpressionStatementNode(n.AssignmentNode(target, value))
+        ast = n.ProgramNode([
+            assign(x, n.LiteralNode(1)),
+            assign(n.IdentifierNode("y"), x),
+            n.FunctionDefNode("twice", ["a"], n.BlockNode([
+                n.ReturnNode(n.BinaryOpNode(a, "*", n.LiteralNode(2)))])),
+            assign(r, n.FunctionCallNode("twice", [n.LiteralNode(3)])),
+            assign(n.IdentifierNode("flag"), n.BinaryOpNode(r, ">", n.LiteralNode(2))),
+            assign(n.IdentifierNode("z"), n.ArrayLiteralNode([x, n.LiteralNode(1)])),
+            assign(x, n.LiteralNode(2.5)),
+        ])
+
+        types = type_inference.TypeInference()
+        types.add(ast.statements)
+        assert [types.variable_type(name) for name in ["x", "y", "r", "flag", "z", "unknown"]] == [
+            "double", "double", "int", "boolean", "double[]", "Object"]
+        assert types.parameter_types("twice") == ["int"]
+        assert types.return_type("twice") == "int"
+
+        output = codegen.CodeGenerator().generate(ast)
+        assert "double x = 1;" in output
+        assert "double y = x;" in output
+        assert "int r = twice(3);" in output
+        assert "double[] z = new double[]{x, 1};" in output
+
+    def test_java_assignments_keep_globals_and_array_types(self, runtime_spec, temp_output_dir):
+        """Test that functions assign top-level variables and arrays only widen when rebuilt"""
+        runtime_spec.language_type = LanguageType.COMPILED
+        runtime_spec.target_language = "java"
+        ParserGenerator(runtime_spec).generate(temp_output_dir)
+        CompilerGenerator(runtime_spec).generate(temp_output_dir)
+        codegen, n = load_generated(temp_output_dir, "codegen", "ast_nodes")
+        count, a, b = n.IdentifierNode("count"), n.IdentifierNode("a"), n.IdentifierNode("b")
+        assign = lambda target, value: n.ExpressionStatementNode(n.AssignmentNode(target, value))
+        ast = n.ProgramNode([
+            assign(count, n.LiteralNode(0)),
+            n.FunctionDefNode("inc", [], n.BlockNode([
+                n.VariableDeclarationNode("step", None, n.LiteralNode(1)),
+                assign(count, n.BinaryOpNode(count, "+", n.IdentifierNode("step")))])),
+            assign(a, n.ArrayLiteralNode([n.LiteralNode(1), n.LiteralNode(2)])),
+            assign(b, n.ArrayLiteralNode([n.LiteralNode(1.5)])),
+            assign(b, a),
+        ])
+
+        output = codegen.CodeGenerator().generate(ast)
+
+        assert "        count = 0;\n" in output
+        assert "private static int count;" in output
+        assert "private static void inc() {\n        int step = 1;\n        count = (count + step);\n    }" in output
+        assert "int[] a = new int[]{1, 2};" in output
+        assert "Object b = new double[]{1.5};" in output
+
+    def test_java_functions_become_static_methods(self, runtime_spec, temp_output_dir):
+        """Test that functions are emitted as typed static methods after main, sharing globals as fields"""
+        runtime_spec.language_type = LanguageType.COMPILED
+        runtime_spec.target_language = "java"
+        ParserGenerator(runtime_spec).generate(temp_output_dir)
+        CompilerGenerator(runtime_spec).generate(temp_output_dir)
+        codegen, n = load_generated(temp_output_dir, "codegen", "ast_nodes")
+        k, v = n.IdentifierNode("k"), n.IdentifierNode("v")
+        fib = lambda offset: n.FunctionCallNode("fib", [n.BinaryOpNode(k, "-", n.LiteralNode(offset))])
+        ast = n.ProgramNode([
+            n.FunctionDefNode("fib", ["k"], n.BlockNode([
+                n.IfNode(n.BinaryOpNode(k, "<", n.LiteralNode(2)), n.BlockNode([n.ReturnNode(k)])),
+                n.ReturnNode(n.BinaryOpNode(fib(1), "+", fib(2)))])),
+            n.ExpressionStatementNode(n.AssignmentNode(n.IdentifierNode("scale"), n.LiteralNode(2))),
+            n.FunctionDefNode("show", ["v"], n.BlockNode([n.ExpressionStatementNode(n.FunctionCallNode(
+                "print", [n.BinaryOpNode(v, "*", n.IdentifierNode("scale"))]))])),
+            n.FunctionDefNode("half", ["v"], n.BlockNode([
+                n.IfNode(n.BinaryOpNode(v, ">", n.LiteralNode(0)), n.BlockNode([
+                    n.ReturnNode(n.BinaryOpNode(v, "/", n.LiteralNode(2.0)))]))])),
+            n.ExpressionStatementNode(n.FunctionCallNode("show", [n.FunctionCallNode("fib", [n.LiteralNode(20)])])),
+            n.ExpressionStatementNode(n.FunctionCallNode("half", [n.LiteralNode(3)])),
+        ])
+
+        output = codegen.CodeGenerator().generate(ast)
+
+        assert "not supported" not in output
+        main, methods = output.split("\n    }\n", 1)
+        assert "        scale = 2;\n        show(fib(20));" in main
+        assert "private static int scale;" in methods
+        assert "private static int fib(int k) {\n        if ((k < 2)) {\n            return k;" in methods
+        assert "private static void show(int v) {\n        System.out.println((v * scale));\n    }" in methods
+        assert "private static double half(int v) {\n        if ((v > 0)) {" in methods
+        assert "        }\n        return 0.0;\n    }" in methods
+
+    def test_java_output_is_not_streamed(self, runtime_spec, temp_output_dir, monkeypatch, capsys):
+        """Test that Java declarations wait for the whole program and streamed builds are refused"""
+        runtime_spec.language_type = LanguageType.COMPILED
+        runtime_spec.target_language = "java"
+        ParserGenerator(runtime_spec).generate(temp_output_dir)
+        CompilerGenerator(runtime_spec).generate(temp_output_dir)
+        compiler, runner = load_generated(temp_output_dir, "compiler", "runlang")
+        source = "x = 1; x = 2.5;"
+
+        assert "double x = 1;" in compiler.Compiler().compile(source)
+        with pytest.raises(ValueError, match="whole program"):
+            compiler.Compiler().compile_stream(source, io.StringIO())
+        source_file = Path(temp_output_dir) / f"prog{runtime_spec.file_extension}"
+        source_file.write_text(source)
+        monkeypatch.setattr(sys, "argv", ["runlang", str(source_file), "--stream"])
+        with pytest.raises(SystemExit):
+            runner.main()
+        assert "--stream is not available for Java output" in capsys.readouterr().err
+
+
 class TestDocumentationGenerator:
     def test_generate_creates_docs(self, sample_spec, temp_output_dir):
         """Test that documentation generator creates all docs"""
@@ -184,6 +184,18 @@ print(x + y)'''
 
 
 class TestJavaTypeInference:
+    def test_infers_array_types(self, java_spec, temp_output_dir):
+        """Test that array literals are emitted as typed Java arrays"""
+        compiler_gen = CompilerGenerator(java_spec)
+        compiler_gen.generate(temp_output_dir)
+
+        codegen_file = temp_output_dir / "codegen.py"
+        with open(codegen_file, 'r') as f:
+            content = f.read()
+
+        assert "_infer_element_type" in content
+        assert "java.util.Arrays.toString" in content
+
     def test_infers_int_from_integer_literal(self, java_spec, temp_output_dir):
         """Test type inference for integers"""
         compiler_gen = CompilerGenerator(java_spec)
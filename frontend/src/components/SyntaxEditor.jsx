@@ -1,6 +1,9 @@
 import React, { useState } from 'react'
 import { Plus, Trash2 } from 'lucide-react'
 
+// Operators the generated runtimes implement natively, so their implementation may be left empty
+const NATIVE_OPERATORS = ['=', '||', '&&', '==', '!=', '<', '>', '<=', '>=', '+', '-', '*', '/', '%', '!']
+
 function SyntaxEditor({ syntaxRules, keywords, operators, onSyntaxChange, onKeywordsChange, onOperatorsChange }) {
   const [activeSection, setActiveSection] = useState('keywords')
   const [newKeyword, setNewKeyword] = useState({ word: '', category: '', description: '' })
@@ -21,6 +24,10 @@ function SyntaxEditor({ syntaxRules, keywords, operators, onSyntaxChange, onKeyw
       alert('Please enter an operator symbol')
       return
     }
+    if (!newOperator.implementation.trim() && !NATIVE_OPERATORS.includes(newOperator.symbol)) {
+      alert(`Operator '${newOperator.symbol}' needs an implementation, a Python expression over its operands a and b such as 'a + b'`)
+      return
+    }
     onOperatorsChange([...operators, { ...newOperator, precedence: parseInt(newOperator.precedence) }])
     setNewOperator({ symbol: '', precedence: 0, associativity: 'left', operation_type: '', implementation: '' })
   }